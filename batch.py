@@ -0,0 +1,261 @@
+"""Headless batch runs: read scenario files, run them across a worker pool and
+    write the results as arrays. Nothing here imports matplotlib."""
+import contextlib
+import csv
+import json
+import os
+import platform
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import equilibrium
+import metrics
+import sharedarrays
+import species
+import utilities
+import viability
+import weather
+from climate import CLIMATE_TYPES, create_climate
+from world import World, ENGINES
+
+# Defaults for any key a scenario leaves out
+SCENARIO_DEFAULTS = {"name": "scenario",
+                    "climates": ["Rainforest"],
+                    "species_sets": None,
+                    "grid_size": [100, 100],
+                    "days": 365,
+                    "trials": 1,
+                    "seed": 0,
+                    "seeds": None,
+                    "metrics": ["average_biomass", "total_substrate_eaten", "fungal_cells"],
+                    "sample_every": 1,
+                    "fast_forward": True,
+                    "macro_step": False,
+                    "steady_state": False,
+                    "engine": "grid",
+                    "prune_species": True,
+                    "weather_archives": [],
+                    "final_state": False}
+
+
+def load_scenarios(path: str) -> List[dict]:
+    """Reads a JSON scenario file holding one scenario or {"scenarios": [...]} and
+        returns the scenarios with defaults filled in and checked."""
+    with open(path) as scenario_file:
+        content = json.load(scenario_file)
+    scenarios = content["scenarios"] if "scenarios" in content else [content]
+    return [normalize_scenario(scenario) for scenario in scenarios]
+
+def normalize_scenario(scenario: dict) -> dict:
+    """Returns scenario with defaults filled in, species sets labelled and seeds
+        listed, raising ValueError for anything the model cannot run."""
+    unknown = set(scenario) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown scenario keys: {sorted(unknown)}")
+    normalized = {**SCENARIO_DEFAULTS, **scenario}
+    # Sites of recorded weather archives can be listed among the climates
+    for archive in normalized["weather_archives"]:
+        weather.register_archive(archive)
+    # A recorded site must cover the whole run, not end in the middle of it
+    for name in normalized["climates"]:
+        if name not in CLIMATE_TYPES:
+            raise ValueError(f"Unknown climate: {name}")
+        last_day = create_climate(name).get_last_recorded_day()
+        if last_day is not None and normalized["days"] > last_day:
+            raise ValueError(f"{name} has recorded weather through day {last_day}, "
+                            f"too short for {normalized['days']} days")
+    # Species sets are {label: [names]}; a bare list gets numbered labels
+    species_sets = normalized["species_sets"]
+    if species_sets is None:
+        species_sets = {"all": species.species_names()}
+    elif isinstance(species_sets, list):
+        species_sets = {f"set{i}": names for i, names in enumerate(species_sets)}
+    for names in species_sets.values():
+        for name in names:
+            species.species_index(name)
+    normalized["species_sets"] = species_sets
+    for name in normalized["metrics"]:
+        if name not in metrics.METRICS:
+            raise ValueError(f"Unknown metric: {name}")
+    if normalized["engine"] not in ENGINES:
+        raise ValueError(f"Unknown engine: {normalized['engine']}")
+    if normalized["final_state"] and normalized["engine"] == "meanfield":
+        raise ValueError("final_state needs an engine with a Grid of cells")
+    # Trial n of every climate and species set shares seeds[n]
+    if normalized["seeds"] is None:
+        normalized["seeds"] = [normalized["seed"] + trial for trial in range(normalized["trials"])]
+    elif len(normalized["seeds"]) != normalized["trials"]:
+        raise ValueError("seeds must list one seed per trial")
+    return normalized
+
+def scenario_runs(scenario: dict) -> List[Tuple[Tuple[int, int, int], dict]]:
+    """Splits a scenario into one descriptor per (climate, species set, trial),
+        each keyed by its index into the result arrays."""
+    runs = []
+    for c, climate in enumerate(scenario["climates"]):
+        for s, names in enumerate(scenario["species_sets"].values()):
+            for trial, seed in enumerate(scenario["seeds"]):
+                runs.append(((c, s, trial), {"climate": climate,
+                                            "fungi": names,
+                                            "grid_size": tuple(scenario["grid_size"]),
+                                            "days": scenario["days"],
+                                            "seed": seed,
+                                            "metrics": scenario["metrics"],
+                                            "sample_every": scenario["sample_every"],
+                                            "fast_forward": scenario["fast_forward"],
+                                            "macro_step": scenario["macro_step"],
+                                            "steady_state": scenario["steady_state"],
+                                            "engine": scenario["engine"],
+                                            "prune_species": scenario["prune_species"],
+                                            "weather_archives": scenario["weather_archives"]}))
+    return runs
+
+def build_world(descriptor: dict) -> World:
+    """Returns the World a descriptor describes, on its engine and weather, with
+        the species it cannot let live retired if it asks for pruning."""
+    for archive in descriptor.get("weather_archives", []):
+        weather.register_archive(archive)
+    world = World(descriptor["climate"], descriptor["grid_size"], descriptor["fungi"],
+                    seed=descriptor["seed"], engine=descriptor.get("engine", "grid"))
+    if descriptor.get("prune_species"):
+        # Species the climate kills every day of the run only cost turns
+        world.retire_doomed(descriptor["days"])
+    return world
+
+def simulate_descriptor(descriptor: dict) -> Tuple[World, Dict[str, np.ndarray]]:
+    """Runs the World a descriptor describes and returns it with its metric series.
+        With steady_state, the years after the World settles into its seasonal cycle
+        are extrapolated and "simulated_days" gives the days actually run."""
+    world = build_world(descriptor)
+    if descriptor.get("steady_state"):
+        result = equilibrium.run_long_horizon(world, descriptor["days"], descriptor["metrics"],
+                                            every=descriptor["sample_every"],
+                                            fast_forward=descriptor["fast_forward"],
+                                            macro_step=descriptor["macro_step"])
+        return world, {**result["series"], "simulated_days": result["simulated_days"]}
+    return world, metrics.record_series(world, descriptor["days"], descriptor["metrics"],
+                                        every=descriptor["sample_every"],
+                                        fast_forward=descriptor["fast_forward"],
+                                        macro_step=descriptor["macro_step"])
+
+def run_descriptor(descriptor: dict) -> Dict[str, np.ndarray]:
+    """Runs the World a descriptor describes and returns its metric series; see
+        simulate_descriptor. Runs in the worker processes."""
+    return simulate_descriptor(descriptor)[1]
+
+def run_descriptor_into(task: Tuple[Tuple[int, int, int], dict, dict]) -> Tuple[int, int, int]:
+    """Runs the World of an (index, descriptor, shared arrays descriptor) task and
+        writes its series, and with final_state its Grid's last biomass and
+        occupancy, into the shared arrays at index. Returns the index. Runs in the
+        worker processes."""
+    index, descriptor, shared = task
+    results = sharedarrays.attach(shared)
+    world, series = simulate_descriptor(descriptor)
+    for name, values in series.items():
+        results[name][index] = values
+    if "final_biomass" in results:
+        grid = world.get_environment().get_grid()
+        results["final_biomass"][index] = grid.get_current_biomass()
+        results["final_occupancy"][index] = grid.get_occupancy()
+    return index
+
+def result_specs(scenario: dict) -> Dict[str, Tuple[tuple, str]]:
+    """Returns the (shape, dtype) of every result array of scenario: an array per
+        metric shaped (climates, species sets, trials, samples), plus "simulated_days"
+        with steady_state and the final Grids of every run with final_state."""
+    times = metrics.sample_times(scenario["days"], scenario["sample_every"])
+    shape = (len(scenario["climates"]), len(scenario["species_sets"]), len(scenario["seeds"]))
+    specs = {name: (shape + (len(times),), "float64") for name in scenario["metrics"]}
+    if scenario["steady_state"]:
+        # Days each run simulated before its steady state was extrapolated
+        specs["simulated_days"] = (shape, "int64")
+    if scenario["final_state"]:
+        specs["final_biomass"] = (shape + tuple(scenario["grid_size"]), "float64")
+        specs["final_occupancy"] = (shape + tuple(scenario["grid_size"]), "uint16")
+    return specs
+
+@contextlib.contextmanager
+def scenario_results(scenario: dict, workers: int = None):
+    """Runs every trial of scenario across a pool of workers, which write their
+        results straight into shared memory, and yields the arrays of result_specs
+        for the length of a with block, after which they are freed."""
+    with sharedarrays.SharedArrays(result_specs(scenario)) as shared:
+        tasks = [(index, descriptor, shared.descriptor()) for index, descriptor in scenario_runs(scenario)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _ in pool.map(run_descriptor_into, tasks):
+                pass
+        yield shared.arrays
+
+def run_scenario(scenario: dict, workers: int = None) -> Dict[str, np.ndarray]:
+    """Runs every trial of scenario across a pool of workers and returns copies of
+        the arrays of result_specs."""
+    with scenario_results(scenario, workers) as results:
+        return {name: values.copy() for name, values in results.items()}
+
+def scenario_metadata(scenario: dict, elapsed: float) -> dict:
+    """Returns what is needed to reproduce and interpret a scenario's results."""
+    return {"scenario": scenario,
+            "elapsed_seconds": elapsed,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "days_until_expansion": utilities.DAYS_UNTIL_EXPANSION,
+            "temperature_threshold_multiplier": utilities.TEMPERATURE_THRESHOLD_MULTIPLIER,
+            "moisture_threshold_multiplier": utilities.MOISTURE_THRESHOLD_MULTIPLIER}
+
+def pruned_species(scenario: dict) -> Dict[str, Dict[str, List[str]]]:
+    """Returns the species each run of scenario retires as doomed, by climate and
+        species set; retiring depends only on the climate and the days."""
+    if not scenario["prune_species"]:
+        return {}
+    return {climate: {label: viability.doomed_species(climate, names, scenario["days"])
+                    for label, names in scenario["species_sets"].items()}
+            for climate in scenario["climates"]}
+
+def write_results(scenario: dict, results: Dict[str, np.ndarray], metadata: dict,
+                output_dir: str) -> str:
+    """Writes results to <name>.npz (every trial) and <name>.csv (trial means per day)
+        in output_dir and returns the path of the .npz file."""
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, scenario["name"])
+    times = metrics.sample_times(scenario["days"], scenario["sample_every"])
+    np.savez_compressed(f"{base}.npz",
+                        days=times,
+                        climates=np.array(scenario["climates"]),
+                        species_sets=np.array(list(scenario["species_sets"])),
+                        seeds=np.array(scenario["seeds"]),
+                        metadata=np.array(json.dumps(metadata)),
+                        **results)
+    with open(f"{base}.csv", "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["climate", "species_set", "day"] + [f"{name}_mean" for name in scenario["metrics"]])
+        means = {name: results[name].mean(axis=2) for name in scenario["metrics"]}
+        for c, climate in enumerate(scenario["climates"]):
+            for s, label in enumerate(scenario["species_sets"]):
+                for i, day in enumerate(times):
+                    writer.writerow([climate, label, int(day)] + [means[name][c, s, i] for name in scenario["metrics"]])
+    return f"{base}.npz"
+
+def load_results(path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+    """Reads a .npz written by write_results and returns (arrays, metadata)."""
+    with np.load(path) as archive:
+        arrays = {name: archive[name] for name in archive.files if name != "metadata"}
+        metadata = json.loads(str(archive["metadata"]))
+    return arrays, metadata
+
+def run_file(path: str, output_dir: str, workers: int = None) -> List[str]:
+    """Runs every scenario in a scenario file and returns the result files written."""
+    written = []
+    for scenario in load_scenarios(path):
+        start = time.perf_counter()
+        # Written out straight from the shared memory the workers wrote into
+        with scenario_results(scenario, workers) as results:
+            metadata = scenario_metadata(scenario, time.perf_counter() - start)
+            if "simulated_days" in results:
+                # Say how many runs were extrapolated rather than simulated to the end
+                metadata["extrapolated_runs"] = int((results["simulated_days"] < scenario["days"]).sum())
+            metadata["pruned_species"] = pruned_species(scenario)
+            written.append(write_results(scenario, results, metadata, output_dir))
+    return written
@@ -0,0 +1,118 @@
+"""Biodiversity experiments: how decomposition depends on which and how many species
+    share an area, comparing many species subsets with common random numbers."""
+import itertools
+import math
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import metrics
+from environment import NUM_LOCATIONS
+from climate import climate_trajectory
+from world import World
+
+GRID_SIZE = (100, 100)
+MAX_SUBSETS_PER_SIZE = 20 # sizes with more subsets than this are sampled
+
+
+def choose_subsets(species_names: List[str], sizes: List[int], max_per_size: int = MAX_SUBSETS_PER_SIZE,
+                    seed: int = 0) -> List[Tuple[str, ...]]:
+    """Returns every subset of species_names of each size when there are at most
+        max_per_size of them, and max_per_size distinct random subsets otherwise."""
+    rng = np.random.default_rng(seed)
+    subsets = []
+    for size in sizes:
+        if math.comb(len(species_names), size) <= max_per_size:
+            subsets.extend(itertools.combinations(species_names, size))
+            continue
+        chosen = set()
+        while len(chosen) < max_per_size:
+            members = np.sort(rng.choice(len(species_names), size=size, replace=False))
+            chosen.add(tuple(species_names[i] for i in members))
+        subsets.extend(sorted(chosen))
+    return subsets
+
+def common_random_numbers(climate: str, species_names: List[str], grid_size: Tuple[int, int],
+                        days: int, seed: int, trial: int) -> dict:
+    """Draws what every subset shares in one trial: the climate trajectory, the seed
+        of the initial Grid and each species' starting locations."""
+    rng = np.random.default_rng([seed, trial])
+    rows, cols = grid_size
+    locations = {}
+    for name in species_names:
+        cells = rng.choice(rows * cols, size=NUM_LOCATIONS, replace=False)
+        locations[name] = [(int(cell // cols), int(cell % cols)) for cell in cells]
+    return {"trajectory": climate_trajectory(climate, days, [seed, trial, 1]),
+            "world_seed": int(rng.integers(2**32)),
+            "initial_locations": locations}
+
+def run_subset(descriptor: dict) -> Dict[str, np.ndarray]:
+    """Runs one subset in one trial on the trial's common random numbers and returns
+        its metric series. Runs in the worker processes."""
+    shared = descriptor["shared"]
+    fungi = list(descriptor["subset"])
+    world = World(descriptor["climate"], descriptor["grid_size"], fungi, seed=shared["world_seed"],
+                    initial_locations={name: shared["initial_locations"][name] for name in fungi})
+    world.get_environment().get_climate().set_trajectory(*shared["trajectory"])
+    return metrics.record_series(world, descriptor["days"], descriptor["metrics"],
+                                every=descriptor["sample_every"], macro_step=descriptor["macro_step"])
+
+def run_biodiversity_experiment(climate: str,
+                                species_names: List[str],
+                                sizes: List[int],
+                                days: int,
+                                trials: int,
+                                metric_names: List[str] = None,
+                                max_per_size: int = MAX_SUBSETS_PER_SIZE,
+                                grid_size: Tuple[int, int] = GRID_SIZE,
+                                sample_every: int = 1,
+                                seed: int = 0,
+                                workers: int = None,
+                                macro_step: bool = False) -> Dict[str, object]:
+    """Runs every chosen subset of species_names in every trial, all subsets of a trial
+        sharing its weather, initial Grid and starting locations, and returns an array
+        per metric shaped (trials, subsets, samples)."""
+    metric_names = metric_names if metric_names is not None else ["average_biomass"]
+    subsets = choose_subsets(species_names, sizes, max_per_size, seed)
+    times = metrics.sample_times(days, sample_every)
+    results = {name: np.zeros((trials, len(subsets), len(times))) for name in metric_names}
+    tasks = []
+    for trial in range(trials):
+        shared = common_random_numbers(climate, species_names, grid_size, days, seed, trial)
+        for s, subset in enumerate(subsets):
+            tasks.append(((trial, s), {"climate": climate,
+                                        "subset": subset,
+                                        "shared": shared,
+                                        "grid_size": grid_size,
+                                        "days": days,
+                                        "metrics": metric_names,
+                                        "sample_every": sample_every,
+                                        "macro_step": macro_step}))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for (index, _), series in zip(tasks, pool.map(run_subset, [task for _, task in tasks])):
+            for name, values in series.items():
+                results[name][index] = values
+    return {"climate": climate,
+            "subsets": subsets,
+            "sizes": np.array([len(subset) for subset in subsets]),
+            "days": times,
+            "results": results}
+
+def summarize_by_size(experiment: dict, metric: str) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Returns {size: (mean, standard error)} of a metric's series over the subsets of
+        each size, with the standard error taken across trials."""
+    values = experiment["results"][metric]
+    summary = {}
+    for size in np.unique(experiment["sizes"]):
+        per_trial = values[:, experiment["sizes"] == size].mean(axis=1)
+        summary[int(size)] = (per_trial.mean(axis=0), per_trial.std(axis=0, ddof=1) / np.sqrt(len(per_trial)))
+    return summary
+
+def size_contrast(experiment: dict, metric: str, size: int, baseline: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the mean and standard error of the difference in a metric between subsets
+        of size and of baseline, paired within trials. Common random numbers make the
+        paired difference far less noisy than comparing independent runs."""
+    values = experiment["results"][metric]
+    sizes = experiment["sizes"]
+    difference = values[:, sizes == size].mean(axis=1) - values[:, sizes == baseline].mean(axis=1)
+    return difference.mean(axis=0), difference.std(axis=0, ddof=1) / np.sqrt(len(difference))
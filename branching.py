@@ -0,0 +1,39 @@
+"""What-if branching: run a World up to the branch point once, then run every branch
+    from a fork of it, e.g.
+
+        world = World("Rainforest", (100, 100), fungi, seed=0)
+        world.run(365)
+        results = run_branches(world, {"baseline": run_year, "shock": dry_spell_then_run_year})
+
+    On systems with os.fork the branches run in worker processes forked from this
+    one, which share the World's memory copy-on-write instead of pickling it."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict
+
+from world import World
+
+# The World and branches the forked workers read, set just before they are forked
+_BRANCH_POINT = {}
+
+
+def run_branch(name: str):
+    """Runs one branch on a fork of the branch point. Runs in the worker processes."""
+    return _BRANCH_POINT["branches"][name](_BRANCH_POINT["world"].fork(_BRANCH_POINT["split_random"]))
+
+def run_branches(world: World,
+                branches: Dict[str, Callable[[World], object]],
+                workers: int = None,
+                split_random: bool = True) -> Dict[str, object]:
+    """Calls every branch on its own fork of world and returns {name: result}. world
+        itself is left as it is. Results must be picklable when the branches run in
+        worker processes, which they do where os.fork is available and workers is
+        not 1."""
+    if workers == 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return {name: branch(world.fork(split_random)) for name, branch in branches.items()}
+    _BRANCH_POINT.update(world=world, branches=branches, split_random=split_random)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            return dict(zip(branches, pool.map(run_branch, list(branches))))
+    finally:
+        _BRANCH_POINT.clear()
@@ -1,5 +1,6 @@
-import random
 import math
+import numpy as np
+from typing import Tuple
 from utilities import rainfall_inches_to_mPa
 
 BIOMASS_WEIGHT = 0.3
@@ -7,6 +8,10 @@ BIOMASS_WEIGHT = 0.3
 class Climate:
     """Climate class for handling different biomes."""
 
+    __slots__ = ("climate_type", "temperature_range", "moisture_base", "annual_rain", "evaporation_rate",
+                "biomass_density", "raindays_per_year", "rng", "trajectory", "current_moisture",
+                "current_temperature", "held_day")
+
     def __init__(self, climate_type: str, 
                 temperature_range: tuple,
                 moisture_base: float, 
@@ -22,9 +27,15 @@ class Climate:
         self.evaporation_rate = evaporation_rate
         self.biomass_density = biomass_density
         self.raindays_per_year = raindays_per_year
+        # Random number generator, replaced by the Environment's shared one
+        self.rng = np.random.default_rng()
+        # Recorded (temperatures, moistures) indexed by day, replayed instead of drawing weather
+        self.trajectory = None
+        # (temperature, moisture) already drawn for the next day, e.g. by a projection
+        self.held_day = None
         # Dynamic values and their initial conditions
         self.current_moisture = self.moisture_base
-        self.current_temperature = self.update_temperature(0)
+        self.update_temperature(0)
 
     def __str__(self) -> str:
         """Returns a pretty-print string of the Climate data."""
@@ -44,14 +55,14 @@ class Climate:
     def __is_raining(self) -> bool:
         """Determines if the Climate is raining that day."""
         rain_probability = self.raindays_per_year / 365
-        random_roll = random.random()
+        random_roll = self.rng.random()
         return random_roll <= rain_probability
     
     def __add_rainfall_to_moisture(self):
         """Adds the requisite amount of moisture to the Climate's
             current moisture value per day of rain."""
         # 1.177e-3 is the average amount of rain in one day in mPa
-        self.current_moisture += random.uniform(.85, 1.15) * 1.177e-3 
+        self.current_moisture += self.rng.uniform(.85, 1.15) * 1.177e-3 
 
     def __evaporate_moisture(self):
         """Evaporates the requisite amount of moisture depending 
@@ -74,7 +85,7 @@ class Climate:
         """Updates the current Climate temperature according to time
             given by the Environment and by Climate specifics."""
         a,b = self.temperature_range
-        new_temp = ((a + b) / 2) + ((b - a) / 2)*math.sin((2*math.pi*time) / 365) * random.uniform(0.85, 1.15)
+        new_temp = ((a + b) / 2) + ((b - a) / 2)*math.sin((2*math.pi*time) / 365) * self.rng.uniform(0.85, 1.15)
         self.__set_current_temperature(new_temp)
 
     ## Biomass functions
@@ -83,16 +94,99 @@ class Climate:
             a specific time."""
         return (self.biomass_density + self.biomass_density*0.2*math.sin((2*math.pi*time) / 365)) * BIOMASS_WEIGHT
 
+    def get_inbound_biomass_series(self, time: int, days: int) -> np.ndarray:
+        """Returns an array of the biomass that enters the Climate on each
+            of days time through time + days - 1."""
+        times = np.arange(time, time + days)
+        return (self.biomass_density + self.biomass_density*0.2*np.sin((2*np.pi*times) / 365)) * BIOMASS_WEIGHT
+
+    def get_inbound_biomass_total(self, time: int, days: int) -> float:
+        """Returns the total biomass that enters the Climate on days time 
+            through time + days - 1, summed in closed form."""
+        theta = (2*math.pi) / 365
+        # Sum of sin(theta*t) over the run of days
+        sin_sum = math.sin(days*theta / 2) * math.sin((2*time + days - 1)*theta / 2) / math.sin(theta / 2)
+        return (self.biomass_density*days + self.biomass_density*0.2*sin_sum) * BIOMASS_WEIGHT
+
     # Function that Environment calls each day
     def update_climate_per_day(self, time: int):
         """Updates the Climate's moisture and temperature."""
+        if self.held_day is not None:
+            self.set_climate_state(*self.held_day)
+            self.held_day = None
+            return
+        if self.trajectory is not None:
+            temperatures, moistures = self.trajectory
+            self.set_climate_state(temperatures[time], moistures[time])
+            return
         self.update_rain()
         self.update_temperature(time)
     
+    def copy(self, rng: np.random.Generator) -> "Climate":
+        """Returns an independent copy of the Climate drawing its weather from rng;
+            a recorded trajectory is shared, as it is only read."""
+        climate = type(self).__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                setattr(climate, name, getattr(self, name))
+        climate.rng = rng
+        return climate
+
+    def set_random_generator(self, rng: np.random.Generator):
+        """Sets the random number generator the Climate draws its weather from."""
+        self.rng = rng
+
     def get_climate_biomass_density(self):
         """Returns the Climate's biomass density."""
         return self.biomass_density
 
+    # Bulk functions for skipping ahead
+    def project_days(self, time: int, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns arrays of the temperatures and moistures the Climate would have
+            on days time through time + days - 1 without changing its state."""
+        if self.trajectory is not None:
+            temperatures, moistures = self.trajectory
+            if time + days > len(temperatures):
+                raise ValueError(f"The recorded weather ends on day {len(temperatures) - 1}")
+            return temperatures[time:time + days], moistures[time:time + days]
+        rain_probability = self.raindays_per_year / 365
+        raining = self.rng.random(days) <= rain_probability
+        rainfall = np.where(raining, self.rng.uniform(.85, 1.15, days) * 1.177e-3, 0)
+        moistures = self.current_moisture + np.cumsum(rainfall - rainfall_inches_to_mPa(self.evaporation_rate))
+        a,b = self.temperature_range
+        times = np.arange(time, time + days)
+        temperatures = ((a + b) / 2) + ((b - a) / 2)*np.sin((2*np.pi*times) / 365) * self.rng.uniform(0.85, 1.15, days)
+        return temperatures, moistures
+
+    def set_climate_state(self, temperature: float, moisture: float):
+        """Sets the current temperature and moisture of the Climate, e.g. to
+            the last day of a projection from project_days."""
+        self.__set_current_temperature(temperature)
+        self.current_moisture = moisture
+
+    def hold_next_day(self, temperature: float, moisture: float):
+        """Makes the next update_climate_per_day take the given weather instead of
+            drawing it, e.g. a day project_days already drew."""
+        self.held_day = (temperature, moisture)
+
+    def record_trajectory(self, days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns arrays of the temperature and moisture on days 0 through days,
+            starting from the current state, for replaying with set_trajectory."""
+        temperatures, moistures = self.project_days(1, days)
+        return (np.concatenate([[self.current_temperature], temperatures]), 
+                np.concatenate([[self.current_moisture], moistures]))
+
+    def set_trajectory(self, temperatures: np.ndarray, moistures: np.ndarray):
+        """Makes the Climate replay the given weather, indexed by day, instead of
+            drawing its own. The Climate starts at day 0 of the trajectory."""
+        self.trajectory = (temperatures, moistures)
+        self.set_climate_state(temperatures[0], moistures[0])
+
+    def get_last_recorded_day(self) -> int:
+        """Returns the last day of the weather the Climate replays, or None if it
+            draws its own."""
+        return len(self.trajectory[0]) - 1 if self.trajectory is not None else None
+
     # Climate functions to be used by fungi
     def get_climate_temperature(self) -> float:
         """Returns the Climate's current temperature in Celsius."""
@@ -109,6 +203,8 @@ class Climate:
 class Desert(Climate):
     """Desert Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="Desert (Arid)", 
                 temperature_range=(-3.9, 38), 
                 moisture_base=(-1.5), 
@@ -128,6 +224,8 @@ class Desert(Climate):
 class Tundra(Climate):
     """Tundra Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="Tundra (Arid)", 
                 temperature_range=(-40, 18), 
                 moisture_base=(-1.5), 
@@ -147,6 +245,8 @@ class Tundra(Climate):
 class Grassland(Climate):
     """Grassland Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="Grassland (Semi-Arid)", 
                 temperature_range=(-20, 30), 
                 moisture_base=(-1.13325), 
@@ -166,6 +266,8 @@ class Grassland(Climate):
 class Shrubland(Climate):
     """Shrubland Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="Shrubland (Temperate)", 
                 temperature_range=(-1, 38), 
                 moisture_base=(-0.7665), 
@@ -185,6 +287,8 @@ class Shrubland(Climate):
 class TemperateDeciduousForest(Climate):
     """Temperate Decidiuous Forest Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="Temperate Decidiuous Forest (Arboreal)", 
                 temperature_range=(-22, 30), 
                 moisture_base=(-0.39975), 
@@ -204,6 +308,8 @@ class TemperateDeciduousForest(Climate):
 class ConiferousForest(Climate):
     """ConiferousForest Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="ConiferousForest (Arboreal)", 
                 temperature_range=(-40, 20), 
                 moisture_base=(-0.39975), 
@@ -223,6 +329,8 @@ class ConiferousForest(Climate):
 class Rainforest(Climate):
     """Rainforest Climate."""
 
+    __slots__ = ()
+
     def __init__(self, climate_type="Rainforest (Rainforest)", 
                 temperature_range=(20, 25), 
                 moisture_base=(-0.033), 
@@ -237,3 +345,32 @@ class Rainforest(Climate):
                         evaporation_rate, 
                         biomass_density, 
                         raindays_per_year)
+
+
+
+# Dictionary for mapping strings to Climate classes; Climates are only built on request
+CLIMATE_TYPES = {"Desert": Desert, 
+                "Tundra": Tundra,
+                "Shrubland": Shrubland,
+                "Grassland": Grassland,
+                "TemperateDeciduousForest": TemperateDeciduousForest,
+                "ConiferousForest": ConiferousForest,
+                "Rainforest": Rainforest}
+
+# Every climate, in the order the figures show them
+CLIMATE_NAMES = ["Rainforest", "Tundra", "Grassland", "Shrubland",  
+                "TemperateDeciduousForest", "ConiferousForest",
+                "Desert"]
+
+def create_climate(climate_type: str) -> Climate:
+    """Builds a new Climate of the named type."""
+    if climate_type not in CLIMATE_TYPES:
+        raise KeyError(f"Unknown climate: {climate_type}")
+    return CLIMATE_TYPES[climate_type]()
+
+def climate_trajectory(climate_type: str, days: int, seed) -> Tuple[np.ndarray, np.ndarray]:
+    """Draws one trajectory of a climate's weather for days 0 through days, for 
+        replaying in several runs with Climate.set_trajectory."""
+    climate = create_climate(climate_type)
+    climate.set_random_generator(np.random.default_rng(seed))
+    return climate.record_trajectory(days)
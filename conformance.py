@@ -0,0 +1,125 @@
+"""Conformance and speed harness for engines: runs a candidate engine and the
+    reference over matched climates and seeds, tests whether their biomass,
+    consumption and coverage series are statistically equivalent and reports the
+    speedup. An engine is only fit for production when it passes both."""
+import time
+import numpy as np
+from scipy import stats
+from typing import Dict, List, Tuple
+
+import metrics
+from world import World
+
+ALPHA = 0.05 # significance of the KS tests and of each side of the mean test
+EQUIVALENCE_MARGIN = 0.05 # largest difference of means, relative to the reference, taken as equivalent
+CONFORMANCE_METRICS = ["average_biomass", "total_substrate_eaten", "fungal_cells"]
+SAMPLE_EVERY = 30 # days between the points of the series that are compared
+MIN_SPEEDUP = 1.1 # speedup over the reference an engine must show to be adopted
+
+
+def run_engine(engine: str,
+            climate_type: str,
+            fungus_list: List[str],
+            grid_size: Tuple[int, int],
+            days: int,
+            seed: int,
+            metric_names: List[str] = CONFORMANCE_METRICS,
+            every: int = SAMPLE_EVERY,
+            macro_step: bool = False) -> Tuple[Dict[str, np.ndarray], float]:
+    """Runs one World on engine, with macro_step through its block steps, and
+        returns its series with the seconds it took."""
+    world = World(climate_type, grid_size, fungus_list, seed=seed, engine=engine)
+    started = time.perf_counter()
+    series = metrics.record_series(world, days, metric_names, every=every, macro_step=macro_step)
+    return series, time.perf_counter() - started
+
+def equivalence(candidate: np.ndarray, reference: np.ndarray, alpha: float = ALPHA,
+                margin: float = EQUIVALENCE_MARGIN) -> Dict[str, float]:
+    """Tests two (trials, samples) arrays of a metric, row n of each run from the
+        same seed, for equivalence at every sample. The two-sample KS test must find
+        no difference in distribution (Bonferroni corrected over the samples), and
+        the (1 - 2 alpha) confidence interval of the mean paired difference must lie
+        within margin times the reference mean (two one-sided tests). Returns the
+        worst sample of each test."""
+    samples = candidate.shape[1]
+    ks_statistics = np.zeros(samples)
+    ks_pvalues = np.ones(samples)
+    bounds = np.zeros((samples, 2))
+    scales = np.maximum(np.abs(reference.mean(axis=0)), 1e-12)
+    for j in range(samples):
+        if not np.array_equal(np.sort(candidate[:, j]), np.sort(reference[:, j])):
+            ks = stats.ks_2samp(candidate[:, j], reference[:, j])
+            ks_statistics[j], ks_pvalues[j] = ks.statistic, ks.pvalue
+        # Paired t interval: matched seeds share their climate and starting cells
+        differences = candidate[:, j] - reference[:, j]
+        error = differences.std(ddof=1) / np.sqrt(len(differences)) * stats.t.ppf(1 - alpha, len(differences) - 1)
+        bounds[j] = (differences.mean() - error) / scales[j], (differences.mean() + error) / scales[j]
+    worst = int(np.argmax(np.abs(bounds).max(axis=1)))
+    return {"ks_statistic": float(ks_statistics.max()),
+            "ks_pvalue": float(min(ks_pvalues.min() * samples, 1.0)),
+            "relative_difference_low": float(bounds[worst, 0]),
+            "relative_difference_high": float(bounds[worst, 1]),
+            "distribution_equivalent": bool(ks_pvalues.min() * samples >= alpha),
+            "mean_equivalent": bool(np.all(np.abs(bounds) <= margin))}
+
+def check_engine(candidate: str,
+                climate_types: List[str],
+                fungus_list: List[str],
+                reference: str = "grid",
+                grid_size: Tuple[int, int] = (50, 50),
+                days: int = 365,
+                trials: int = 20,
+                metric_names: List[str] = CONFORMANCE_METRICS,
+                every: int = SAMPLE_EVERY,
+                alpha: float = ALPHA,
+                margin: float = EQUIVALENCE_MARGIN,
+                macro_step: bool = False) -> dict:
+    """Runs trials matched seeds of every climate on the candidate and reference
+        engines and returns, per climate, the equivalence of every metric and the
+        seconds each engine took, plus whether the candidate is equivalent
+        everywhere, its overall speedup and whether it passed both. With
+        macro_step the candidate runs through its block steps, while the
+        reference always steps day by day. Seconds are keyed "reference" and
+        "candidate"."""
+    report = {"candidate": candidate, "reference": reference, "macro_step": macro_step, "climates": {}}
+    # Runs are kept by role, so that an engine can be checked against itself, e.g. its block steps
+    roles = {"reference": (reference, False), "candidate": (candidate, macro_step)}
+    total_seconds = {role: 0.0 for role in roles}
+    for climate_type in climate_types:
+        series = {role: {name: [] for name in metric_names} for role in roles}
+        seconds = {role: 0.0 for role in roles}
+        # The engines take turns seed by seed so that drift in the machine's speed hits both
+        for seed in range(trials):
+            for role, (engine, block_steps) in roles.items():
+                run, elapsed = run_engine(engine, climate_type, fungus_list, grid_size, days, seed, metric_names, every,
+                                        block_steps)
+                seconds[role] += elapsed
+                for name in metric_names:
+                    series[role][name].append(run[name])
+        for role in seconds:
+            total_seconds[role] += seconds[role]
+        report["climates"][climate_type] = {
+            "metrics": {name: equivalence(np.array(series["candidate"][name]), np.array(series["reference"][name]),
+                                        alpha, margin) for name in metric_names},
+            "seconds": seconds,
+            "speedup": seconds["reference"] / max(seconds["candidate"], 1e-12)}
+    report["equivalent"] = all(result["distribution_equivalent"] and result["mean_equivalent"]
+                                for climate in report["climates"].values()
+                                for result in climate["metrics"].values())
+    report["speedup"] = total_seconds["reference"] / max(total_seconds["candidate"], 1e-12)
+    report["passed"] = report["equivalent"] and report["speedup"] >= MIN_SPEEDUP
+    return report
+
+def format_report(report: dict) -> str:
+    """Returns a check_engine report as a table, one row per climate and metric."""
+    lines = [f"{report['candidate']}{' (macro-stepped)' if report['macro_step'] else ''} against {report['reference']}",
+            f"{'climate':<26}{'metric':<24}{'KS p':>8}{'mean difference':>22}{'equivalent':>12}{'speedup':>10}"]
+    for climate_type, climate in report["climates"].items():
+        for name, result in climate["metrics"].items():
+            interval = f"[{result['relative_difference_low']:+.1%}, {result['relative_difference_high']:+.1%}]"
+            equivalent = result["distribution_equivalent"] and result["mean_equivalent"]
+            lines.append(f"{climate_type:<26}{name:<24}{result['ks_pvalue']:>8.3f}{interval:>22}"
+                        f"{'yes' if equivalent else 'no':>12}{climate['speedup']:>9.2f}x")
+    lines.append(f"equivalent: {'yes' if report['equivalent'] else 'no'}, speedup: {report['speedup']:.2f}x, "
+                f"passed: {'yes' if report['passed'] else 'no'}")
+    return "\n".join(lines)
@@ -0,0 +1,87 @@
+"""Adaptive ensembles: keep launching trials in parallel batches until the confidence
+    interval of every tracked series is narrow enough, or a cap is reached."""
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import metrics
+from batch import run_descriptor
+from series_statistics import SeriesStatistics
+
+GRID_SIZE = (100, 100)
+MIN_TRIALS = 4 # trials before the interval width is trusted
+MAX_TRIALS = 200
+
+
+def accumulate_trials(descriptors: List[dict]) -> Dict[str, SeriesStatistics]:
+    """Runs a chunk of trials and streams their series into one SeriesStatistics per
+        metric, which is all that goes back to the parent. Runs in the worker processes."""
+    accumulated = {}
+    for descriptor in descriptors:
+        for name, values in run_descriptor(descriptor).items():
+            if name not in accumulated:
+                accumulated[name] = SeriesStatistics(len(values))
+            accumulated[name].add(values)
+    return accumulated
+
+def run_adaptive_ensemble(climate: str,
+                        fungi: List[str],
+                        days: int,
+                        target_widths: Dict[str, float],
+                        confidence: float = 0.95,
+                        min_trials: int = MIN_TRIALS,
+                        max_trials: int = MAX_TRIALS,
+                        batch_size: int = None,
+                        grid_size: Tuple[int, int] = GRID_SIZE,
+                        sample_every: int = 1,
+                        seed: int = 0,
+                        workers: int = None,
+                        fast_forward: bool = True,
+                        macro_step: bool = False) -> Dict[str, object]:
+    """Runs trials of one climate in batches until, for every metric in target_widths,
+        the full width of the confidence interval of the mean is at most its target
+        on every sampled day, or max_trials have run. Reports the trials used."""
+    metric_names = list(target_widths)
+    times = metrics.sample_times(days, sample_every)
+    statistics = {name: SeriesStatistics(len(times)) for name in metric_names}
+    count = 0
+    converged = False
+    # One trial per worker in each batch unless told otherwise
+    workers = workers or os.cpu_count()
+    batch_size = batch_size if batch_size is not None else workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while count < max_trials and not converged:
+            size = min(max(batch_size, min_trials - count), max_trials - count)
+            descriptors = [{"climate": climate,
+                            "fungi": fungi,
+                            "grid_size": grid_size,
+                            "days": days,
+                            "seed": seed + trial,
+                            "metrics": metric_names,
+                            "sample_every": sample_every,
+                            "fast_forward": fast_forward,
+                            "macro_step": macro_step} for trial in range(count, count + size)]
+            chunks = [descriptors[i::workers] for i in range(min(workers, size))]
+            for accumulated in pool.map(accumulate_trials, chunks):
+                for name in metric_names:
+                    statistics[name].merge(accumulated[name])
+            count += size
+            half_widths = {name: statistics[name].get_confidence_half_width(confidence)
+                            for name in metric_names}
+            converged = count >= min_trials and all(np.all(2*half_widths[name] <= target_widths[name])
+                                                    for name in metric_names)
+    return {"climate": climate,
+            "days": times,
+            "mean": {name: statistics[name].get_mean() for name in metric_names},
+            "half_width": half_widths,
+            "statistics": statistics,
+            "trials": count,
+            "converged": converged}
+
+def run_adaptive_ensembles(climates: List[str], fungi: List[str], days: int,
+                            target_widths: Dict[str, float], **options) -> Dict[str, Dict[str, object]]:
+    """Runs run_adaptive_ensemble for each climate, so each one gets only as many
+        trials as its own noise needs."""
+    return {climate: run_adaptive_ensemble(climate, fungi, days, target_widths, **options)
+            for climate in climates}
@@ -1,64 +1,264 @@
-from typing import List, Tuple
-from grid import Grid
-from fungus import * 
-from climate import Climate, Desert, Tundra, Shrubland, Grassland, \
-    TemperateDeciduousForest, ConiferousForest, Rainforest
+import copy
+import numpy as np
+from typing import Dict, List, Tuple
+from grid import Grid, MAX_SPECIES
+import expansion
+import species
+import utilities
+import viability
+from fungus import Fungus
+from climate import Climate, create_climate
 
 NUM_LOCATIONS = 1
+FAST_FORWARD_MAX_CHUNK = 365 # most days of weather fast_forward projects at once
+
+
+class ReferenceEngine:
+    """The object-based day every published result comes from: each Fungus takes
+        its turn in turn order, then the fungi expand at once. A faster engine
+        implements the same update and is checked against this one with
+        conformance.check_engine before it is used."""
+
+    def update(self, environment: "Environment", time: int):
+        """Advances environment through day time."""
+        # Update the Climate
+        environment.climate.update_climate_per_day(time)
+        new_biomass = environment.climate.get_inbound_biomass(time)
+        # Update the Grid
+        environment.grid.add_value_everywhere(new_biomass)
+        # Update the Fungi; a retired Fungus is killed by the Climate as on any other day
+        for fungalicious, retired in zip(environment.fungus_list, environment.retired):
+            if retired:
+                fungalicious.skip_days(1)
+            else:
+                fungalicious.turn(environment.grid, environment.climate)
+        if time % utilities.DAYS_UNTIL_EXPANSION == 0:
+            environment.expand()
+
+    def macro_step(self, environment: "Environment", time: int, days: int):
+        """Advances environment over days time through time + days - 1 in one
+            operation, none of them an expansion day: consumption in closed form
+            where no cell can run out, deaths and resurrections drawn for the block."""
+        if type(self).update is not ReferenceEngine.update:
+            # A subclass changed the day, which the block below would not follow
+            for day in range(time, time + days):
+                self.update(environment, day)
+            return
+        temperatures, moistures = environment.climate.project_days(time, days)
+        inbound = environment.climate.get_inbound_biomass_series(time, days)
+        active = [fungus for fungus, retired in zip(environment.fungus_list, environment.retired) if not retired]
+        table = environment.species[~environment.retired]
+        # Every occupied cell and where each Fungus' locations sit among them
+        states = [fungus.get_block_state() for fungus in active]
+        cells = np.unique(np.concatenate([np.asarray(keys, dtype=int) for keys, _, _ in states] + [np.empty(0, dtype=int)]))
+        indices = [np.searchsorted(cells, np.asarray(keys, dtype=int)) for keys, _, _ in states]
+        original = environment.grid.get_original_biomass_by_cell()[cells]
+        current = environment.grid.get_current_biomass_by_cell()[cells]
+        factors = species.consumption_factors(table, temperatures, moistures)
+        survivable = species.survivable_days(table, temperatures, moistures)
+        # Starvation check for the whole block: a cell that keeps more biomass than
+        # every Fungus in it could eat, even with no inbound biomass, eats every day
+        worst_case = np.zeros(len(cells))
+        for index, factor in zip(indices, factors):
+            worst_case[index] += np.clip(factor, 0, None).sum()
+        safe = current > original * worst_case
+
+        # Closed form for the safe cells
+        eaten_safe = np.zeros(len(cells))
+        gained = [np.zeros(len(index)) for index in indices]
+        peaks = [consumed.copy() for _, consumed, _ in states]
+        eaten_last_day = [0.0 for _ in indices]
+        for s, (index, factor) in enumerate(zip(indices, factors)):
+            members = safe[index]
+            cumulative = np.cumsum(factor)
+            gained[s][members] = original[index[members]] * cumulative[-1]
+            peaks[s][members] += original[index[members]] * max(cumulative.max(), 0)
+            eaten_last_day[s] += (original[index[members]] * factor[-1]).sum()
+            eaten_safe[index[members]] += gained[s][members]
+
+        # Day by day, but vectorized over cells, for the cells that may run out. Their
+        # deaths are drawn day by day too: as in Fungus.turn, a dead cell that starves
+        # on a day the climate allows can still come back that day
+        level = current.copy()
+        dead_unsafe = [dead[~safe[index]] for index, (_, _, dead) in zip(indices, states)]
+        if not safe.all():
+            for day in range(days):
+                level += inbound[day]
+                for s, (index, factor) in enumerate(zip(indices, factors)):
+                    members = ~safe[index]
+                    cell = index[members]
+                    eat = original[cell] * factor[day]
+                    fed = eat < level[cell]
+                    amount = np.where(fed, eat, 0)
+                    level[cell] -= amount
+                    gained[s][members] += amount
+                    peaks[s][members] = np.maximum(peaks[s][members], states[s][1][members] + gained[s][members])
+                    if survivable[s][day]:
+                        risen = dead_unsafe[s] & (environment.rng.random(len(cell)) >= 0.6)
+                        dead_unsafe[s] = (dead_unsafe[s] | ~fed) & ~risen
+                    else:
+                        dead_unsafe[s] = np.ones(len(cell), dtype=bool)
+                    if day == days - 1:
+                        eaten_last_day[s] += amount.sum()
+        current = np.where(safe, current + inbound.sum() - eaten_safe, level)
+
+        # Apply the block
+        environment.climate.set_climate_state(temperatures[-1], moistures[-1])
+        environment.grid.add_value_everywhere(inbound.sum())
+        environment.grid.get_current_biomass_by_cell()[cells] = current
+        for fungus, retired in zip(environment.fungus_list, environment.retired):
+            if retired:
+                fungus.skip_days(days)
+        for s, fungus in enumerate(active):
+            keys, consumed, dead = states[s]
+            # A safe cell only dies with the climate, and a dead cell comes back with
+            # probability 0.4 on each day the climate allows it after the last such
+            # death, so it is still dead after m of them with probability 0.6^m
+            alive = survivable[s]
+            climate_deaths = np.flatnonzero(~alive)
+            last_kill = climate_deaths[-1] if len(climate_deaths) > 0 else -1
+            chances = alive[last_kill + 1:].sum()
+            dead = (dead | (last_kill >= 0)) & (environment.rng.random(len(keys)) < 0.6**chances)
+            dead[~safe[indices[s]]] = dead_unsafe[s]
+            fungus.set_block_state(days, keys, consumed + gained[s], dead,
+                                    peaks[s].max() if len(keys) > 0 else 0,
+                                    eaten_last_day[s])
 
 
 class Environment:
     """Environment class for containing Climate, Grid, and Fungi."""
 
-    # Dictionary for mapping strings to creation of Climates
-    climate_map = {"Desert": Desert(), 
-                    "Tundra": Tundra(),
-                    "Shrubland": Shrubland(),
-                    "Grassland": Grassland(),
-                    "TemperateDeciduousForest": TemperateDeciduousForest(),
-                    "ConiferousForest": ConiferousForest(),
-                    "Rainforest": Rainforest()}
-    # Dictionary for mapping strings to Fungus objects
-    fungus_map = {"Phellinus robiniae"          : Fungus1,
-                    "Phellinus hartigii"        : Fungus2,
-                    "Phellinus gilvus"          : Fungus3,
-                    "Armillaria tabescens"      : Fungus4,
-                    "Porodisculus pendulus"     : Fungus5,
-                    "Schizophyllum commune"     : Fungus6,
-                    "Hyphodontia crustosa"      : Fungus7,
-                    "Phlebia rufa"              : Fungus8,
-                    "Hyphoderma setigerum"      : Fungus9,
-                    "Laetiporus conifericola"   : Fungus10,
-                    "Tyromyces chioneus"        : Fungus11,
-                    "Lentinus crinitus"         : Fungus12,
-                    "Fomes fomentarius"         : Fungus13,
-                    "Xylobolus subpileatus"     : Fungus14}
+    __slots__ = ("expansion_resolution", "engine", "rng", "climate", "grid", "fungus_list", "species", "retired")
 
     def __init__(self, 
                 climate_type: str,
                 grid_size: Tuple[int, int],
-                fungus_list: List[str]) -> None:
+                fungus_list: List[str],
+                seed: int = None,
+                species_table: np.ndarray = None,
+                initial_locations: Dict[str, List[Tuple[int, int]]] = None,
+                expansion_resolution: str = "coexist",
+                engine: ReferenceEngine = None) -> None:
+        if expansion_resolution not in expansion.RESOLUTIONS:
+            raise ValueError(f"Unknown expansion resolution: {expansion_resolution}")
+        self.expansion_resolution = expansion_resolution
+        # What advances the Environment by a day
+        self.engine = engine if engine is not None else ReferenceEngine()
+        # One random number generator for everything in the Environment
+        self.rng = np.random.default_rng(seed)
         # Substantiate the Climate, Grid, and Fungus objects for the Environment
-        self.climate = self.climate_map.get(climate_type)
+        # Each Environment gets its own Climate so runs don't share weather
+        self.climate = create_climate(climate_type)
+        self.climate.set_random_generator(self.rng)
         self.grid = Grid(grid_size[0], grid_size[1], 
                         self.climate.get_climate_biomass_density(), 
-                        sensitivity=0.15)
-        # Instantiate the Fungus objects
-        self.fungus_list = [self.fungus_map.get(new_fungus)(self.grid.generate_random_locations(NUM_LOCATIONS)) 
-                            for new_fungus in fungus_list]
+                        sensitivity=0.15,
+                        rng=self.rng)
+        # Instantiate the Fungus objects from the species registry, starting at
+        # initial_locations for the species that have them
+        table = species_table if species_table is not None else species.get_species_table()
+        initial_locations = initial_locations if initial_locations is not None else {}
+        self.fungus_list = [species.create_fungus(record, initial_locations.get(str(record["name"])) 
+                                                    or self.grid.generate_random_locations(NUM_LOCATIONS)) 
+                            for record in species.select_species(fungus_list, table)]
+        for fungus in self.fungus_list:
+            fungus.set_random_generator(self.rng)
         # Sort the list by competitive ranking for turn priority
         self.fungus_list.sort(key=lambda fungus: fungus.get_competitive_ranking(), reverse=True)
+        # Species s of the Grid's occupancy index is the Fungus s-th in turn order
+        if len(self.fungus_list) > MAX_SPECIES:
+            raise ValueError(f"At most {MAX_SPECIES} species can share a Grid")
+        for s, fungus in enumerate(self.fungus_list):
+            fungus.place_on_grid(self.grid, s)
+        # Parameters of the fungi as vectors, in turn order
+        self.species = species.select_species([fungus.name for fungus in self.fungus_list], table)
+        # Fungi the Climate cannot let live for the rest of the run, in turn order
+        self.retired = np.zeros(len(self.fungus_list), dtype=bool)
 
     def update(self, time: int):
         """Update's the Environment using time."""
-        # Update the Climate
-        self.climate.update_climate_per_day(time)
-        new_biomass = self.climate.get_inbound_biomass(time)
-        # Update the Grid
-        self.grid.add_value_everywhere(new_biomass)
-        # Update the Fungi
-        for fungalicious in self.fungus_list:
-            fungalicious.turn(self.grid, self.climate)
+        self.engine.update(self, time)
+
+    def expand(self):
+        """Expands every Fungus at once into the neighbors its frontier picked."""
+        frontiers = [fungus.get_frontier() for fungus in self.fungus_list]
+        if not any(cells for cells, _ in frontiers):
+            return
+        owners = np.concatenate([np.full(len(cells), s, dtype=int) for s, (cells, _) in enumerate(frontiers)])
+        cells = np.array([cell for cells, _ in frontiers for cell in cells], dtype=int)
+        rolls = np.array([roll for _, rolls in frontiers for roll in rolls], dtype=float)
+        gains = expansion.expand(self.grid.get_occupancy(), len(self.fungus_list), owners,
+                                cells // self.grid.num_cols, cells % self.grid.num_cols, rolls,
+                                self.expansion_resolution, self.rng)
+        for fungus, gained in zip(self.fungus_list, gains):
+            fungus.add_cells(gained)
+
+    def retire_doomed(self, time: int, days: int, risk: float = viability.VIABILITY_RISK) -> List[str]:
+        """Retires the fungi the Climate kills on every day time through time + days - 1,
+            per viability.viable_species, so that they skip their turns; days should
+            reach the end of the run. Returns the names of every retired Fungus."""
+        self.retired |= ~viability.viable_species(self.species, self.climate, time, days, risk)
+        return [fungus.name for fungus, retired in zip(self.fungus_list, self.retired) if retired]
+
+    def macro_step(self, time: int, days: int):
+        """Advances the Environment over days time through time + days - 1 in one
+            operation if its engine has a macro_step, otherwise day by day. None of
+            those days may be an expansion day."""
+        macro_step = getattr(self.engine, "macro_step", None)
+        if macro_step is None:
+            for day in range(time, time + days):
+                self.update(day)
+        else:
+            macro_step(self, time, days)
+
+    def fork(self, split_random: bool = True) -> "Environment":
+        """Returns an independent copy of the Environment. With split_random the copy
+            draws from a new random stream spawned from this one; otherwise from a
+            copy of this one's, so that both go on to draw the same numbers."""
+        environment = Environment.__new__(Environment)
+        environment.expansion_resolution = self.expansion_resolution
+        environment.engine = self.engine
+        environment.species = self.species
+        environment.retired = self.retired.copy()
+        environment.rng = self.rng.spawn(1)[0] if split_random else copy.deepcopy(self.rng)
+        environment.climate = self.climate.copy(environment.rng)
+        environment.grid = self.grid.copy(environment.rng)
+        environment.fungus_list = [fungus.copy(environment.grid, environment.rng) for fungus in self.fungus_list]
+        return environment
+
+    def is_idle(self) -> bool:
+        """Returns whether the current Climate kills every Fungus outright."""
+        return all(fungus.climate_death(self.climate) for fungus in self.fungus_list)
+
+    def fast_forward(self, time: int, max_days: int) -> int:
+        """Skips the run of days starting at time on which the Climate kills 
+            every Fungus outright, up to max_days, then simulates the day that ends
+            the run with the weather the projection drew for it, so that the
+            weather is not drawn again. The weather is projected a chunk at a time,
+            each twice the last while the run goes on, so a short run costs a few
+            days of weather however long the World has left. Returns the number
+            of days advanced."""
+        skipped = 0
+        chunk = utilities.DAYS_UNTIL_EXPANSION
+        while skipped < max_days:
+            days = min(chunk, max_days - skipped)
+            temperatures, moistures = self.climate.project_days(time + skipped, days)
+            # Days on which at least one Fungus gets to eat, expand or resurrect
+            active = species.survivable_days(self.species, temperatures, moistures).any(axis=0)
+            idle = int(np.argmax(active)) if active.any() else days
+            if idle > 0:
+                # Apply the idle part of the chunk at once
+                self.climate.set_climate_state(temperatures[idle - 1], moistures[idle - 1])
+                self.grid.add_value_everywhere(self.climate.get_inbound_biomass_total(time + skipped, idle))
+                for fungus in self.fungus_list:
+                    fungus.skip_days(idle)
+                skipped += idle
+            if idle < days:
+                self.climate.hold_next_day(temperatures[idle], moistures[idle])
+                self.update(time + skipped)
+                return skipped + 1
+            chunk = min(2 * chunk, FAST_FORWARD_MAX_CHUNK)
+        return skipped
 
 
     # GETTER methods
@@ -75,3 +275,7 @@ class Environment:
         """Return's a list of Fungus in the Environment."""
         return self.fungus_list
 
+    def get_species(self) -> np.ndarray:
+        """Return's the species records of the Environment's Fungus, in turn order."""
+        return self.species
+
@@ -0,0 +1,84 @@
+"""Long-horizon runs: the climate forcing repeats every year, and after a few years
+    biomass and coverage settle into a seasonal cycle. Once year-over-year aggregates
+    agree, the rest of the run is extrapolated from the last simulated year."""
+import numpy as np
+from typing import Dict, List
+
+import metrics
+import utilities
+from world import World
+
+YEAR = 365 # period of the climate forcing in days
+STABLE_YEARS = 2 # consecutive year-over-year agreements needed
+# Aggregates of the model state compared from year to year; the weather itself
+# (temperature, moisture) is a stationary random process and is not compared
+STEADY_STATE_METRICS = ["average_biomass", "fungal_cells", "substrate_eaten_today"]
+
+
+def is_steady(aggregates: List[List[float]], tolerance: float = utilities.STEADY_STATE_TOLERANCE,
+            stable_years: int = STABLE_YEARS) -> bool:
+    """Returns whether the last stable_years + 1 years of annual aggregates (one row
+        per year) each differ from the year before by at most tolerance times the
+        largest annual value seen."""
+    if len(aggregates) < stable_years + 1:
+        return False
+    history = np.array(aggregates)
+    scale = np.maximum(np.abs(history).max(axis=0), 1e-12)
+    changes = np.abs(np.diff(history[-(stable_years + 1):], axis=0))
+    return bool(np.all(changes <= tolerance * scale))
+
+def run_long_horizon(world: World,
+                    days: int,
+                    metric_names: List[str],
+                    every: int = 1,
+                    tolerance: float = utilities.STEADY_STATE_TOLERANCE,
+                    stable_years: int = STABLE_YEARS,
+                    fast_forward: bool = True,
+                    macro_step: bool = False) -> Dict[str, object]:
+    """Runs world for days like metrics.record_series, a year at a time, until the
+        annual aggregates are steady; the samples of the remaining years are then
+        the last simulated year repeated, with cumulative metrics carrying on at
+        that year's rate. Returns the series under "series" with "extrapolated",
+        "simulated_days" and "steady_from_day" saying whether and where that happened."""
+    for name in metric_names:
+        if name not in metrics.METRICS:
+            raise KeyError(f"Unknown metric: {name}")
+    world.check_run_length(days)
+    sampled_names = list(dict.fromkeys(metric_names + STEADY_STATE_METRICS))
+    times = metrics.sample_times(days, every)
+    values = {name: np.zeros(len(times)) for name in sampled_names}
+    aggregates = []
+    i = 0
+    while i < len(times):
+        # Sample every day of this year that falls in the run
+        year_end = (times[i] // YEAR + 1) * YEAR
+        j = int(np.searchsorted(times, year_end))
+        for k in range(i, j):
+            for name in sampled_names:
+                values[name][k] = metrics.METRICS[name](world)
+            world.run(min(every, days - times[k]), fast_forward=fast_forward, macro_step=macro_step)
+        if world.get_time() >= year_end:
+            aggregates.append([values[name][i:j].mean() for name in STEADY_STATE_METRICS])
+        i = j
+        if i < len(times) and is_steady(aggregates, tolerance, stable_years):
+            break
+
+    series = {name: values[name] for name in metric_names}
+    if i == len(times):
+        return {"days": times, "series": series, "extrapolated": False,
+                "simulated_days": world.get_time(), "steady_from_day": None}
+    # Map every remaining sample onto the same day of the last simulated year
+    last_start = year_end - YEAR
+    simulated = times[:i]
+    remaining = times[i:]
+    cycles = (remaining - last_start) // YEAR
+    reference = remaining - cycles * YEAR
+    for name in metric_names:
+        repeated = np.interp(reference, simulated, values[name][:i])
+        if name in metrics.CUMULATIVE_METRICS:
+            # Carry on at the rate of the last year
+            increment = metrics.METRICS[name](world) - np.interp(world.get_time() - YEAR, simulated, values[name][:i])
+            repeated = repeated + cycles * increment
+        series[name][i:] = repeated
+    return {"days": times, "series": series, "extrapolated": True,
+            "simulated_days": world.get_time(), "steady_from_day": int(times[i])}
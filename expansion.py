@@ -0,0 +1,68 @@
+"""Array-based expansion: every expanding cell of every species picks a neighbor in
+    a few whole-array passes, with collisions between claims resolved in bulk."""
+import numpy as np
+from typing import List, Tuple
+
+# The neighbors of a cell in the order Grid.get_neighbors lists them
+NEIGHBOR_OFFSETS = np.array([(row, col) for row in range(-1, 2) for col in range(-1, 2)
+                            if not (row == 0 and col == 0)])
+# How claims on the same cell by different species are settled:
+#   coexist - every species keeps its claims, species share cells
+#   ranking - only cells no species occupies can be claimed; the higher-ranked species wins
+#   random  - as ranking, but the winner of each contested cell is drawn at random
+RESOLUTIONS = ("coexist", "ranking", "random")
+
+
+def choose_targets(occupancy: np.ndarray, owners: np.ndarray, rows: np.ndarray, cols: np.ndarray,
+                rolls: np.ndarray, exclusive: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Picks the neighbor each expanding cell claims: the int(roll * k)-th of its k
+        eligible neighbors, i.e. those in the Grid that its own species (or, if
+        exclusive, any species) doesn't occupy. Returns the claiming cells and the
+        flat index of their targets. occupancy is the Grid's occupancy bitmask."""
+    num_rows, num_cols = occupancy.shape
+    target_rows = rows[:, None] + NEIGHBOR_OFFSETS[:, 0]
+    target_cols = cols[:, None] + NEIGHBOR_OFFSETS[:, 1]
+    inside = (target_rows >= 0) & (target_rows < num_rows) & (target_cols >= 0) & (target_cols < num_cols)
+    clipped_rows = np.clip(target_rows, 0, num_rows - 1)
+    clipped_cols = np.clip(target_cols, 0, num_cols - 1)
+    neighbor_occupancy = occupancy[clipped_rows, clipped_cols]
+    if exclusive:
+        taken = neighbor_occupancy != 0
+    else:
+        taken = (neighbor_occupancy >> owners[:, None].astype(np.uint16)) & 1 == 1
+    eligible = inside & ~taken
+    counts = eligible.sum(axis=1)
+    # Position of the chosen neighbor among the eligible ones, then its column
+    choice = np.floor(rolls * counts).astype(int)
+    chosen = np.argmax(eligible & (np.cumsum(eligible, axis=1) == (choice + 1)[:, None]), axis=1)
+    claiming = np.flatnonzero(counts > 0)
+    targets = target_rows[claiming, chosen[claiming]] * num_cols + target_cols[claiming, chosen[claiming]]
+    return claiming, targets
+
+def expand(occupancy: np.ndarray, num_species: int, owners: np.ndarray, rows: np.ndarray,
+        cols: np.ndarray, rolls: np.ndarray, resolution: str = "coexist",
+        rng: np.random.Generator = None) -> List[List[int]]:
+    """Returns the cells (x * columns + y) each of num_species species gains on an expansion day, given
+        the Grid's occupancy bitmask. owners, rows, cols and rolls describe the
+        expanding cells, species by species in turn order and each species' cells in
+        its own order; species are ranked by turn order. Gains are listed in the
+        order of the cells that claimed them."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown expansion resolution: {resolution}")
+    claiming, targets = choose_targets(occupancy, owners, rows, cols, rolls, resolution != "coexist")
+    claimants = owners[claiming]
+    # Several cells of one species claiming the same target count as one claim
+    _, first = np.unique(claimants * occupancy.size + targets, return_index=True)
+    first = np.sort(first)
+    claimants, targets = claimants[first], targets[first]
+    if resolution != "coexist" and len(targets) > 0:
+        # Order the claims on each target by priority and keep the first
+        priority = claimants if resolution == "ranking" else -rng.random(len(targets))
+        order = np.lexsort((priority, targets))
+        winners = order[np.r_[True, targets[order][1:] != targets[order][:-1]]]
+        kept = np.sort(winners)
+        claimants, targets = claimants[kept], targets[kept]
+    gains = [[] for _ in range(num_species)]
+    for owner, target in zip(claimants.tolist(), targets.tolist()):
+        gains[owner].append(target)
+    return gains
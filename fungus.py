@@ -1,11 +1,15 @@
 import numpy as np
 import utilities
-import random
 from grid import Grid
 from climate import Climate
 
 class Fungus:
     """Fungus class for simulating a particular species of Fungus and its lifecycle"""
+
+    __slots__ = ("name", "decay_regression_constants", "functioning_temperatures", "functioning_moistures",
+                "hyphal_growth_rate", "hyphal_density", "competitive_ranking", "expansion_threshold",
+                "initial_locations", "cells", "dead_cells", "frontier", "frontier_rolls", "rng",
+                "grid", "species_index", "num_cols", "day", "amount_eaten_today", "max_consumed")
     
     def __init__(self, 
     initial_locations: list,
@@ -15,7 +19,8 @@ class Fungus:
     functioning_moistures: tuple,
     hyphal_growth_rate: float,
     hyphal_density: float,
-    competitive_ranking: float) -> None:
+    competitive_ranking: float,
+    expansion_threshold: float) -> None:
 
         #initialize values from constructor
         self.name = name
@@ -25,34 +30,46 @@ class Fungus:
         self.hyphal_growth_rate = hyphal_growth_rate
         self.hyphal_density = hyphal_density
         self.competitive_ranking = competitive_ranking
-
-        self.locations = self.__load_initial_locations(initial_locations)
-
-        
-        self.dead_locations =[]
+        self.expansion_threshold = expansion_threshold
+
+        #Cells are kept as flat indices (row * columns + col) once the Fungus is
+        #placed on a Grid; until then only its initial (x, y) locations are known
+        self.initial_locations = list(initial_locations)
+        self.num_cols = None
+        self.cells = {}
+        self.dead_cells = set()
+        # Cells that will expand today and the roll that picks their neighbor,
+        # handed to the Environment which expands every species at once
+        self.frontier = []
+        self.frontier_rolls = []
+        # Random number generator, replaced by the Environment's shared one
+        self.rng = np.random.default_rng()
+        # The Grid whose occupancy index follows this Fungus, and its species there
+        self.grid = None
+        self.species_index = 0
         self.day = 0
         self.amount_eaten_today = 0
         self.max_consumed = 0
         
 
-    def __load_initial_locations(self, initial_locations: tuple) -> dict:
+    def __load_initial_locations(self, initial_locations: list) -> dict:
         """Loads the initial locations of the Fungus in the grid"""
 
-        #Dictionary to hold the locations of the grid
-        #if they key exits, the Fungus is at that location
-        #maps location to the amount of substrate the fungus has consumed at that location
-        locations = {}
-        for location in initial_locations:
+        #Dictionary to hold the cells of the grid
+        #if they key exits, the Fungus is at that cell
+        #maps cell to the amount of substrate the fungus has consumed at that cell
+        cells = {}
+        for row, col in initial_locations:
             #Initial substrate consumption is 0
-            locations[location] = 0
+            cells[row * self.num_cols + col] = 0
 
-        return locations
+        return cells
 
-    def __add_location(self, location:tuple) -> None:
+    def __add_location(self, cell: int) -> None:
         """Function to add Fungus location on Grid"""
 
-        #When a fungus first joins a location, it has consumed no substrate
-        self.locations[location] = 0 
+        #When a fungus first joins a cell, it has consumed no substrate
+        self.cells[cell] = 0 
 
     def __decay_rate(self, temperature:float) -> float:
         """Gives the percentage of mass the fungus consumes"""
@@ -68,35 +85,29 @@ class Fungus:
 
         return abs((moisture - abs(optimal_moisture - moisture)) / optimal_moisture)
 
-    def __probability_of_expansion(self) -> bool:
-        """Determines whether the fungus actually expands"""
+    def __probability_of_expansion(self, probability: float) -> bool:
+        """Determines whether the fungus actually expands given a uniform roll"""
 
         #The probability of expansion is based on a weighted random factor based on the hyphal growth rate
-        probability = np.random.rand()
-        if probability < utilities.probability_thresholds[self.name]:
+        if probability < self.expansion_threshold:
             return True
         else:
             return False
 
-    def __expand(self, grid: Grid, location: tuple, eligible_neighbors:tuple) -> tuple:
-        """Hadles the expansion of the fungus through the grid"""
-        if self.__probability_of_expansion():
-            
-            #from the eligible neighbors, select one at random
-            expansion = random.choice(eligible_neighbors)
-            return expansion
-            
-        return None
-
-    def __kill(self, location: tuple) -> None:
-        """Kills the fungus at a specified location"""
-        self.dead_locations.append(location)
+    def __kill(self, cell: int) -> None:
+        """Kills the fungus at a specified cell"""
+        self.dead_cells.add(cell)
 
     def __kill_all(self) -> None:
         """Kill every fungus location"""
-        for key in self.locations.keys():
-            self.__kill(key)
-        
+        self.dead_cells.update(self.cells)
+        self.__record_deaths(list(self.cells), True)
+
+    def __record_deaths(self, cells: list, dead) -> None:
+        """Tells the Grid's occupancy index which cells died or came back"""
+        if self.grid is not None and len(cells) > 0:
+            self.grid.set_occupants_dead(cells, self.species_index, dead)
+
 
     def climate_death(self, climate: Climate) -> bool:
         """Determines if the climate has killed the fungus"""
@@ -104,94 +115,120 @@ class Fungus:
         temperature = climate.get_climate_temperature()
         moisture = climate.get_climate_moisture()
 
+        min_temperature, max_temperature, min_moisture, max_moisture = self.__survival_window()
+
+        #A series of booleans to determine if climate death occurs
+        max_temp_exceeded = temperature > max_temperature
+        min_temp_below = temperature < min_temperature
+        max_moisture_exceeded = moisture > max_moisture
+        min_moisture_below =  moisture < min_moisture
+
+        return max_temp_exceeded or min_temp_below or max_moisture_exceeded or min_moisture_below
+
+    def __survival_window(self) -> tuple:
+        """Returns the (min temperature, max temperature, min moisture, max moisture)
+            the fungus can live through, widened by the threshold multipliers"""
+
         #unpack the maximum and minimum values of the temperatures
         _, max_fungus_temperature, min_fungus_temperature = self.functioning_temperatures
         optimal_moisture, moisture_width = self.functioning_moistures
 
-        #A series of booleans to determine if climate death occurs
-        max_temp_exceeded = temperature > (max_fungus_temperature + (utilities.TEMPERATURE_THRESHOLD_MULTIPLIER * max_fungus_temperature))
-        min_temp_below = temperature < (min_fungus_temperature - (utilities.TEMPERATURE_THRESHOLD_MULTIPLIER * min_fungus_temperature))
-        max_moisture_exceeded = moisture > (optimal_moisture + (utilities.MOISTURE_THRESHOLD_MULTIPLIER * moisture_width))
-        min_moisture_below =  moisture < (optimal_moisture - (utilities.MOISTURE_THRESHOLD_MULTIPLIER * moisture_width))
+        return (min_fungus_temperature - (utilities.TEMPERATURE_THRESHOLD_MULTIPLIER * min_fungus_temperature),
+                max_fungus_temperature + (utilities.TEMPERATURE_THRESHOLD_MULTIPLIER * max_fungus_temperature),
+                optimal_moisture - (utilities.MOISTURE_THRESHOLD_MULTIPLIER * moisture_width),
+                optimal_moisture + (utilities.MOISTURE_THRESHOLD_MULTIPLIER * moisture_width))
 
-        return max_temp_exceeded or min_temp_below or max_moisture_exceeded or min_moisture_below
-        
     def __consume_substrate(self, grid: Grid, climate: Climate) -> None:
         """Consume substrate at the current Fungus locations"""
 
         temperature = climate.get_climate_temperature()
         moisture = climate.get_climate_moisture()
         
-        expansions = []
+        climate_killed = self.climate_death(climate)
+        #The share of a cell's original substrate eaten today is the same for every cell
+        consumption_rate = self.__decay_rate(temperature) * self.__moisture_multiplier(moisture)
+        #Flat views of the Grid's biomass, indexed by cell
+        original_biomass = grid.get_original_biomass_by_cell()
+        current_biomass = grid.get_current_biomass_by_cell()
+        
         killed =[]
         resurrected = []
+        #Today's random numbers in one block: a resurrection, expansion and neighbor roll per cell
+        rolls = self.rng.random((len(self.cells), 3)).tolist()
         #Loop over the keys
-        for key in self.locations.keys():
+        for key, (resurrection_roll, expansion_roll, neighbor_roll) in zip(self.cells.keys(), rolls):
             #can't operate on dead things
-            if key in self.dead_locations:
+            if key in self.dead_cells:
                 #If the climate improves, see if any cells can be resurrected
-                if self.climate_death(climate) == False:
-                    if (np.random.rand() >= 0.6):
+                if climate_killed == False:
+                    if (resurrection_roll >= 0.6):
                         resurrected.append(key)
                         pass
                 else:
                     continue
-            original_substrate = grid.get_original_biomass_at_location(key)
-            current_substrate = grid.get_current_biomass_at_location(key)
+            original_substrate = float(original_biomass[key])
+            current_substrate = float(current_biomass[key])
 
-            consumed_substrate = original_substrate * (self.__decay_rate(temperature) * self.__moisture_multiplier(moisture))
+            consumed_substrate = original_substrate * consumption_rate
 
             #If there is enough substrate, eat
             if consumed_substrate < current_substrate:
                 self.amount_eaten_today += consumed_substrate
                 new_substrate = current_substrate - consumed_substrate
                 
-                self.locations[key] = self.locations[key] + consumed_substrate
-                if self.locations[key] > self.max_consumed:
-                    self.max_consumed = self.locations[key]
-                grid.set_current_biomass(key, new_substrate)
-
-                #Always trying to expand
-                
-                neighbors = grid.get_neighbors(key)
+                self.cells[key] = self.cells[key] + consumed_substrate
+                if self.cells[key] > self.max_consumed:
+                    self.max_consumed = self.cells[key]
+                current_biomass[key] = new_substrate
 
-                #Make sure we are not already there
-                eligible_neighbors = [x for x in neighbors if x not in self.locations]
-
-                #from the eligible neighbors, select one at random
-                if len(eligible_neighbors) != 0 and self.day % utilities.DAYS_UNTIL_EXPANSION == 0:
-                            
-                    expansion = self.__expand(grid, key, eligible_neighbors)
-                    if expansion != None:
-                     
-                        expansions.append(expansion)
+                #Always trying to expand; the neighbor is picked by the Environment
+                if self.day % utilities.DAYS_UNTIL_EXPANSION == 0 and self.__probability_of_expansion(expansion_roll):
+                    self.frontier.append(key)
+                    self.frontier_rolls.append(neighbor_roll)
 
             #if there is not enough food, the fungus begins to die
             else:
                 killed.append(key)
 
-        for location in expansions:
-            self.__add_location(location)
-
         for died in killed:
             self.__kill(died)
+        self.__record_deaths(killed, True)
         
         for risen in resurrected:
-            self.dead_locations.remove(risen)
+            self.dead_cells.discard(risen)
+        self.__record_deaths(resurrected, False)
     
+    @property
+    def locations(self) -> dict:
+        """The Fungus' locations as {(x, y): amount of substrate consumed there}"""
+        if self.num_cols is None:
+            return {location: 0 for location in self.initial_locations}
+        return {divmod(cell, self.num_cols): consumed for cell, consumed in self.cells.items()}
+
+    @property
+    def dead_locations(self) -> set:
+        """The (x, y) locations where the Fungus is dead"""
+        if self.num_cols is None:
+            return set()
+        return {divmod(cell, self.num_cols) for cell in self.dead_cells}
+
+    def get_cells(self) -> dict:
+        """Returns the Fungus' cells as {flat cell index: amount of substrate consumed there}"""
+        return self.cells
+
     def get_number_of_fungal_cells(self) -> int:
         """Returns the number of cells the fugnus took over"""
-        return len(self.locations)
+        return len(self.cells) if self.num_cols is not None else len(self.initial_locations)
     
     def get_number_of_deaths(self) -> int:
         """Return the number of fungal cells that died"""
-        return len(self.dead_locations)
+        return len(self.dead_cells)
 
     def get_total_amount_of_substrate_eaten(self) -> float:
         """Returns the total amount that the fungus has eaten"""
         amount = 0
-        for key in self.locations:
-            amount += self.locations[key]
+        for consumed in self.cells.values():
+            amount += consumed
         return amount
     
     def get_amount_of_substrate_eaten_today(self) -> float:
@@ -206,11 +243,88 @@ class Fungus:
         """returns the maximum amount of food consumed"""
         return self.max_consumed
 
+    def get_frontier(self) -> tuple:
+        """Returns the cells expanding today and their neighbor rolls"""
+        return self.frontier, self.frontier_rolls
+
+    def add_cells(self, cells: list) -> None:
+        """Adds the cells the Fungus expanded into"""
+        for cell in cells:
+            self.__add_location(cell)
+        if self.grid is not None and len(cells) > 0:
+            self.grid.add_occupants(cells, self.species_index)
+
+    def skip_days(self, days: int) -> None:
+        """Advances the Fungus through days on which the climate kills it outright"""
+
+        #Same outcome as that many turns in a row where climate_death is True
+        self.day += days
+        self.amount_eaten_today = 0
+        self.__kill_all()
+
+    def place_on_grid(self, grid: Grid, species_index: int) -> None:
+        """Records the Fungus as species species_index in grid's occupancy index,
+            which then follows its colonizations, deaths and resurrections"""
+        if self.num_cols is None:
+            self.num_cols = grid.num_cols
+            self.cells = self.__load_initial_locations(self.initial_locations)
+        self.grid = grid
+        self.species_index = species_index
+        keys = list(self.cells)
+        if len(keys) > 0:
+            grid.add_occupants(keys, species_index)
+            self.__record_deaths(keys, [key in self.dead_cells for key in keys])
+
+    def copy(self, grid: Grid, rng: np.random.Generator) -> "Fungus":
+        """Returns an independent copy of the Fungus placed on grid, a copy of its
+            Grid, and drawing from rng"""
+        fungus = Fungus.__new__(Fungus)
+        for name in Fungus.__slots__:
+            setattr(fungus, name, getattr(self, name))
+        fungus.initial_locations = list(self.initial_locations)
+        fungus.cells = self.cells.copy()
+        fungus.dead_cells = set(self.dead_cells)
+        fungus.frontier = list(self.frontier)
+        fungus.frontier_rolls = list(self.frontier_rolls)
+        fungus.grid = grid if self.grid is not None else None
+        fungus.rng = rng
+        return fungus
+
+    def set_random_generator(self, rng: np.random.Generator) -> None:
+        """Sets the random number generator the Fungus draws from"""
+        self.rng = rng
+
+    def get_block_state(self) -> tuple:
+        """Returns the Fungus cells with arrays of the amount consumed and
+            whether the cell is dead, for advancing many days at once"""
+        keys = list(self.cells)
+        consumed = np.fromiter(self.cells.values(), dtype=float, count=len(keys))
+        dead = np.array([key in self.dead_cells for key in keys], dtype=bool)
+        return keys, consumed, dead
+
+    def set_block_state(self, days: int, keys: list, consumed: np.ndarray, dead: np.ndarray,
+                        max_consumed: float, amount_eaten_today: float) -> None:
+        """Stores the outcome of advancing the Fungus days at once, the
+            counterpart of get_block_state"""
+        self.day += days
+        self.amount_eaten_today = amount_eaten_today
+        self.max_consumed = max(self.max_consumed, max_consumed)
+        for key, amount in zip(keys, consumed.tolist()):
+            self.cells[key] = amount
+        self.dead_cells = {key for key, is_dead in zip(keys, dead) if is_dead}
+        self.__record_deaths(keys, dead)
+
     def turn(self, grid:Grid, climate:Climate) -> None:
         """Executes a turn on a Fungus"""
 
+        #A Fungus used on its own is placed on the Grid it first takes a turn on
+        if self.grid is None:
+            self.place_on_grid(grid, self.species_index)
+
         self.day += 1
         self.amount_eaten_today = 0
+        self.frontier = []
+        self.frontier_rolls = []
         
         #check to see if the Fungus dies outright
         if self.climate_death(climate):
@@ -218,257 +332,3 @@ class Fungus:
         
         #Check if it gets to eat or resurrect
         self.__consume_substrate(grid, climate)
-
-
-#Fungi implementation classes 
-class Fungus1(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Phellinus robiniae", 
-                decay_regression_constants = (-0.16844262333333337, 0.016441256833333334), 
-                functioning_temperatures = (29.45,32.3,20.25), 
-                functioning_moistures = (-0.625, 1.505), 
-                hyphal_growth_rate = 2.22, 
-                hyphal_density = 0.095,
-                competitive_ranking = 0.16216216216216218) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus2(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Phellinus hartigii", 
-                decay_regression_constants = (-0.0759836070000001, 0.01030737708333334), 
-                functioning_temperatures = (19.1,28.2,9.6), 
-                functioning_moistures = (-0.65,1.57), 
-                hyphal_growth_rate = 1.54, 
-                hyphal_density = 1.8,
-                competitive_ranking = 0.24324324324324326) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus3(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Phellinus gilvus", 
-                decay_regression_constants = (-0.22144808700000043, 0.025232240416666694), 
-                functioning_temperatures = (31.5,35.3,16.7), 
-                functioning_moistures = (-0.06,1.4), 
-                hyphal_growth_rate = 4.04, 
-                hyphal_density = 0.03,
-                competitive_ranking = 0.21621621621621623) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus4(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Armillaria tabescens", 
-                decay_regression_constants = (-0.06484426300000005, 0.0067759563333333345), 
-                functioning_temperatures = (26.15,32.7,15.7), 
-                functioning_moistures = (-0.445,2.375), 
-                hyphal_growth_rate = 0.785, 
-                hyphal_density = 0.35,
-                competitive_ranking = 0.06756756756756757) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus5(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Porodisculus pendulus", 
-                decay_regression_constants = (0.006557377666666621, 0.001195355166666671), 
-                functioning_temperatures = (26.4, 31.7, 16.7), 
-                functioning_moistures = (-0.64, 1.24), 
-                hyphal_growth_rate = 4.06, 
-                hyphal_density = 0.32,
-                competitive_ranking = 0.21621621621621623) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus6(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Schizophyllum commune", 
-                decay_regression_constants = (-0.04494535400000012, 0.0059904370833333345), 
-                functioning_temperatures = (32.55, 36.4, 19.75), 
-                functioning_moistures = (-0.775, 2.26), 
-                hyphal_growth_rate = 1.785, 
-                hyphal_density = 0.56,
-                competitive_ranking = 0.391891891891891915) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus7(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Hyphodontia crustosa", 
-                decay_regression_constants = (-0.016475410333333527, 0.006372950833333347), 
-                functioning_temperatures = (23.2,25.6, 30.3), 
-                functioning_moistures = (-0.23, 1.19), 
-                hyphal_growth_rate = 1.96, 
-                hyphal_density = 0.12,
-                competitive_ranking = 0.32432432432432434) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus8(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Phlebia rufa", 
-                decay_regression_constants = (0.09685792299999989, 0.0029371584999999976), 
-                functioning_temperatures = (27.15, 30.85, 12.7), 
-                functioning_moistures = (-0.475, 1.235), 
-                hyphal_growth_rate = 8.63, 
-                hyphal_density = 0.205,
-                competitive_ranking = 0.97297297297297295) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus9(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Hyphoderma setigerum", 
-                decay_regression_constants = (-0.10240437133333334, 0.011031420750000007), 
-                functioning_temperatures = (26.75, 29.05, 17.95), 
-                functioning_moistures = (-0.41, 1.285), 
-                hyphal_growth_rate = 4.405, 
-                hyphal_density = 0.06,
-                competitive_ranking =  0.44594594594594592) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus10(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Laetiporus conifericola", 
-                decay_regression_constants = (0.024398907333333168, 0.00362704916666667), 
-                functioning_temperatures = (27.1, 29.6, 17.5), 
-                functioning_moistures = (-0.56, 1.22), 
-                hyphal_growth_rate = 5.16, 
-                hyphal_density = 0.04,
-                competitive_ranking = 0.08108108108108109) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus11(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Tyromyces chioneus", 
-                decay_regression_constants = (-0.11937158433333334, 0.01619535516666666), 
-                functioning_temperatures = (30.6, 33.6, 19), 
-                functioning_moistures = (-0.22, 1.19), 
-                hyphal_growth_rate = 3.88, 
-                hyphal_density = 0.06,
-                competitive_ranking = 0.6486486486486487 ) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus12(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Lentinus crinitus", 
-                decay_regression_constants = (-0.05841530033333329, 0.008565573749999996), 
-                functioning_temperatures = (33.8, 40.2, 22.4), 
-                functioning_moistures = (-0.31, 1.55), 
-                hyphal_growth_rate = 6.38, 
-                hyphal_density = 0.05,
-                competitive_ranking = 0.32432432432432434) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus13(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Fomes fomentarius", 
-                decay_regression_constants = (-0.18691256833333292, 0.02515710383333332), 
-                functioning_temperatures = (27.3, 30.1, 20.8), 
-                functioning_moistures = (-0.24, 1.19), 
-                hyphal_growth_rate = 4.71, 
-                hyphal_density = 0.002375,
-                competitive_ranking = 0.08108108108108109) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
-
-class Fungus14(Fungus):
-    def __init__(self, initial_locations: list, 
-                name = "Xylobolus subpileatus", 
-                decay_regression_constants = (-0.02008196733333318, 0.0043579234999999925), 
-                functioning_temperatures = (22.2, 33.6, 5.1), 
-                functioning_moistures = (-0.88, 4.96), 
-                hyphal_growth_rate = 0.77, 
-                hyphal_density = 1.74,
-                competitive_ranking = 0.24324324324324326) -> None:
-        super().__init__(initial_locations, 
-                name, 
-                decay_regression_constants, 
-                functioning_temperatures, 
-                functioning_moistures, 
-                hyphal_growth_rate, 
-                hyphal_density,
-                competitive_ranking)
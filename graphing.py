@@ -1,65 +1,53 @@
 import matplotlib.pyplot as plt 
 import matplotlib.colors as mcolors
 import numpy as np
-from typing import List
+import tempfile
+from typing import Dict, List, Tuple
 from matplotlib.lines import Line2D
 
+import batch
+import biodiversity
+import history
+import metrics
+import species
+import tournament
+from climate import CLIMATE_NAMES
+from series_statistics import SeriesStatistics
 from world import World
 
 
-CLIMATE_NAMES = ["Rainforest", "Tundra", "Grassland", "Shrubland",  
-                "TemperateDeciduousForest", "ConiferousForest",
-                "Desert"]
-
-FUNGUS_NAMES = ["Phellinus robiniae",
-                    "Phellinus hartigii",
-                    "Phellinus gilvus",
-                    "Armillaria tabescens",
-                    "Porodisculus pendulus",
-                    "Schizophyllum commune",
-                    "Hyphodontia crustosa",
-                    "Phlebia rufa",
-                    "Hyphoderma setigerum",
-                    "Laetiporus conifericola",
-                    "Tyromyces chioneus",
-                    "Lentinus crinitus",
-                    "Fomes fomentarius",
-                    "Xylobolus subpileatus"]
+# Every species in the registry, in table order
+FUNGUS_NAMES = species.species_names()
 COLLECTION_INTERVAL = 10
 YEARS = 3
+BAND = (0.05, 0.95) # quantiles of the trials shaded around a mean
+
+def ensemble_statistics(climate: str, fungi: List[str], trials: int, time_limit: int,
+                        metric: str) -> SeriesStatistics:
+    """Runs trials Worlds of a climate and streams a metric's daily series from each
+        into a SeriesStatistics, so no trial's series is kept."""
+    statistics = SeriesStatistics(len(metrics.sample_times(time_limit)))
+    for n in range(trials):
+        world = World(climate, (100,100), fungi)
+        statistics.add(metrics.record_series(world, time_limit, [metric])[metric])
+    return statistics
+
+def plot_series_statistics(days: np.ndarray, statistics: SeriesStatistics, label: str,
+                        axis=None, band: Tuple[float, float] = BAND) -> None:
+    """Plots the mean of a SeriesStatistics with the band between the given quantiles
+        of the trials shaded around it."""
+    axis = axis if axis is not None else plt.gca()
+    line, = axis.plot(days, statistics.get_mean(), label=label)
+    if statistics.get_count() > 1:
+        lower, upper = statistics.get_band(*band)
+        axis.fill_between(days, lower, upper, color=line.get_color(), alpha=0.25)
 
 def total_food_eaten_over_time(climates: List[str], fungi: List[str], 
                         trials: int, time_limit: int):
     """Shows a graph of average food eaten by fungi over time for each climate after running the trials."""
-    array_length = time_limit 
     for climate in climates:
-        # Arrays for graphing
-        average_times = np.zeros(array_length)
-        average_biomass_eaten = np.zeros(array_length)
-        for n in range(trials):
-            # Arrays for holding the values
-            times = np.zeros(array_length)
-            biomasses = np.zeros(array_length)
-            # Make a World and run it for a time
-            world = World(climate, (100,100), fungi)
-            # Loop through stuff
-            for i in range(time_limit):
-                time = world.get_time() 
-                times[time] = time
-                total_food_eaten = 0
-                for fungus in world.get_environment().get_fungi_list():
-                    total_food_eaten += fungus.get_total_amount_of_substrate_eaten()
-                biomasses[time] = total_food_eaten 
-                world.increment_time()
-            # Add arrays to average arrays
-            average_times += times
-            average_biomass_eaten += biomasses
-        # Average and plot
-        average_times /= trials
-        average_biomass_eaten /= trials
-        plt.plot(average_times, 
-                average_biomass_eaten, 
-                label=climate)
+        statistics = ensemble_statistics(climate, fungi, trials, time_limit, "total_substrate_eaten")
+        plot_series_statistics(metrics.sample_times(time_limit), statistics, climate)
     plt.title(f"Total biomass decomposed by fungi vs. Time for different climates \n(trials per climate: {trials}, number of fungi: {len(fungi)}")
     plt.legend()
     plt.xlabel("Time (days)")
@@ -69,32 +57,9 @@ def total_food_eaten_over_time(climates: List[str], fungi: List[str],
 def biomass_over_time(climates: List[str], fungi: List[str], 
                         trials: int, time_limit: int):
     """Shows a graph of average biomass over time for each climate after running the trials."""
-    array_length = time_limit 
     for climate in climates:
-        # Arrays for graphing
-        average_times = np.zeros(array_length)
-        average_biomass = np.zeros(array_length)
-        for n in range(trials):
-            # Arrays for holding the values
-            times = np.zeros(array_length)
-            biomasses = np.zeros(array_length)
-            # Make a World and run it for a time
-            world = World(climate, (100,100), fungi)
-            # Loop through stuff
-            for i in range(time_limit):
-                time = world.get_time() 
-                times[time] = time
-                biomasses[time] = world.get_environment().get_grid().average_biomass()
-                world.increment_time()
-            # Add arrays to average arrays
-            average_times += times
-            average_biomass += biomasses
-        # Average and plot
-        average_times /= trials
-        average_biomass /= trials
-        plt.plot(average_times, 
-                average_biomass, 
-                label=climate)
+        statistics = ensemble_statistics(climate, fungi, trials, time_limit, "average_biomass")
+        plot_series_statistics(metrics.sample_times(time_limit), statistics, climate)
     plt.title(f"Biomass vs. Time for different climates \n(trials per climate: trials {trials}, number of fungi: {len(fungi)}")
     plt.legend()
     plt.xlabel("Time (days)")
@@ -104,32 +69,9 @@ def biomass_over_time(climates: List[str], fungi: List[str],
 def temperature_over_time(climates: List[str], fungi: List[str], 
                         trials: int, time_limit: int):
     """Shows a graph of average temperature over time for each climate after running the trials."""
-    array_length = time_limit 
     for climate in climates:
-        # Arrays for graphing
-        average_times = np.zeros(array_length)
-        average_temps = np.zeros(array_length)
-        for n in range(trials):
-            # Arrays for holding the values
-            times = np.zeros(array_length)
-            temps = np.zeros(array_length)
-            # Make a World and run it for a time
-            world = World(climate, (100,100), fungi)
-            # Loop through stuff
-            for i in range(time_limit):
-                time = world.get_time() 
-                times[time] = time
-                temps[time] = world.get_environment().get_climate().get_climate_temperature()
-                world.increment_time()
-            # Add arrays to average arrays
-            average_times += times
-            average_temps += temps
-        # Average and plot
-        average_times /= trials
-        average_temps /= trials
-        plt.plot(average_times, 
-                average_temps, 
-                label=climate)
+        statistics = ensemble_statistics(climate, fungi, trials, time_limit, "temperature")
+        plot_series_statistics(metrics.sample_times(time_limit), statistics, climate)
     plt.title("Temperature vs. Time")
     plt.legend()
     plt.xlabel("Time (days)")
@@ -184,35 +126,9 @@ def food_eaten_by_day_per_fungi_vs_moisture(climate: str, fungi: List[str],
 def number_fungi_over_time_per_climate(climates: List[str], fungi: List[str],
                                             trials: int, time_limit: int):
     """Shows a graph of #fungi per climate over time."""
-    array_length = time_limit 
     for climate in climates:
-        # Arrays for graphing
-        average_times = np.zeros(array_length)
-        average_fungal_numbers = np.zeros(array_length)
-        for n in range(trials):
-            # Arrays for holding the values
-            times = np.zeros(array_length)
-            fungal_numbers = np.zeros(array_length)
-            # Make a World and run it for a time
-            world = World(climate, (100,100), fungi)
-            # Loop through stuff
-            for i in range(time_limit):
-                time = world.get_time() 
-                times[time] = time
-                total_fungi_at_time = 0
-                for f in world.get_environment().get_fungi_list():
-                    total_fungi_at_time += f.get_number_of_fungal_cells()
-                fungal_numbers[time] = total_fungi_at_time
-                world.increment_time()
-            # Add arrays to average arrays
-            average_times += times
-            average_fungal_numbers += fungal_numbers
-        # Average and plot
-        average_times /= trials
-        average_fungal_numbers /= trials
-        plt.plot(average_times, 
-                average_fungal_numbers, 
-                label=climate)
+        statistics = ensemble_statistics(climate, fungi, trials, time_limit, "fungal_cells")
+        plot_series_statistics(metrics.sample_times(time_limit), statistics, climate)
     plt.title(f"Number of Fungi vs. Time")
     plt.legend()
     plt.xlabel("Time (days)")
@@ -270,22 +186,16 @@ def fungal_bracket(climate: str, fungi: List[str],
     """Function for running the fungal activity bracket."""
     # Make a world and run it
     world = World(climate, (100, 100), fungi)
-    for i in range(time_limit):
-        world.increment_time()
-    fungus_one, fungus_two = world.get_environment().get_fungi_list()
+    world.run(time_limit)
     # Decide the winner based on total food eaten
-    if fungus_one.get_total_amount_of_substrate_eaten() >= fungus_two.get_amount_of_substrate_eaten_today():
-        return fungus_one.name
-    else:
-        return fungus_two.name
+    return tournament.matchup_winner(world)
 
 
 def generate_fungal_heat_map(climate: str, fungi: List[str], time_limit: int, axis) -> list:
     """Function for generating a fungal heat map"""
     # Make a world and run it
     world = World(climate, (100, 100), fungi)
-    for i in range(time_limit):
-        world.increment_time()
+    world.run(time_limit)
     fungus_list = world.get_environment().get_fungi_list()
     tab_colors = list(mcolors.TABLEAU_COLORS.keys())
     index =0 
@@ -323,6 +233,18 @@ def fungal_heat_map(climate: str, fungi: List[str], time_limit: int)->None:
     plt.show()
 
 
+def dominant_species_heat_map(world: World, axis) -> list:
+    """Colours every cell of world's Grid by its dominant living species, read
+        straight from the Grid's occupancy index. Returns the legend handles."""
+    fungus_list = world.get_environment().get_fungi_list()
+    tab_colors = list(mcolors.TABLEAU_COLORS.values())
+    colors = mcolors.ListedColormap(["white"] + [tab_colors[s % len(tab_colors)] for s in range(len(fungus_list))])
+    dominant = world.get_environment().get_grid().get_dominant_species()
+    axis.imshow(dominant.T + 1, cmap=colors, vmin=0, vmax=len(fungus_list), origin="lower", interpolation="nearest")
+    axis.set_xlabel(world.get_environment().get_climate().climate_type)
+    return [Line2D([0], [0], marker='o', label=fungus.name, color='w', markerfacecolor=tab_colors[s % len(tab_colors)],
+                    markersize=7) for s, fungus in enumerate(fungus_list)]
+
 def fungal_heat_map_all_climates(time_limit: int, file_name: str) -> None:
     """Generates a fungal heat map for all climates"""
     fig, ((ax1, ax2, ax3,ax4),(ax5,ax6, ax7,ax8)) = plt.subplots(2, 4, figsize = (10,5))
@@ -340,43 +262,122 @@ def fungal_heat_map_all_climates(time_limit: int, file_name: str) -> None:
     plt.show()
 
 def generate_fungal_heat_map_times(climate: str, fungi: List[str], time_limit: int, file_path:str) -> list:
-    """Function for generating a fungal heat map across a time specified"""
-    # Make a world and run it
+    """Function for generating a fungal heat map across a time specified, drawn from
+        a recorded history rather than a copy of every colony on every day"""
+    # Make a world and record it
     if fungi == None:
         fungi = FUNGUS_NAMES[0:10]
     fig, axis = plt.subplots()
     world = World(climate, (100, 100), fungi)
-    locations = []
-    for fungus in world.get_environment().get_fungi_list():
-        locations.append([])
-    for i in range(time_limit):
-        world.increment_time()
-        fungus_list = world.get_environment().get_fungi_list()
-        for count, fungus in enumerate(fungus_list):
-            locations[count].append(fungus.locations.copy())
-
-    
-    tab_colors = list(mcolors.TABLEAU_COLORS.keys())
     fungus_list = world.get_environment().get_fungi_list()
-    for i in range(time_limit):
-        index =0 
-        for count, fungus in enumerate(fungus_list):
-            max_consumed = fungus.get_max_consumed()
-            for location in locations[count][i]:
-                if max_consumed > 0:
-                    alpha_value = locations[count][i][location] / max_consumed
-                else:
-                    alpha_value = 0
-                rectangle = plt.Rectangle(location, 1, 1, fc=mcolors.to_rgba(tab_colors[index], alpha=alpha_value))
-                axis.add_patch(rectangle)
-            index +=1
-    
-        axis.set_xlim([0,100])
-        axis.set_ylim([0,100])
-        axis.axis("equal")
-        plt.xticks([])
-        plt.yticks([])
+    tab_colors = list(mcolors.TABLEAU_COLORS.keys())
+    with tempfile.TemporaryDirectory() as path:
+        recorded = history.record_history(world, time_limit, path)
+        max_consumed = [fungus.get_max_consumed() for fungus in fungus_list]
+        for i, state in enumerate(recorded.get_states(world.get_time() - time_limit + 1, world.get_time())):
+            for count, fungus in enumerate(fungus_list):
+                present = (state["occupancy"] & np.uint16(1 << count)) != 0
+                for location in zip(*np.nonzero(present)):
+                    if max_consumed[count] > 0:
+                        alpha_value = state["consumed"][count][location] / max_consumed[count]
+                    else:
+                        alpha_value = 0
+                    rectangle = plt.Rectangle(location, 1, 1, fc=mcolors.to_rgba(tab_colors[count % len(tab_colors)],
+                                                                                alpha=alpha_value))
+                    axis.add_patch(rectangle)
+
+            axis.set_xlim([0,100])
+            axis.set_ylim([0,100])
+            axis.axis("equal")
+            plt.xticks([])
+            plt.yticks([])
+
+            axis.set_xlabel(climate)
+            plt.savefig(f"{file_path}{i}.png", dpi= 150)
+
+def plot_win_rates(results: dict, file_name: str = None) -> None:
+    """Draws the win-rate matrix of each climate from tournament.run_tournament.
+        Saves to file_name if given."""
+    climates = results["climates"]
+    fig, axes = plt.subplots(1, len(climates), figsize=(5*len(climates), 5), squeeze=False)
+    for axis, climate, win_rates in zip(axes[0], climates, results["win_rates"]):
+        image = axis.imshow(win_rates, vmin=0, vmax=1, cmap="RdYlGn")
+        axis.set_xticks(range(len(results["species"])))
+        axis.set_yticks(range(len(results["species"])))
+        axis.set_xticklabels(results["species"], rotation=90, fontsize=6)
+        axis.set_yticklabels(results["species"], fontsize=6)
+        axis.set_title(climate)
+    fig.colorbar(image, ax=axes[0, -1], label="Win rate of row vs. column")
+    plt.tight_layout()
+    if file_name is not None:
+        plt.savefig(file_name, dpi=150)
+    else:
+        plt.show()
+
+def plot_biodiversity(experiment: dict, metric: str = "average_biomass", file_name: str = None) -> None:
+    """Draws the mean of a metric over the subsets of each size from
+        biodiversity.run_biodiversity_experiment, with a band of two standard errors."""
+    for size, (mean, error) in biodiversity.summarize_by_size(experiment, metric).items():
+        plt.plot(experiment["days"], mean, label=f"{size} species")
+        plt.fill_between(experiment["days"], mean - 2*error, mean + 2*error, alpha=0.25)
+    plt.title(f"{metric} vs. Time by number of species ({experiment['climate']})")
+    plt.legend()
+    plt.xlabel("Time (days)")
+    plt.ylabel(metric)
+    plt.tight_layout()
+    if file_name is not None:
+        plt.savefig(file_name, dpi=150)
+    else:
+        plt.show()
+
+def plot_adaptive_ensembles(ensembles: dict, metric: str, file_name: str = None,
+                            spread: bool = False) -> None:
+    """Draws the mean of a metric per climate from ensemble.run_adaptive_ensembles
+        with its confidence band, labelled with the trials each climate needed. With
+        spread, the band is instead the BAND quantiles of the trials themselves."""
+    for climate, result in ensembles.items():
+        label = f"{climate} (trials: {result['trials']})"
+        if spread:
+            plot_series_statistics(result["days"], result["statistics"][metric], label)
+            continue
+        mean = result["mean"][metric]
+        half_width = result["half_width"][metric]
+        plt.plot(result["days"], mean, label=label)
+        plt.fill_between(result["days"], mean - half_width, mean + half_width, alpha=0.25)
+    plt.title(f"{metric} vs. Time for different climates (adaptive trials)")
+    plt.legend()
+    plt.xlabel("Time (days)")
+    plt.ylabel(metric)
+    plt.tight_layout()
+    if file_name is not None:
+        plt.savefig(file_name, dpi=150)
+    else:
+        plt.show()
+
+def plot_scenario_results(scenario: dict, results: Dict[str, np.ndarray], file_name: str = None) -> None:
+    """Plots the trial mean of every metric of a scenario's results against time,
+        one line per climate and species set, e.g. straight from the shared memory of
+        batch.scenario_results. Saves to file_name if given."""
+    metric_names = scenario["metrics"]
+    days = metrics.sample_times(scenario["days"], scenario["sample_every"])
+    fig, axes = plt.subplots(len(metric_names), 1, figsize=(8, 3*len(metric_names)), squeeze=False)
+    for axis, name in zip(axes[:, 0], metric_names):
+        means = results[name].mean(axis=2)
+        for c, climate in enumerate(scenario["climates"]):
+            for s, label in enumerate(scenario["species_sets"]):
+                axis.plot(days, means[c, s], label=f"{climate} ({label})")
+        axis.set_xlabel("Time (days)")
+        axis.set_ylabel(name)
+    axes[0, 0].set_title(f"{scenario['name']} (trials: {len(scenario['seeds'])})")
+    axes[0, 0].legend()
+    plt.tight_layout()
+    if file_name is not None:
+        plt.savefig(file_name, dpi=150)
+    else:
+        plt.show()
 
-        axis.set_xlabel(world.get_environment().get_climate().climate_type)
-        axis.set_xlabel(climate)
-        plt.savefig(f"{file_path}{i}.png", dpi= 150)
\ No newline at end of file
+def plot_batch_results(results_path: str, file_name: str = None) -> None:
+    """Plots the trial mean of every metric in a batch result file against time,
+        one line per climate and species set. Saves to file_name if given."""
+    arrays, metadata = batch.load_results(results_path)
+    plot_scenario_results(metadata["scenario"], arrays, file_name)
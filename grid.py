@@ -1,26 +1,66 @@
 import numpy as np
 from typing import List, Tuple
-import random
+
+MAX_SPECIES = 16 # species per Grid, one bit each of the occupancy masks
+BLOCK_SIZE = 8 # side in cells of the blocks uncolonized regions are held in
+# Number of species set in every occupancy mask, and the lowest one (-1 for none),
+# found as the number of bits below the lowest set bit
+SPECIES_COUNTS = np.unpackbits(np.arange(2**MAX_SPECIES, dtype=">u2").view(np.uint8)).reshape(-1, 16).sum(axis=1).astype(np.uint8)
+LOWEST_SPECIES = np.where(np.arange(2**MAX_SPECIES) == 0, -1,
+                        SPECIES_COUNTS[((np.arange(2**MAX_SPECIES) & -np.arange(2**MAX_SPECIES)) - 1) % 2**MAX_SPECIES]).astype(np.int8)
 
 class Grid:
     """Grid class for simulating an m x n meter environment."""
 
-    def __init__(self, m: int, n: int, original_biomass=0, sensitivity=0) -> None:
+    __slots__ = ("num_rows", "num_cols", "rng", "original_biomass", "current_biomass",
+                "occupancy", "dead_occupancy", "dominant_species", "block_size", "refined",
+                "refined_cells", "added", "coarse_original", "coarse_cells")
+
+    def __init__(self, m: int, n: int, original_biomass=0, sensitivity=0,
+                rng: np.random.Generator = None, block_size: int = BLOCK_SIZE) -> None:
         """Create a Grid with m rows and n columns made from Numpy arrays.
             Each cell is [original_biomass, current biomass]"""
         self.num_rows = m
-        self.num_cols = n 
-        self.map_grid = np.empty(shape=(m, n), dtype=object)
-        # Fill array with tuples
-        for r in range(m):
-            for c in range(n):
-                random_start_biomass = random.uniform(original_biomass - sensitivity, 
-                                                        original_biomass + sensitivity)
-                self.map_grid[r][c] = [random_start_biomass, random_start_biomass]
-                
+        self.num_cols = n
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Fill both arrays with one bulk draw
+        self.original_biomass = self.rng.uniform(original_biomass - sensitivity,
+                                                original_biomass + sensitivity,
+                                                size=(m, n))
+        self.current_biomass = self.original_biomass.copy()
+        # Multi-resolution biomass: a block no Fungus has reached is coarse, and
+        # every cell in it holds its original biomass plus everything added
+        # everywhere since the start, which is kept once in added. A block is
+        # refined, i.e. its cells carry their own current biomass, when a
+        # species colonizes one of its cells
+        self.block_size = block_size
+        self.refined = np.zeros((-(-m // block_size), -(-n // block_size)), dtype=bool)
+        self.refined_cells = np.empty(0, dtype=int)
+        self.added = 0.0
+        # Sum of the original biomass and number of the cells in coarse blocks
+        self.coarse_original = float(self.original_biomass.sum())
+        self.coarse_cells = m * n
+        # Occupancy index: bit s of a cell is set when species s has a Fungus there,
+        # and in dead_occupancy when that Fungus is dead; dominant_species is the
+        # highest-ranked (lowest s) living species in each cell, or -1
+        self.occupancy = np.zeros((m, n), dtype=np.uint16)
+        self.dead_occupancy = np.zeros((m, n), dtype=np.uint16)
+        self.dominant_species = np.full((m, n), -1, dtype=np.int8)
+
     def __str__(self) -> str:
         """Returns a pretty string representing the Grid's values."""
-        return f"Rows: {self.num_rows}\nColumns: {self.num_cols}\n{self.map_grid}"
+        return f"Rows: {self.num_rows}\nColumns: {self.num_cols}\n" + \
+            f"Original biomass:\n{self.original_biomass}\nCurrent biomass:\n{self.get_current_biomass()}"
+
+
+    def copy(self, rng: np.random.Generator = None) -> "Grid":
+        """Returns an independent copy of the Grid drawing from rng (default: the same generator)."""
+        grid = Grid.__new__(Grid)
+        for name in Grid.__slots__:
+            value = getattr(self, name)
+            setattr(grid, name, value.copy() if isinstance(value, np.ndarray) else value)
+        grid.rng = rng if rng is not None else self.rng
+        return grid
 
 
     # UTILITY METHODS used by setters and getters
@@ -32,6 +72,32 @@ class Grid:
         """Bollean on whether the given column exists."""
         return 0 <= c <= self.num_cols - 1
 
+    def __is_coarse(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Whether each (row, col) cell lies in a coarse block."""
+        return ~self.refined[rows // self.block_size, cols // self.block_size]
+
+    def refine(self, cells: List[int]):
+        """Refines the blocks holding cells (x * columns + y), so that each of
+            their cells carries its own current biomass."""
+        cells = np.asarray(cells, dtype=int)
+        blocks = np.unique((cells // self.num_cols // self.block_size) * self.refined.shape[1]
+                            + cells % self.num_cols // self.block_size)
+        blocks = blocks[~self.refined.reshape(-1)[blocks]]
+        if len(blocks) == 0:
+            return
+        new_cells = []
+        for block in blocks.tolist():
+            row, col = divmod(block, self.refined.shape[1])
+            rows = np.arange(row * self.block_size, min((row + 1) * self.block_size, self.num_rows))
+            cols = np.arange(col * self.block_size, min((col + 1) * self.block_size, self.num_cols))
+            new_cells.append((rows[:, None] * self.num_cols + cols).reshape(-1))
+        new_cells = np.concatenate(new_cells)
+        self.refined.reshape(-1)[blocks] = True
+        self.current_biomass.reshape(-1)[new_cells] += self.added
+        self.coarse_original -= float(self.original_biomass.reshape(-1)[new_cells].sum())
+        self.coarse_cells -= len(new_cells)
+        self.refined_cells = np.concatenate([self.refined_cells, new_cells])
+
 
     # GETTER METHODS
     def get_original_biomass_at_location(self, location: tuple) -> float:
@@ -45,16 +111,17 @@ class Grid:
     def get_value_tuple_at_x_y(self, x: int, y: int) -> tuple:
         """Returns the value in the Grid at the given x and y location."""
         if self.__is_valid_row(x) and self.__is_valid_col(y):
-            return self.map_grid[x][y]
+            return (float(self.original_biomass[x, y]), 
+                    float(self.current_biomass[x, y] + self.added * self.__is_coarse(x, y)))
         else:
             print(f"Location ({x}, {y}) is not a valid location.")
-        
+
     def get_value_tuple(self, location: tuple) -> tuple:
         """Returns the value in the Grid at location (x, y)."""
         return self.get_value_tuple_at_x_y(location[0], location[1])
 
     def grid_size(self) -> tuple:
-        """Returns a (x, y) tuple where x is the number of rows 
+        """Returns a (x, y) tuple where x is the number of rows
             and y is the number of columns of the Grid."""
         return (self.num_rows, self.num_cols)
 
@@ -69,7 +136,7 @@ class Grid:
             # Loop through col to the left, current col, and col to the right
             for col in range(-1, 2):
                 # Skip the given location
-                if row is 0 and col is 0:
+                if row == 0 and col == 0:
                     continue
                 # Make sure the proposed location is valid the Grid
                 elif self.__is_valid_row(x + row) and self.__is_valid_col(y + col):
@@ -77,30 +144,75 @@ class Grid:
         return neighbors
 
     def generate_random_locations(self, location_num: int) -> List[Tuple[int, int]]:
-        """Generates location_num locations in the Grid and puts them in a list."""
-        locations = list()
-        for i in range(location_num):
-            rows, cols = self.grid_size()
-            new_place = (random.randint(0, rows-1), random.randint(0, cols-1))
-            if new_place not in locations:
-                locations.append(new_place)
-        return locations
+        """Generates location_num distinct locations in the Grid and puts them in a list."""
+        rows, cols = self.grid_size()
+        # Draw flat cell indices without replacement in one call
+        cells = self.rng.choice(rows * cols, size=min(location_num, rows * cols), replace=False)
+        return [(int(cell // cols), int(cell % cols)) for cell in cells]
+
+    def get_biomass_arrays(self, locations: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns arrays of the original and current biomass at each of locations."""
+        rows, cols = self.__unzip_locations(locations)
+        return self.original_biomass[rows, cols], \
+            self.current_biomass[rows, cols] + self.added * self.__is_coarse(rows, cols)
+
+    def get_current_biomass(self) -> np.ndarray:
+        """Returns a new (rows, columns) array of the current biomass of every cell."""
+        coarse = ~np.repeat(np.repeat(self.refined, self.block_size, axis=0), self.block_size, axis=1)
+        return self.current_biomass + self.added * coarse[:self.num_rows, :self.num_cols]
+
+    def get_original_biomass_by_cell(self) -> np.ndarray:
+        """Returns a flat view of the original biomass, indexed by cell (x * columns + y)."""
+        return self.original_biomass.reshape(-1)
+
+    def get_current_biomass_by_cell(self) -> np.ndarray:
+        """Returns a flat view of the current biomass, indexed by cell (x * columns + y);
+            writing to it changes the Grid. Only the cells of refined blocks, which
+            include every colonized cell, are up to date."""
+        return self.current_biomass.reshape(-1)
 
     def average_biomass(self) -> float:
         """Returns the average current biomass of the Grid."""
-        average = 0
-        rows, cols = self.grid_size()
-        for r in range(rows):
-            for c in range(cols):
-                average += self.get_current_biomass_at_location((r, c))
-        average = average / (self.num_cols * self.num_rows)
-        return average
+        refined = self.current_biomass.reshape(-1)[self.refined_cells].sum()
+        return float((refined + self.coarse_original + self.added * self.coarse_cells) / self.current_biomass.size)
+
+    def get_occupancy(self) -> np.ndarray:
+        """Returns the occupancy bitmask of every cell: bit s is set where species s is."""
+        return self.occupancy
+
+    def get_living_occupancy(self) -> np.ndarray:
+        """Returns the occupancy bitmask of every cell counting only living Fungi."""
+        return self.occupancy & ~self.dead_occupancy
+
+    def get_dominant_species(self) -> np.ndarray:
+        """Returns the highest-ranked living species in every cell, -1 where there is none."""
+        return self.dominant_species
+
+    def get_species_counts(self) -> np.ndarray:
+        """Returns the number of species occupying every cell, living or dead."""
+        return SPECIES_COUNTS[self.occupancy]
+
+    def get_species_at_location(self, location: tuple) -> List[int]:
+        """Returns the species occupying location (x, y)."""
+        mask = int(self.occupancy[location[0], location[1]])
+        return [s for s in range(MAX_SPECIES) if mask >> s & 1]
+
+    def __update_dominant_species(self, cells: np.ndarray):
+        """Recomputes the dominant species of the given cells."""
+        living = self.occupancy.reshape(-1)[cells] & ~self.dead_occupancy.reshape(-1)[cells]
+        self.dominant_species.reshape(-1)[cells] = LOWEST_SPECIES[living]
+
+    def __unzip_locations(self, locations: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Splits a list of (x, y) locations into arrays of rows and columns."""
+        cells = np.array(locations, dtype=int).reshape(len(locations), 2)
+        return cells[:, 0], cells[:, 1]
 
     # SETTER METHODS
     def set_value_tuple_at_x_y(self, x: int, y: int, val: tuple):
         """Sets the value at location (x, y) in the Grid to val."""
         if self.__is_valid_row(x) and self.__is_valid_col(y):
-            self.map_grid[x][y] = val
+            self.refine([x * self.num_cols + y])
+            self.original_biomass[x, y], self.current_biomass[x, y] = val
 
     def set_value_tuple(self, location: tuple, val: tuple):
         """Sets the value at location (x, y) in the Grid to val."""
@@ -108,24 +220,50 @@ class Grid:
 
     def set_current_biomass(self, location: tuple, val: float):
         """Sets the current biomass at (x, y) location to val."""
-        original_biomass, current_biomass = self.get_value_tuple(location)
-        self.set_value_tuple(location, (original_biomass, val))
+        x, y = location
+        if self.__is_valid_row(x) and self.__is_valid_col(y):
+            self.refine([x * self.num_cols + y])
+            self.current_biomass[x, y] = val
+
+    def set_current_biomass_array(self, locations: List[Tuple[int, int]], values: np.ndarray):
+        """Sets the current biomass at each of locations to the matching entry of values."""
+        rows, cols = self.__unzip_locations(locations)
+        self.refine(rows * self.num_cols + cols)
+        self.current_biomass[rows, cols] = values
+
+    def add_occupants(self, cells: List[int], species: int):
+        """Records that species has colonized each of cells (x * columns + y)."""
+        cells = np.asarray(cells, dtype=int)
+        self.refine(cells)
+        bit = np.uint16(1 << species)
+        self.occupancy.reshape(-1)[cells] |= bit
+        self.dead_occupancy.reshape(-1)[cells] &= ~bit
+        self.__update_dominant_species(cells)
+
+    def set_occupants_dead(self, cells: List[int], species: int, dead=True):
+        """Records whether the Fungus of species at each of cells is dead; dead is
+            one bool for all of them or an array with one per cell."""
+        cells = np.asarray(cells, dtype=int)
+        bit = np.uint16(1 << species)
+        dead = np.broadcast_to(np.asarray(dead, dtype=bool), cells.shape)
+        self.dead_occupancy.reshape(-1)[cells[dead]] |= bit
+        self.dead_occupancy.reshape(-1)[cells[~dead]] &= ~bit
+        self.__update_dominant_species(cells)
 
     # ADDING METHODS
     def add_value_at_location(self, location: tuple, val: float):
         """Adds val to the current_biomass at (x, y) location."""
-        self.set_current_biomass(location, 
+        self.set_current_biomass(location,
                                 val + self.get_current_biomass_at_location(location))
 
     def add_value_everywhere(self, val: float):
-        """Adds val to every location in the Grid."""
-        for r in range(self.num_rows):
-            for c in range(self.num_cols):
-                self.map_grid[r][c] = [self.map_grid[r][c][0], 
-                                        self.map_grid[r][c][1] + val]
+        """Adds val to every location in the Grid: cell by cell in refined
+            blocks and once for all the coarse ones."""
+        self.current_biomass.reshape(-1)[self.refined_cells] += val
+        self.added += val
 
     # REDUCING METHODS
     def reduce_value_at_location(self, location: tuple, val: float):
         """Reduces the number at (x, y) location by val."""
-        self.set_current_biomass(location, 
+        self.set_current_biomass(location,
                                 self.get_current_biomass_at_location(location) - val)
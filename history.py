@@ -0,0 +1,290 @@
+"""Compact run history: an opt-in recorder that logs only changes of state, i.e.
+    colonizations, deaths and resurrections and the cells whose amount consumed or
+    biomass changed, plus periodic keyframes of the full state, in typed arrays
+    chunked on disk, and a replay API that rebuilds the state on any day from the
+    nearest keyframe."""
+import json
+import os
+import numpy as np
+from typing import Dict, Iterator, List
+
+from grid import LOWEST_SPECIES
+from world import World
+
+KEYFRAME_EVERY = 30 # days per chunk; each chunk starts with a keyframe
+META_FILE = "history.json"
+# Kinds of event
+COLONIZATION = 0
+DEATH = 1
+RESURRECTION = 2
+EVENT_DTYPE = np.dtype([("day", np.uint32),
+                        ("cell", np.uint32),
+                        ("species", np.uint8),
+                        ("kind", np.uint8)])
+# The new amount a species has consumed in a cell
+CONSUMPTION_DTYPE = np.dtype([("day", np.uint32),
+                            ("cell", np.uint32),
+                            ("species", np.uint8),
+                            ("consumed", np.float32)])
+# The new biomass of a cell, where it changed by more than what was added everywhere
+BIOMASS_DTYPE = np.dtype([("day", np.uint32),
+                        ("cell", np.uint32),
+                        ("biomass", np.float32)])
+
+
+def chunk_file(path: str, chunk: int) -> str:
+    """Returns the file of a history chunk."""
+    return os.path.join(path, f"chunk_{chunk:05d}.npz")
+
+def day_slice(records: np.ndarray, day: int) -> np.ndarray:
+    """Returns the records of day from records logged in order of day."""
+    return records[np.searchsorted(records["day"], day, "left"):np.searchsorted(records["day"], day, "right")]
+
+
+class HistoryRecorder:
+    """Runs a World day by day, writing its history to the directory path."""
+
+    def __init__(self, world: World, path: str, keyframe_every: int = KEYFRAME_EVERY) -> None:
+        self.world = world
+        self.path = path
+        self.keyframe_every = keyframe_every
+        self.grid = world.get_environment().get_grid()
+        self.fungus_list = world.get_environment().get_fungi_list()
+        os.makedirs(path, exist_ok=True)
+        # What the Grid's occupancy index, the amounts consumed and the biomass
+        # looked like after the last recorded day, as a replay would rebuild them
+        self.occupancy = self.grid.get_occupancy().copy()
+        self.dead_occupancy = self.grid.dead_occupancy.copy()
+        self.consumed = self.__consumed()
+        self.added = self.grid.added
+        self.events = []
+        self.consumption = []
+        self.biomass_changes = []
+        self.added_daily = []
+        self.eaten = []
+        self.average_biomass = []
+        self.keyframe = self.__keyframe()
+        self.first_day = world.get_time()
+
+    def __consumed(self) -> np.ndarray:
+        """Returns the amount each species has consumed in each cell, (species, cells)."""
+        consumed = np.zeros((len(self.fungus_list), self.grid.num_rows * self.grid.num_cols), dtype=np.float32)
+        for s, fungus in enumerate(self.fungus_list):
+            cells = fungus.get_cells()
+            consumed[s, np.fromiter(cells, dtype=np.int64, count=len(cells))] = \
+                np.fromiter(cells.values(), dtype=np.float64, count=len(cells))
+        return consumed
+
+    def __keyframe(self) -> Dict[str, np.ndarray]:
+        """Returns the full state of the World today."""
+        species, cells = np.nonzero(self.consumed)
+        current_biomass = self.grid.get_current_biomass().astype(np.float32)
+        self.biomass = current_biomass.ravel().astype(np.float64)
+        return {"keyframe_day": np.array(self.world.get_time()),
+                "occupancy": self.occupancy.copy(),
+                "dead_occupancy": self.dead_occupancy.copy(),
+                "current_biomass": current_biomass,
+                "consumed_species": species.astype(np.uint8),
+                "consumed_cells": cells.astype(np.uint32),
+                "consumed": self.consumed[species, cells]}
+
+    def __log_changes(self) -> None:
+        """Logs the changes to the Grid's occupancy index, the amounts consumed and
+            the biomass since the last day."""
+        day = self.world.get_time()
+        occupancy = self.grid.get_occupancy()
+        dead_occupancy = self.grid.dead_occupancy
+        changed = np.flatnonzero((occupancy != self.occupancy) | (dead_occupancy != self.dead_occupancy))
+        if len(changed) > 0:
+            before, after = self.occupancy.ravel()[changed], occupancy.ravel()[changed]
+            dead_before, dead_after = self.dead_occupancy.ravel()[changed], dead_occupancy.ravel()[changed]
+            for s in range(len(self.fungus_list)):
+                bit = np.uint16(1 << s)
+                for kind, happened in ((COLONIZATION, (after & ~before & bit) != 0),
+                                    (DEATH, (dead_after & ~dead_before & bit) != 0),
+                                    (RESURRECTION, (dead_before & ~dead_after & after & bit) != 0)):
+                    cells = changed[happened]
+                    if len(cells) > 0:
+                        events = np.empty(len(cells), dtype=EVENT_DTYPE)
+                        events["day"] = day
+                        events["cell"] = cells
+                        events["species"] = s
+                        events["kind"] = kind
+                        self.events.append(events)
+            self.occupancy = occupancy.copy()
+            self.dead_occupancy = dead_occupancy.copy()
+        consumed = self.__consumed()
+        species, cells = np.nonzero(consumed != self.consumed)
+        if len(cells) > 0:
+            consumption = np.empty(len(cells), dtype=CONSUMPTION_DTYPE)
+            consumption["day"] = day
+            consumption["cell"] = cells
+            consumption["species"] = species
+            consumption["consumed"] = consumed[species, cells]
+            self.consumption.append(consumption)
+        self.consumed = consumed
+        # What was added everywhere is logged once; only the cells that differ
+        # from it, i.e. the ones eaten from, are logged one by one
+        added = self.grid.added - self.added
+        self.added = self.grid.added
+        self.added_daily.append(added)
+        self.biomass += added
+        current_biomass = self.grid.get_current_biomass().ravel().astype(np.float32)
+        cells = np.flatnonzero(current_biomass != self.biomass.astype(np.float32))
+        if len(cells) > 0:
+            changes = np.empty(len(cells), dtype=BIOMASS_DTYPE)
+            changes["day"] = day
+            changes["cell"] = cells
+            changes["biomass"] = current_biomass[cells]
+            self.biomass_changes.append(changes)
+            self.biomass[cells] = current_biomass[cells]
+        self.eaten.append([fungus.get_amount_of_substrate_eaten_today() for fungus in self.fungus_list])
+        self.average_biomass.append(self.grid.average_biomass())
+
+    def __flush(self) -> None:
+        """Writes the current chunk: its keyframe and the changes after it."""
+        events = np.concatenate(self.events) if self.events else np.empty(0, dtype=EVENT_DTYPE)
+        consumption = np.concatenate(self.consumption) if self.consumption else np.empty(0, dtype=CONSUMPTION_DTYPE)
+        biomass_changes = (np.concatenate(self.biomass_changes) if self.biomass_changes
+                            else np.empty(0, dtype=BIOMASS_DTYPE))
+        chunk = int(self.keyframe["keyframe_day"]) // self.keyframe_every
+        np.savez_compressed(chunk_file(self.path, chunk), events=events, consumption=consumption,
+                            biomass_changes=biomass_changes, added=np.array(self.added_daily), **self.keyframe)
+
+    def record(self, days: int) -> None:
+        """Runs the World for days, logging every day."""
+        for _ in range(days):
+            self.world.increment_time()
+            self.__log_changes()
+            if self.world.get_time() % self.keyframe_every == 0:
+                self.__flush()
+                self.events = []
+                self.consumption = []
+                self.biomass_changes = []
+                self.added_daily = []
+                self.keyframe = self.__keyframe()
+
+    def close(self) -> None:
+        """Writes the open chunk and the description of the history; recording
+            can carry on afterwards."""
+        self.__flush()
+        np.savez_compressed(os.path.join(self.path, "daily.npz"),
+                            eaten=np.array(self.eaten, dtype=np.float32).reshape(-1, len(self.fungus_list)),
+                            average_biomass=np.array(self.average_biomass))
+        with open(os.path.join(self.path, META_FILE), "w") as meta_file:
+            json.dump({"grid_size": list(self.grid.grid_size()),
+                        "species": [fungus.name for fungus in self.fungus_list],
+                        "climate": self.world.get_environment().get_climate().climate_type,
+                        "keyframe_every": self.keyframe_every,
+                        "first_day": self.first_day,
+                        "last_day": self.world.get_time()}, meta_file, indent=2)
+
+
+class History:
+    """A recorded history, replayed from disk."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        self.grid_size = tuple(self.meta["grid_size"])
+        self.keyframe_every = self.meta["keyframe_every"]
+
+    def __load_chunk(self, day: int) -> Dict[str, np.ndarray]:
+        """Returns the contents of the chunk that holds day."""
+        chunk = max(day, self.meta["first_day"]) // self.keyframe_every
+        if not os.path.exists(chunk_file(self.path, chunk)):
+            chunk = self.meta["first_day"] // self.keyframe_every
+        with np.load(chunk_file(self.path, chunk)) as data:
+            return {name: data[name] for name in data.files}
+
+    def __replay(self, start: int, end: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Yields the state on every day from start through end, replaying each
+            chunk once from its keyframe."""
+        day = start
+        while day <= end:
+            data = self.__load_chunk(day)
+            keyframe_day = int(data["keyframe_day"])
+            occupancy = data["occupancy"].ravel().copy()
+            dead_occupancy = data["dead_occupancy"].ravel().copy()
+            consumed = np.zeros((len(self.get_species_names()), self.grid_size[0] * self.grid_size[1]),
+                                dtype=np.float32)
+            consumed[data["consumed_species"], data["consumed_cells"]] = data["consumed"]
+            biomass = data["current_biomass"].ravel().astype(np.float64)
+            last = min(end, keyframe_day + len(data["added"]))
+            for replayed in range(keyframe_day, last + 1):
+                if replayed > keyframe_day:
+                    # A day has at most one of a death and a resurrection per
+                    # cell and species, so its events apply in any order
+                    events = day_slice(data["events"], replayed)
+                    bits = (np.uint16(1) << events["species"].astype(np.uint16))
+                    colonized = events["kind"] == COLONIZATION
+                    died = events["kind"] == DEATH
+                    risen = events["kind"] == RESURRECTION
+                    np.bitwise_or.at(occupancy, events["cell"][colonized], bits[colonized])
+                    np.bitwise_or.at(dead_occupancy, events["cell"][died], bits[died])
+                    np.bitwise_and.at(dead_occupancy, events["cell"][risen], ~bits[risen])
+                    consumption = day_slice(data["consumption"], replayed)
+                    consumed[consumption["species"], consumption["cell"]] = consumption["consumed"]
+                    biomass += data["added"][replayed - keyframe_day - 1]
+                    changes = day_slice(data["biomass_changes"], replayed)
+                    biomass[changes["cell"]] = changes["biomass"]
+                if replayed >= day:
+                    living = occupancy & ~dead_occupancy
+                    yield {"day": replayed,
+                            "keyframe_day": keyframe_day,
+                            "occupancy": occupancy.reshape(self.grid_size).copy(),
+                            "dead_occupancy": dead_occupancy.reshape(self.grid_size).copy(),
+                            "dominant_species": LOWEST_SPECIES[living].reshape(self.grid_size),
+                            "consumed": consumed.reshape(-1, *self.grid_size).copy(),
+                            "current_biomass": biomass.astype(np.float32).reshape(self.grid_size)}
+            day = last + 1
+
+    # GETTER METHODS
+    def get_species_names(self) -> List[str]:
+        """Returns the species recorded, in turn order."""
+        return self.meta["species"]
+
+    def get_days(self) -> range:
+        """Returns the days the history can replay."""
+        return range(self.meta["first_day"], self.meta["last_day"] + 1)
+
+    def get_daily(self) -> Dict[str, np.ndarray]:
+        """Returns the per-day series: the amount each species ate (days, species) and
+            the average biomass, for days after the first."""
+        with np.load(os.path.join(self.path, "daily.npz")) as daily:
+            return {name: daily[name] for name in daily.files}
+
+    def get_events(self, start: int, end: int) -> np.ndarray:
+        """Returns the events of days start through end."""
+        chunks = range(start // self.keyframe_every, end // self.keyframe_every + 1)
+        events = []
+        for chunk in chunks:
+            if os.path.exists(chunk_file(self.path, chunk)):
+                with np.load(chunk_file(self.path, chunk)) as data:
+                    events.append(data["events"])
+        events = np.concatenate(events) if events else np.empty(0, dtype=EVENT_DTYPE)
+        return events[(events["day"] >= start) & (events["day"] <= end)]
+
+    def get_state(self, day: int) -> Dict[str, np.ndarray]:
+        """Returns the state on day: the occupancy bitmasks, the dominant species,
+            the amounts consumed (species, rows, cols) and the current biomass, as
+            float32, rebuilt from the nearest keyframe."""
+        if day not in self.get_days():
+            raise ValueError(f"Day {day} is outside the recorded history")
+        return next(self.__replay(day, day))
+
+    def get_states(self, start: int, end: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Yields the state of every day from start through end, as get_state
+            would return it, reading each chunk once."""
+        if start not in self.get_days() or end not in self.get_days():
+            raise ValueError(f"Days {start} to {end} are outside the recorded history")
+        return self.__replay(start, end)
+
+
+def record_history(world: World, days: int, path: str, keyframe_every: int = KEYFRAME_EVERY) -> History:
+    """Runs world for days while recording its history to path and returns the History."""
+    recorder = HistoryRecorder(world, path, keyframe_every)
+    recorder.record(days)
+    recorder.close()
+    return History(path)
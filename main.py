@@ -2,8 +2,152 @@
 Authors: Therese Aglialoro, Cameron Nottingham, and William Kostuch
 2021 MCM, Problem A: Fungi
 """
-import graphing
+import argparse
+
+HEAT_MAP_FILE = "Sensitivity growth rate - 2 - heat map (one Year).png"
+
+
+def parse_arguments(argv=None) -> argparse.Namespace:
+    """Parses the command line."""
+    parser = argparse.ArgumentParser(description="Fungal decomposition model.")
+    # With no command, make the heat map as before
+    parser.set_defaults(command="heatmap", days=365, file=HEAT_MAP_FILE)
+    commands = parser.add_subparsers(dest="command")
+    # Headless batch runs
+    run = commands.add_parser("run", help="Run scenario files and write .npz/.csv results.")
+    run.add_argument("scenarios", nargs="+", help="JSON scenario files.")
+    run.add_argument("--output-dir", default="results", help="Directory for result files.")
+    run.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs).")
+    # Optional figure rendering from saved results
+    render = commands.add_parser("render", help="Render figures from .npz results.")
+    render.add_argument("results", nargs="+", help=".npz files written by run.")
+    render.add_argument("--output-dir", default=None, help="Save .png files here instead of showing them.")
+    # Round-robin tournament between species
+    tournament = commands.add_parser("tournament", help="Play every matchup of species and write win rates.")
+    tournament.add_argument("--climates", nargs="+", default=None, help="Climates (default: all).")
+    tournament.add_argument("--species", nargs="+", default=None, help="Species (default: all).")
+    tournament.add_argument("--days", type=int, default=365)
+    tournament.add_argument("--trials", type=int, default=10)
+    tournament.add_argument("--k", type=int, default=2, help="Species per matchup.")
+    tournament.add_argument("--seed", type=int, default=0)
+    tournament.add_argument("--workers", type=int, default=None)
+    tournament.add_argument("--output", default="tournament.npz")
+    # Runs spread over many nodes through a queue in a shared directory
+    queue = commands.add_parser("queue", help="Run scenarios through a shared-directory work queue.")
+    queue.add_argument("action", choices=["submit", "work", "status", "collect"])
+    queue.add_argument("scenarios", nargs="*", help="JSON scenario files (submit, collect).")
+    queue.add_argument("--queue", required=True, help="Queue directory, shared by every node.")
+    queue.add_argument("--workers", type=int, default=1, help="Worker processes on this node (work).")
+    queue.add_argument("--wait", action="store_true", help="Keep working when the queue is empty (work).")
+    queue.add_argument("--output-dir", default="results", help="Directory for result files (collect).")
+    # Local job server streaming progress to clients
+    serve = commands.add_parser("serve", help="Serve simulation jobs on localhost.")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=None)
+    # Conformance and speed of an engine against the reference
+    conform = commands.add_parser("conform", help="Check an engine against the reference engine.")
+    conform.add_argument("engine", help="Engine name, as registered with world.register_engine.")
+    conform.add_argument("--plugins", nargs="+", default=[], help="Modules to import that register engines.")
+    conform.add_argument("--climates", nargs="+", default=None, help="Climates (default: all).")
+    conform.add_argument("--species", nargs="+", default=None, help="Species (default: all).")
+    conform.add_argument("--days", type=int, default=365)
+    conform.add_argument("--trials", type=int, default=20)
+    conform.add_argument("--macro-step", action="store_true", help="Run the engine through its block steps.")
+    # Which species each climate can let live at all
+    viable = commands.add_parser("viability", help="Days each species survives in each climate.")
+    viable.add_argument("--climates", nargs="+", default=None, help="Climates (default: all).")
+    viable.add_argument("--days", type=int, default=365)
+    viable.add_argument("--trials", type=int, default=10)
+    # Archives of recorded weather, built once and memory-mapped by every run
+    archive = commands.add_parser("weather", help="Build a recorded weather archive from CSV files.")
+    archive.add_argument("csv", nargs="+", help="CSV files with columns site, climate, date, temperature, precipitation.")
+    archive.add_argument("--output", required=True, help="Archive path; writes <output>.npy and <output>.json.")
+    # The original heat map of every climate
+    heat_map = commands.add_parser("heatmap", help="Fungal heat map for every climate.")
+    heat_map.add_argument("--days", type=int, default=365)
+    heat_map.add_argument("--file", default=HEAT_MAP_FILE)
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    # Make a heatmap of fungi in each climate
-    graphing.fungal_heat_map_all_climates(time_limit=365, file_name="Sensitivity growth rate - 2 - heat map (one Year).png")
+    arguments = parse_arguments()
+    if arguments.command == "run":
+        import batch
+        for scenario_file in arguments.scenarios:
+            for written in batch.run_file(scenario_file, arguments.output_dir, arguments.workers):
+                print(written)
+    elif arguments.command == "tournament":
+        import numpy as np
+        import climate
+        import species
+        import tournament
+        results = tournament.run_tournament(arguments.climates or climate.CLIMATE_NAMES,
+                                            arguments.species or species.species_names(),
+                                            arguments.days, arguments.trials, k=arguments.k,
+                                            seed=arguments.seed, workers=arguments.workers)
+        np.savez_compressed(arguments.output,
+                            climates=np.array(results["climates"]),
+                            species=np.array(results["species"]),
+                            win_rates=results["win_rates"],
+                            trials_used=np.array([[results["trials_used"][(c, m)] for m in results["matchups"]]
+                                                for c in results["climates"]]))
+        print(arguments.output)
+    elif arguments.command == "conform":
+        import importlib
+        import climate
+        import conformance
+        import species
+        for plugin in arguments.plugins:
+            importlib.import_module(plugin)
+        report = conformance.check_engine(arguments.engine, arguments.climates or climate.CLIMATE_NAMES,
+                                        arguments.species or species.species_names(),
+                                        days=arguments.days, trials=arguments.trials,
+                                        macro_step=arguments.macro_step)
+        print(conformance.format_report(report))
+    elif arguments.command == "weather":
+        import weather
+        sites = {}
+        for csv_file in arguments.csv:
+            sites.update(weather.read_csv(csv_file))
+        print(weather.write_archive(arguments.output, sites))
+    elif arguments.command == "viability":
+        import climate
+        import species
+        import viability
+        climates = arguments.climates or climate.CLIMATE_NAMES
+        doomed = {climate_type: viability.doomed_species(climate_type, species.species_names(), arguments.days)
+                for climate_type in climates}
+        print(viability.format_matrix(viability.viability_matrix(climates, days=arguments.days, trials=arguments.trials),
+                                    climates, doomed=doomed))
+    elif arguments.command == "queue":
+        import batch
+        import workqueue
+        if arguments.action == "work":
+            workqueue.run_workers(arguments.queue, arguments.workers, wait=arguments.wait)
+        elif arguments.action == "status":
+            print(workqueue.status(arguments.queue))
+        for scenario_file in arguments.scenarios:
+            for scenario in batch.load_scenarios(scenario_file):
+                if arguments.action == "submit":
+                    print(f"{scenario['name']}: {len(workqueue.submit_scenario(arguments.queue, scenario))} runs queued")
+                elif arguments.action == "collect":
+                    results = workqueue.collect_scenario(arguments.queue, scenario)
+                    metadata = {**batch.scenario_metadata(scenario, 0.0), "pruned_species": batch.pruned_species(scenario)}
+                    print(batch.write_results(scenario, results, metadata, arguments.output_dir))
+    elif arguments.command == "serve":
+        import server
+        server.serve(port=arguments.port, workers=arguments.workers)
+    elif arguments.command == "render":
+        import os
+        import graphing
+        for results in arguments.results:
+            file_name = None
+            if arguments.output_dir is not None:
+                os.makedirs(arguments.output_dir, exist_ok=True)
+                name = os.path.splitext(os.path.basename(results))[0]
+                file_name = os.path.join(arguments.output_dir, f"{name}.png")
+            graphing.plot_batch_results(results, file_name)
+    else:
+        import graphing
+        # Make a heatmap of fungi in each climate
+        graphing.fungal_heat_map_all_climates(time_limit=arguments.days, file_name=arguments.file)
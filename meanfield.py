@@ -0,0 +1,231 @@
+"""Mean-field engine: instead of tracking cells, each species is described by its
+    expected number of colonized and dead cells, the mean biomass left in its cells
+    and the substrate it has eaten, stepped a day at a time as coupled difference
+    equations driven by the same Climate and species parameters as the grid engine."""
+import copy
+import numpy as np
+from typing import Dict, List, Tuple
+
+import species
+import utilities
+import viability
+from climate import Climate, create_climate
+
+NUM_LOCATIONS = 1 # starting cells of a species without initial locations, as in Environment
+BIOMASS_SPREAD = 0.15 # half-width of the original biomass around the density, the Grid's sensitivity
+RESURRECTION_CHANCE = 0.4 # chance a dead cell comes back on a day the climate allows it
+# Expected eligible-neighbor share of a colony of n cells is min(1, GROWTH_SHAPE / sqrt(n)):
+# colonies grow as compact patches whose boundary scales with the square root of
+# their area. Calibrated against the grid engine's daily step with
+# world.meanfield_calibration: 4 species, 50x50, one year, 8 trials per climate
+GROWTH_SHAPE = 3.1
+
+
+class MeanFieldGrid:
+    """Grid stand-in of the mean-field engine: only the mean biomass is known."""
+
+    __slots__ = ("num_rows", "num_cols", "mean_biomass")
+
+    def __init__(self, m: int, n: int, original_biomass: float) -> None:
+        self.num_rows = m
+        self.num_cols = n
+        self.mean_biomass = original_biomass
+
+    def average_biomass(self) -> float:
+        """Returns the average current biomass of the Grid."""
+        return float(self.mean_biomass)
+
+    def grid_size(self) -> tuple:
+        """Returns a (x, y) tuple of the number of rows and columns."""
+        return (self.num_rows, self.num_cols)
+
+
+class MeanFieldFungus:
+    """Fungus stand-in of the mean-field engine, reading its expected state from
+        the MeanFieldEnvironment's arrays."""
+
+    __slots__ = ("name", "competitive_ranking", "environment", "index")
+
+    def __init__(self, name: str, competitive_ranking: float, environment, index: int) -> None:
+        self.name = name
+        self.competitive_ranking = competitive_ranking
+        self.environment = environment
+        self.index = index
+
+    def get_number_of_fungal_cells(self) -> float:
+        """Returns the expected number of cells the fungus took over."""
+        return float(self.environment.cells[self.index])
+
+    def get_number_of_deaths(self) -> float:
+        """Returns the expected number of its cells that are dead."""
+        return float(self.environment.dead[self.index])
+
+    def get_total_amount_of_substrate_eaten(self) -> float:
+        """Returns the expected total amount that the fungus has eaten."""
+        return float(self.environment.eaten[self.index])
+
+    def get_amount_of_substrate_eaten_today(self) -> float:
+        """Returns the expected amount of substrate eaten on the last day."""
+        return float(self.environment.eaten_today[self.index])
+
+    def get_max_consumed(self) -> float:
+        """Returns the expected amount eaten in its oldest cell."""
+        return float(self.environment.max_consumed[self.index])
+
+    def get_competitive_ranking(self) -> float:
+        """Returns the Fungus' competitive ranking."""
+        return self.competitive_ranking
+
+
+class MeanFieldEnvironment:
+    """Environment of the mean-field engine, a drop-in for Environment in World."""
+
+    __slots__ = ("exclusive", "rng", "climate", "grid", "species", "fungus_list", "num_cells",
+                "original_biomass", "free_biomass", "cells", "dead", "biomass", "eaten",
+                "eaten_today", "max_consumed", "retired")
+
+    def __init__(self,
+                climate_type: str,
+                grid_size: Tuple[int, int],
+                fungus_list: List[str],
+                seed: int = None,
+                species_table: np.ndarray = None,
+                initial_locations: Dict[str, List[Tuple[int, int]]] = None,
+                expansion_resolution: str = "coexist") -> None:
+        # Under ranking and random resolution only cells no species holds can be claimed
+        self.exclusive = expansion_resolution != "coexist"
+        self.rng = np.random.default_rng(seed)
+        self.climate = create_climate(climate_type)
+        self.climate.set_random_generator(self.rng)
+        self.original_biomass = float(self.climate.get_climate_biomass_density())
+        self.grid = MeanFieldGrid(grid_size[0], grid_size[1], self.original_biomass)
+        self.num_cells = grid_size[0] * grid_size[1]
+        # Species in turn order, as the Environment sorts its fungi
+        table = species_table if species_table is not None else species.get_species_table()
+        table = species.select_species(fungus_list, table)
+        self.species = table[np.argsort(-table["competitive_ranking"], kind="stable")]
+        initial_locations = initial_locations if initial_locations is not None else {}
+        self.fungus_list = [MeanFieldFungus(str(record["name"]), float(record["competitive_ranking"]), self, s)
+                            for s, record in enumerate(self.species)]
+        # Expected state of each species
+        self.cells = np.array([len(initial_locations.get(fungus.name) or [None] * NUM_LOCATIONS)
+                            for fungus in self.fungus_list], dtype=float)
+        self.dead = np.zeros(len(self.fungus_list))
+        self.biomass = np.full(len(self.fungus_list), self.original_biomass)
+        self.eaten = np.zeros(len(self.fungus_list))
+        self.eaten_today = np.zeros(len(self.fungus_list))
+        self.max_consumed = np.zeros(len(self.fungus_list))
+        self.retired = np.zeros(len(self.fungus_list), dtype=bool)
+        # Biomass of the cells no Fungus has reached, which only ever gain
+        self.free_biomass = self.original_biomass
+
+    def __advance(self, time: int, temperatures: np.ndarray, moistures: np.ndarray, inbound: np.ndarray) -> None:
+        """Steps the expected state through days time through time + len(inbound) - 1."""
+        # Each species' daily demand on a cell and whether the climate lets it live, by day
+        demands = self.original_biomass * species.consumption_factors(self.species, temperatures, moistures).T
+        survivable = species.survivable_days(self.species, temperatures, moistures).T.astype(float) * ~self.retired
+        thresholds = self.species["expansion_threshold"]
+        num_cells = self.num_cells
+        for day in range(len(inbound)):
+            self.biomass += inbound[day]
+            self.free_biomass += inbound[day]
+            alive = survivable[day]
+            demand = demands[day]
+            # Every cell of a species the climate allows eats when its biomass covers
+            # the demand of the species in it; cell levels are spread around the mean
+            coverage = self.cells / num_cells
+            total_demand = demand + (demand @ coverage - demand * coverage)
+            spread = np.maximum(np.abs(total_demand), BIOMASS_SPREAD)
+            fed = alive * np.minimum(np.maximum((self.biomass + spread - total_demand) / (2 * spread), 0), 1)
+            eaten = fed * demand
+            self.eaten_today = eaten * self.cells
+            self.eaten += self.eaten_today
+            self.max_consumed += eaten
+            self.biomass = np.maximum(self.biomass - eaten - (eaten @ coverage - eaten * coverage), 0)
+            self.grid.mean_biomass += inbound[day] - self.eaten_today.sum() / num_cells
+            # Climate kills every cell; otherwise dead cells may come back and cells that go hungry die
+            self.dead = alive * ((1 - RESURRECTION_CHANCE) * self.dead + (self.cells - self.dead) * (1 - fed)) + \
+                        (1 - alive) * self.cells
+            if (time + day) % utilities.DAYS_UNTIL_EXPANSION == 0:
+                self.__expand(fed * thresholds)
+
+    def __expand(self, expanding: np.ndarray) -> None:
+        """Grows each species by the neighbors its expanding share of cells claims."""
+        coverage = self.cells / self.num_cells
+        if self.exclusive:
+            available = np.full(len(coverage), max(1 - coverage.sum(), 0))
+        else:
+            available = 1 - coverage
+        boundary = np.minimum(1, GROWTH_SHAPE / np.sqrt(np.maximum(self.cells, 1)))
+        gained = np.minimum(self.cells * expanding * boundary * available, self.num_cells - self.cells)
+        # Claimed cells bring their biomass: that of another species' cells, or untouched
+        others = coverage.sum() - coverage
+        held = (self.biomass * coverage).sum() - self.biomass * coverage
+        other_biomass = np.where(others > 0, held / np.maximum(others, 1e-12), self.free_biomass)
+        taken = 0 if self.exclusive else np.clip(others, 0, 1)
+        arriving = taken * other_biomass + (1 - taken) * self.free_biomass
+        total = self.cells + gained
+        self.biomass = np.where(total > 0, (self.cells * self.biomass + gained * arriving) / np.maximum(total, 1e-12),
+                                self.biomass)
+        self.cells = total
+
+    def update(self, time: int):
+        """Update's the Environment using time."""
+        self.climate.update_climate_per_day(time)
+        self.__advance(time, np.array([self.climate.get_climate_temperature()]),
+                        np.array([self.climate.get_climate_moisture()]),
+                        np.array([self.climate.get_inbound_biomass(time)]))
+
+    def macro_step(self, time: int, days: int):
+        """Advances the Environment over days time through time + days - 1 in one operation."""
+        temperatures, moistures = self.climate.project_days(time, days)
+        self.__advance(time, temperatures, moistures, self.climate.get_inbound_biomass_series(time, days))
+        self.climate.set_climate_state(temperatures[-1], moistures[-1])
+
+    def retire_doomed(self, time: int, days: int, risk: float = viability.VIABILITY_RISK) -> List[str]:
+        """Retires the species the Climate kills on every day time through time + days - 1,
+            as Environment.retire_doomed does. All species share one vector step, so
+            this only keeps the engines' reports alike. Returns the retired names."""
+        self.retired |= ~viability.viable_species(self.species, self.climate, time, days, risk)
+        return [fungus.name for fungus, retired in zip(self.fungus_list, self.retired) if retired]
+
+    def fork(self, split_random: bool = True) -> "MeanFieldEnvironment":
+        """Returns an independent copy of the Environment; see Environment.fork."""
+        environment = MeanFieldEnvironment.__new__(MeanFieldEnvironment)
+        for name in MeanFieldEnvironment.__slots__:
+            value = getattr(self, name)
+            setattr(environment, name, value.copy() if isinstance(value, np.ndarray) else value)
+        environment.species = self.species
+        environment.rng = self.rng.spawn(1)[0] if split_random else copy.deepcopy(self.rng)
+        environment.climate = self.climate.copy(environment.rng)
+        environment.grid = MeanFieldGrid(self.grid.num_rows, self.grid.num_cols, self.grid.mean_biomass)
+        environment.fungus_list = [MeanFieldFungus(fungus.name, fungus.competitive_ranking, environment, fungus.index)
+                                    for fungus in self.fungus_list]
+        return environment
+
+    def is_idle(self) -> bool:
+        """Returns False: the mean-field engine steps idle days as cheaply as any other."""
+        return False
+
+    def fast_forward(self, time: int, max_days: int) -> int:
+        """Skips no days; see is_idle."""
+        return 0
+
+
+    # GETTER methods
+
+    def get_climate(self) -> Climate:
+        """Return's the Environment's Climate."""
+        return self.climate
+
+    def get_grid(self) -> MeanFieldGrid:
+        """Return's the Environment's Grid stand-in."""
+        return self.grid
+
+    def get_fungi_list(self) -> List[MeanFieldFungus]:
+        """Return's the Environment's Fungus stand-ins, in turn order."""
+        return self.fungus_list
+
+    def get_species(self) -> np.ndarray:
+        """Return's the species records of the Environment's Fungus, in turn order."""
+        return self.species
@@ -0,0 +1,71 @@
+"""Metrics that can be sampled from a World while it runs."""
+import numpy as np
+from typing import Callable, Dict, List
+
+from world import World
+
+
+def average_biomass(world: World) -> float:
+    """Average current biomass of the Grid."""
+    return world.get_environment().get_grid().average_biomass()
+
+def total_substrate_eaten(world: World) -> float:
+    """Total substrate eaten by every Fungus since the start."""
+    return sum(fungus.get_total_amount_of_substrate_eaten() for fungus in world.get_environment().get_fungi_list())
+
+def substrate_eaten_today(world: World) -> float:
+    """Substrate eaten by every Fungus on the last day."""
+    return sum(fungus.get_amount_of_substrate_eaten_today() for fungus in world.get_environment().get_fungi_list())
+
+def fungal_cells(world: World) -> float:
+    """Number of cells taken over, summed over every Fungus."""
+    return sum(fungus.get_number_of_fungal_cells() for fungus in world.get_environment().get_fungi_list())
+
+def dead_cells(world: World) -> float:
+    """Number of dead cells, summed over every Fungus."""
+    return sum(fungus.get_number_of_deaths() for fungus in world.get_environment().get_fungi_list())
+
+def temperature(world: World) -> float:
+    """Current temperature of the Climate."""
+    return world.get_environment().get_climate().get_climate_temperature()
+
+def moisture(world: World) -> float:
+    """Current moisture of the Climate."""
+    return world.get_environment().get_climate().get_climate_moisture()
+
+
+# Dictionary for mapping metric names to the functions that measure them
+METRICS: Dict[str, Callable[[World], float]] = {"average_biomass": average_biomass,
+                                                "total_substrate_eaten": total_substrate_eaten,
+                                                "substrate_eaten_today": substrate_eaten_today,
+                                                "fungal_cells": fungal_cells,
+                                                "dead_cells": dead_cells,
+                                                "temperature": temperature,
+                                                "moisture": moisture}
+
+# Metrics that accumulate over the whole run rather than describe the current day
+CUMULATIVE_METRICS = {"total_substrate_eaten"}
+
+
+def sample_times(days: int, every: int = 1) -> np.ndarray:
+    """Returns the days on which record_series samples a run of days: every few
+        days from the start, and always the last day."""
+    return np.unique(np.append(np.arange(0, days, every), days))
+
+def record_series(world: World, days: int, metric_names: List[str], every: int = 1,
+                fast_forward: bool = True, macro_step: bool = False) -> Dict[str, np.ndarray]:
+    """Runs world for days and returns an array per metric sampled every few days,
+        starting with the World as it is before the first day and ending with the
+        World as it is after the last."""
+    for name in metric_names:
+        if name not in METRICS:
+            raise KeyError(f"Unknown metric: {name}")
+    world.check_run_length(days)
+    times = sample_times(days, every)
+    series = {name: np.zeros(len(times)) for name in metric_names}
+    for i, time in enumerate(times):
+        if i > 0:
+            world.run(time - times[i - 1], fast_forward=fast_forward, macro_step=macro_step)
+        for name in metric_names:
+            series[name][i] = METRICS[name](world)
+    return series
@@ -0,0 +1,122 @@
+"""Streaming statistics of metric series across trials in O(days) memory: per-day mean
+    and variance (Welford) and approximate quantiles (a merging t-digest per day)."""
+import numpy as np
+from statistics import NormalDist
+from typing import Tuple
+
+COMPRESSION = 50 # t-digest compression: about this many centroids are kept per day
+
+
+class SeriesStatistics:
+    """Per-day statistics of a series, fed one trial's series at a time and mergeable
+        with the statistics gathered in other processes."""
+
+    def __init__(self, length: int, compression: int = COMPRESSION) -> None:
+        self.length = length
+        self.compression = compression
+        # Welford's running mean and sum of squared deviations
+        self.count = 0
+        self.mean = np.zeros(length)
+        self.squared_deviations = np.zeros(length)
+        # t-digest centroids, one row per day; every day sees the same number of
+        # values, so the rows stay the same width
+        self.centroid_means = np.zeros((length, 0))
+        self.centroid_weights = np.zeros((length, 0))
+
+    def __str__(self) -> str:
+        """Returns a pretty string summarizing the statistics."""
+        return f"Series length: {self.length}\nTrials: {self.count}\n" + \
+            f"Mean: {self.mean}\nStandard deviation: {np.sqrt(self.get_variance())}"
+
+    # ADDING METHODS
+    def add(self, series: np.ndarray) -> None:
+        """Adds one trial's series."""
+        series = np.asarray(series, dtype=float)
+        self.count += 1
+        delta = series - self.mean
+        self.mean += delta / self.count
+        self.squared_deviations += delta * (series - self.mean)
+        self.centroid_means = np.concatenate([self.centroid_means, series[:, None]], axis=1)
+        self.centroid_weights = np.concatenate([self.centroid_weights, np.ones((self.length, 1))], axis=1)
+        if self.centroid_means.shape[1] > 2 * self.compression:
+            self.__compress()
+
+    def merge(self, other: "SeriesStatistics") -> None:
+        """Adds the trials summarized by other, e.g. from another worker process."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.squared_deviations += other.squared_deviations + delta**2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.centroid_means = np.concatenate([self.centroid_means, other.centroid_means], axis=1)
+        self.centroid_weights = np.concatenate([self.centroid_weights, other.centroid_weights], axis=1)
+        self.__compress()
+
+    def __compress(self) -> None:
+        """Merges neighbouring centroids of every day at once, keeping more of them
+            in the tails where quantiles need the resolution (t-digest k1 scale)."""
+        order = np.argsort(self.centroid_means, axis=1)
+        means = np.take_along_axis(self.centroid_means, order, axis=1)
+        weights = np.take_along_axis(self.centroid_weights, order, axis=1)
+        totals = weights.sum(axis=1, keepdims=True)
+        # Quantile at the centre of each centroid, mapped to a bucket
+        centres = (np.cumsum(weights, axis=1) - weights / 2) / np.where(totals > 0, totals, 1)
+        buckets = np.floor(self.compression * (np.arcsin(2*centres - 1) / np.pi + 0.5)).astype(int)
+        buckets = np.clip(buckets, 0, self.compression)
+        width = self.compression + 1
+        flat = (np.arange(self.length)[:, None] * width + buckets).ravel()
+        merged_weights = np.bincount(flat, weights=weights.ravel(), minlength=self.length * width)
+        merged_sums = np.bincount(flat, weights=(weights * means).ravel(), minlength=self.length * width)
+        merged_weights = merged_weights.reshape(self.length, width)
+        merged_sums = merged_sums.reshape(self.length, width)
+        self.centroid_weights = merged_weights
+        self.centroid_means = np.divide(merged_sums, merged_weights, out=np.zeros_like(merged_sums),
+                                        where=merged_weights > 0)
+
+    # GETTER METHODS
+    def get_count(self) -> int:
+        """Returns the number of trials added."""
+        return self.count
+
+    def get_mean(self) -> np.ndarray:
+        """Returns the per-day mean."""
+        return self.mean.copy()
+
+    def get_variance(self) -> np.ndarray:
+        """Returns the per-day sample variance."""
+        if self.count < 2:
+            return np.full(self.length, np.nan)
+        return self.squared_deviations / (self.count - 1)
+
+    def get_standard_error(self) -> np.ndarray:
+        """Returns the per-day standard error of the mean."""
+        return np.sqrt(self.get_variance() / max(self.count, 1))
+
+    def get_confidence_half_width(self, confidence: float = 0.95) -> np.ndarray:
+        """Returns the per-day half-width of the normal-approximation confidence
+            interval of the mean (infinite with fewer than two trials)."""
+        if self.count < 2:
+            return np.full(self.length, np.inf)
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        return z * self.get_standard_error()
+
+    def get_quantile(self, q: float) -> np.ndarray:
+        """Returns the approximate per-day q-quantile across trials."""
+        quantiles = np.full(self.length, np.nan)
+        for day in range(self.length):
+            present = self.centroid_weights[day] > 0
+            means = self.centroid_means[day, present]
+            weights = self.centroid_weights[day, present]
+            if len(means) == 0:
+                continue
+            order = np.argsort(means)
+            means, weights = means[order], weights[order]
+            centres = (np.cumsum(weights) - weights / 2) / weights.sum()
+            quantiles[day] = np.interp(q, centres, means)
+        return quantiles
+
+    def get_band(self, lower: float = 0.05, upper: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the per-day (lower, upper) quantiles, the spread of the trials."""
+        return self.get_quantile(lower), self.get_quantile(upper)
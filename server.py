@@ -0,0 +1,282 @@
+"""A local simulation job server: clients submit scenarios over a localhost socket, the
+    runs are queued onto a process pool, and per-day metrics and heat-map snapshots
+    stream back to every client watching the job. Standard library only.
+
+    The protocol is one JSON object per line. Requests:
+        {"op": "submit", "scenario": {...}, "snapshot_every": 30}
+        {"op": "watch", "job": "job-1"}
+        {"op": "cancel", "job": "job-1"}
+        {"op": "status"}
+"""
+import asyncio
+import itertools
+import json
+import multiprocessing
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+
+import batch
+import metrics
+from world import World
+
+HOST = "127.0.0.1"
+PORT = 8765
+SNAPSHOT_EVERY = 30 # days between heat-map snapshots
+TERMINAL_STATES = ("done", "cancelled", "failed")
+JOB_TTL = 3600 # seconds a finished job stays around for status and late watchers
+# Scenario options whose results cannot be streamed day by day
+UNSTREAMABLE_OPTIONS = ("steady_state", "final_state")
+
+
+def heat_map_snapshot(world: World) -> Dict[str, list]:
+    """Returns [row, col, amount consumed] of every cell of each Fungus of world,
+        none on engines without cells."""
+    return {fungus.name: [[int(row), int(col), float(consumed)] for (row, col), consumed in fungus.locations.items()]
+            if hasattr(fungus, "locations") else []
+            for fungus in world.get_environment().get_fungi_list()}
+
+def stream_run(job_id: str, index: list, descriptor: dict, snapshot_every: int, events, cancelled) -> None:
+    """Runs one World of a job, putting its metrics each sampled day and a heat-map
+        snapshot every snapshot_every days onto events, until done or the job is in
+        cancelled. Runs in the worker processes."""
+    world = batch.build_world(descriptor)
+    days = descriptor["days"]
+    every = descriptor["sample_every"]
+    times = metrics.sample_times(days, every)
+    for i, time in enumerate(times):
+        if job_id in cancelled:
+            return
+        if i > 0:
+            world.run(time - times[i - 1], fast_forward=descriptor["fast_forward"],
+                        macro_step=descriptor["macro_step"])
+        values = {name: float(metrics.METRICS[name](world)) for name in descriptor["metrics"]}
+        events.put((job_id, {"type": "progress", "run": index, "day": int(time), "metrics": values}))
+        if snapshot_every and time % snapshot_every < every:
+            events.put((job_id, {"type": "snapshot", "run": index, "day": int(time),
+                                "cells": heat_map_snapshot(world)}))
+    events.put((job_id, {"type": "run_done", "run": index}))
+
+
+class Job:
+    """A submitted scenario: its runs, its state and the latest events sent."""
+
+    def __init__(self, job_id: str, key: str, scenario: dict, snapshot_every: int) -> None:
+        self.job_id = job_id
+        self.key = key
+        self.scenario = scenario
+        self.snapshot_every = snapshot_every
+        self.runs = batch.scenario_runs(scenario)
+        self.runs_left = len(self.runs)
+        self.state = "queued"
+        self.futures = []
+        self.finished_at = None
+        # What late watchers are replayed: the latest progress and snapshot of
+        # each run, and the terminal event once there is one
+        self.progress = {}
+        self.snapshots = {}
+        self.terminal = None
+        self.watchers = set()
+
+    def publish(self, event: dict) -> None:
+        """Records an event and sends it to every watcher."""
+        if event["type"] == "snapshot":
+            self.snapshots[tuple(event["run"])] = event
+        elif event["type"] == "progress":
+            self.progress[tuple(event["run"])] = event
+        else:
+            self.terminal = event
+        for watcher in self.watchers:
+            watcher.put_nowait(event)
+
+    def replay(self) -> List[dict]:
+        """Returns the events a new watcher has missed."""
+        return list(self.progress.values()) + list(self.snapshots.values()) + \
+            ([self.terminal] if self.terminal is not None else [])
+
+    def get_status(self) -> dict:
+        """Returns a summary of the job for status requests."""
+        return {"job": self.job_id,
+                "name": self.scenario["name"],
+                "state": self.state,
+                "runs": len(self.runs),
+                "runs_left": self.runs_left,
+                "watchers": len(self.watchers)}
+
+
+class JobServer:
+    """Queues submitted jobs onto a process pool and streams their progress.
+        Finished jobs are forgotten job_ttl seconds after they end."""
+
+    def __init__(self, workers: int = None, job_ttl: float = JOB_TTL) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.manager = multiprocessing.Manager()
+        self.events = self.manager.Queue()
+        self.cancelled = self.manager.dict()
+        self.jobs: Dict[str, Job] = {}
+        self.in_flight: Dict[str, Job] = {}
+        self.job_ids = itertools.count(1)
+        self.job_ttl = job_ttl
+        self.loop = None
+
+    # JOB METHODS
+    def submit(self, scenario: dict, snapshot_every: int = SNAPSHOT_EVERY) -> dict:
+        """Queues a scenario, or returns the job already running an identical one."""
+        scenario = batch.normalize_scenario(scenario)
+        for option in UNSTREAMABLE_OPTIONS:
+            if scenario[option]:
+                raise ValueError(f"{option} runs cannot be streamed; run them with batch instead")
+        key = json.dumps([scenario, snapshot_every], sort_keys=True)
+        if key in self.in_flight:
+            return {"job": self.in_flight[key].job_id, "reused": True}
+        job = Job(f"job-{next(self.job_ids)}", key, scenario, snapshot_every)
+        self.jobs[job.job_id] = job
+        self.in_flight[key] = job
+        for index, descriptor in job.runs:
+            future = self.pool.submit(stream_run, job.job_id, list(index), descriptor,
+                                    snapshot_every, self.events, self.cancelled)
+            future.add_done_callback(lambda future, job=job: self.loop.call_soon_threadsafe(self.__run_finished, job, future))
+            job.futures.append(future)
+        return {"job": job.job_id, "reused": False}
+
+    def cancel(self, job_id: str) -> dict:
+        """Cancels a job: queued runs never start and running ones stop at their next day."""
+        job = self.jobs[job_id]
+        if job.state not in TERMINAL_STATES:
+            self.cancelled[job_id] = True
+            for future in job.futures:
+                future.cancel()
+            self.__finish(job, "cancelled")
+        return {"job": job_id, "state": job.state}
+
+    def __finish(self, job: Job, state: str, **details) -> None:
+        """Moves a job to a terminal state and tells its watchers."""
+        job.state = state
+        job.finished_at = time.monotonic()
+        self.in_flight.pop(job.key, None)
+        job.publish({"type": state, **details})
+
+    def __evict_expired(self) -> None:
+        """Forgets the jobs that finished more than job_ttl seconds ago."""
+        now = time.monotonic()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and now - job.finished_at >= self.job_ttl:
+                del self.jobs[job_id]
+
+    def __run_finished(self, job: Job, future) -> None:
+        """Fails the job if one of its runs raised, and drops its cancellation once
+            none of its runs can still read it."""
+        if not future.cancelled() and job.state not in TERMINAL_STATES and future.exception() is not None:
+            self.cancelled[job.job_id] = True
+            self.__finish(job, "failed", error=repr(future.exception()))
+        if all(future.done() for future in job.futures):
+            self.cancelled.pop(job.job_id, None)
+
+    def __dispatch(self, job_id: str, event: dict) -> None:
+        """Hands an event from the workers to its job, on the event loop."""
+        job = self.jobs.get(job_id)
+        if job is None or job.state in TERMINAL_STATES:
+            return
+        job.state = "running"
+        if event["type"] == "run_done":
+            job.runs_left -= 1
+            if job.runs_left == 0:
+                self.__finish(job, "done")
+            return
+        job.publish(event)
+
+    def __pump_events(self) -> None:
+        """Moves events from the worker queue onto the event loop until told to stop."""
+        while True:
+            item = self.events.get()
+            if item is None:
+                return
+            self.loop.call_soon_threadsafe(self.__dispatch, *item)
+
+    # CONNECTION METHODS
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of one client, one JSON object per line."""
+        async def send(message: dict) -> None:
+            writer.write((json.dumps(message) + "\n").encode())
+            await writer.drain()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self.__evict_expired()
+                    request = json.loads(line)
+                    op = request["op"]
+                    if op == "submit":
+                        await send(self.submit(request["scenario"], request.get("snapshot_every", SNAPSHOT_EVERY)))
+                    elif op == "cancel":
+                        await send(self.cancel(request["job"]))
+                    elif op == "status":
+                        await send({"jobs": [job.get_status() for job in self.jobs.values()]})
+                    elif op == "watch":
+                        await self.__watch(self.jobs[request["job"]], send)
+                    else:
+                        raise ValueError(f"Unknown op: {op}")
+                except (KeyError, ValueError, TypeError) as error:
+                    await send({"type": "error", "error": repr(error)})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __watch(self, job: Job, send) -> None:
+        """Sends a job's events so far, then its live events until it ends."""
+        watcher = asyncio.Queue()
+        job.watchers.add(watcher)
+        try:
+            for event in job.replay():
+                await send(event)
+            if job.state in TERMINAL_STATES:
+                return
+            while True:
+                event = await watcher.get()
+                await send(event)
+                if event["type"] in TERMINAL_STATES:
+                    return
+        finally:
+            job.watchers.discard(watcher)
+
+    async def serve(self, host: str = HOST, port: int = PORT) -> None:
+        """Serves clients on host:port until cancelled."""
+        self.loop = asyncio.get_running_loop()
+        pump = threading.Thread(target=self.__pump_events, daemon=True)
+        pump.start()
+        server = await asyncio.start_server(self.__handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for job in list(self.in_flight.values()):
+                self.cancel(job.job_id)
+            self.events.put(None)
+            pump.join()
+            self.pool.shutdown(cancel_futures=True)
+            self.manager.shutdown()
+
+
+def serve(host: str = HOST, port: int = PORT, workers: int = None) -> None:
+    """Runs a JobServer until interrupted."""
+    try:
+        asyncio.run(JobServer(workers).serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+def request(message: dict, host: str = HOST, port: int = PORT) -> Iterator[dict]:
+    """Sends one request to a running server and yields its replies: one for submit,
+        cancel and status, and the job's events until it ends for watch."""
+    with socket.create_connection((host, port)) as connection:
+        connection.sendall((json.dumps(message) + "\n").encode())
+        replies = connection.makefile()
+        for line in replies:
+            reply = json.loads(line)
+            yield reply
+            if message["op"] != "watch" or reply["type"] in TERMINAL_STATES + ("error",):
+                return
@@ -0,0 +1,66 @@
+"""Arrays in shared memory, for moving results out of worker processes without
+    pickling them: the parent allocates a block per array and hands the workers a
+    small descriptor of the blocks, and each worker attaches to them and writes
+    its part in place. Only the descriptor and an index pass through the pipe,
+    however large the arrays are."""
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+# Blocks this worker process has attached, by block name, kept open between tasks
+_ATTACHED = {}
+
+
+class SharedArrays:
+    """Named arrays, each in a shared memory block the instance owns. Use it in a
+        with block: the blocks are freed when it ends, so no view of the arrays may
+        be kept past it."""
+
+    __slots__ = ("blocks", "arrays")
+
+    def __init__(self, specs: Dict[str, Tuple[tuple, str]]) -> None:
+        self.blocks = {}
+        self.arrays = {}
+        try:
+            for name, (shape, dtype) in specs.items():
+                # New shared memory reads as zeros
+                size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+                self.blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+                self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=self.blocks[name].buf)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def descriptor(self) -> Dict[str, Tuple[str, tuple, str]]:
+        """Returns what attach needs to find the arrays: {name: (block, shape, dtype)}."""
+        return {name: (self.blocks[name].name, array.shape, array.dtype.str) for name, array in self.arrays.items()}
+
+    def close(self) -> None:
+        """Drops the arrays and frees their blocks."""
+        # Emptied in place, so that dictionaries handed out let go of their views too
+        self.arrays.clear()
+        for block in self.blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                # A view is still held somewhere; the mapping goes when it does
+                pass
+            block.unlink()
+        self.blocks = {}
+
+
+def attach(descriptor: Dict[str, Tuple[str, tuple, str]]) -> Dict[str, np.ndarray]:
+    """Returns the arrays of a SharedArrays descriptor, writable in place. Runs in
+        the worker processes, which attach each block once."""
+    arrays = {}
+    for name, (block, shape, dtype) in descriptor.items():
+        if block not in _ATTACHED:
+            _ATTACHED[block] = shared_memory.SharedMemory(name=block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=_ATTACHED[block].buf)
+    return arrays
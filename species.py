@@ -0,0 +1,107 @@
+"""Species registry: the parameters of every Fungus species, loaded from a table."""
+import csv
+import os
+import numpy as np
+from functools import lru_cache
+from typing import List, Tuple
+
+import utilities
+from fungus import Fungus
+
+SPECIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "species.csv")
+
+# One record per species
+SPECIES_DTYPE = np.dtype([("name", "U64"),
+                        ("decay_intercept", float),
+                        ("decay_slope", float),
+                        ("optimal_temperature", float),
+                        ("max_temperature", float),
+                        ("min_temperature", float),
+                        ("optimal_moisture", float),
+                        ("moisture_width", float),
+                        ("hyphal_growth_rate", float),
+                        ("hyphal_density", float),
+                        ("competitive_ranking", float),
+                        ("expansion_threshold", float)])
+
+
+def load_species(path: str = SPECIES_FILE) -> np.ndarray:
+    """Reads a species table (CSV with a header naming the SPECIES_DTYPE fields)
+        into a structured array."""
+    with open(path, newline="") as species_file:
+        rows = list(csv.DictReader(species_file))
+    return np.array([tuple(row[field] for field in SPECIES_DTYPE.names) for row in rows],
+                    dtype=SPECIES_DTYPE)
+
+@lru_cache(maxsize=None)
+def _default_table() -> np.ndarray:
+    """Loads SPECIES_FILE once per process."""
+    return load_species()
+
+def get_species_table() -> np.ndarray:
+    """Returns a copy of the default species table."""
+    return _default_table().copy()
+
+def species_names(table: np.ndarray = None) -> List[str]:
+    """Returns the names of the species in table (the default table if None)."""
+    table = table if table is not None else _default_table()
+    return [str(name) for name in table["name"]]
+
+def species_index(name: str, table: np.ndarray = None) -> int:
+    """Returns the row of the species called name in table."""
+    table = table if table is not None else _default_table()
+    matches = np.flatnonzero(table["name"] == name)
+    if len(matches) == 0:
+        raise KeyError(f"Unknown species: {name}")
+    return int(matches[0])
+
+def select_species(names: List[str], table: np.ndarray = None) -> np.ndarray:
+    """Returns the rows of table for names, in the order given."""
+    table = table if table is not None else _default_table()
+    return table[[species_index(name, table) for name in names]]
+
+def with_parameter(table: np.ndarray, field: str, value, names: List[str] = None) -> np.ndarray:
+    """Returns a copy of table with field set to value for names (every species if None)."""
+    perturbed = table.copy()
+    rows = slice(None) if names is None else [species_index(name, table) for name in names]
+    perturbed[field][rows] = value
+    return perturbed
+
+def create_fungus(record: np.void, initial_locations: list) -> Fungus:
+    """Creates a Fungus at initial_locations with the parameters of one species record."""
+    return Fungus(initial_locations,
+                str(record["name"]),
+                (float(record["decay_intercept"]), float(record["decay_slope"])),
+                (float(record["optimal_temperature"]), float(record["max_temperature"]),
+                    float(record["min_temperature"])),
+                (float(record["optimal_moisture"]), float(record["moisture_width"])),
+                float(record["hyphal_growth_rate"]),
+                float(record["hyphal_density"]),
+                float(record["competitive_ranking"]),
+                float(record["expansion_threshold"]))
+
+
+# Vectorized model functions: one row per species in table, one column per day
+
+def survival_windows(table: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Returns arrays of the min temperature, max temperature, min moisture and max
+        moisture each species can live through, widened by the threshold multipliers."""
+    return (table["min_temperature"] - utilities.TEMPERATURE_THRESHOLD_MULTIPLIER * table["min_temperature"],
+            table["max_temperature"] + utilities.TEMPERATURE_THRESHOLD_MULTIPLIER * table["max_temperature"],
+            table["optimal_moisture"] - utilities.MOISTURE_THRESHOLD_MULTIPLIER * table["moisture_width"],
+            table["optimal_moisture"] + utilities.MOISTURE_THRESHOLD_MULTIPLIER * table["moisture_width"])
+
+def survivable_days(table: np.ndarray, temperatures: np.ndarray, moistures: np.ndarray) -> np.ndarray:
+    """Returns a (species, days) boolean array that is True where the climate
+        does not kill the species."""
+    min_temperature, max_temperature, min_moisture, max_moisture = (window[:, None] for window in survival_windows(table))
+    return ((temperatures <= max_temperature) & (temperatures >= min_temperature)
+            & (moistures <= max_moisture) & (moistures >= min_moisture))
+
+def consumption_factors(table: np.ndarray, temperatures: np.ndarray, moistures: np.ndarray) -> np.ndarray:
+    """Returns a (species, days) array of the fraction of a cell's original biomass
+        each species eats per day, zero on the days the climate kills it."""
+    decay = table["decay_intercept"][:, None] + table["decay_slope"][:, None] * temperatures
+    optimal_moisture = table["optimal_moisture"][:, None]
+    multiplier = np.abs((moistures - np.abs(optimal_moisture - moistures)) / optimal_moisture)
+    return np.where(survivable_days(table, temperatures, moistures), decay * multiplier, 0)
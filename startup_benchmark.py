@@ -0,0 +1,69 @@
+"""Startup benchmark: times importing the simulation core and building a first World
+    in fresh interpreters, the cost every short-lived worker process pays, and fails
+    when it goes over budget."""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+# Modules a worker needs to run a World
+CORE_MODULES = ["grid", "climate", "fungus", "species", "environment", "world", "metrics"]
+# Modules the core must not pull in
+FORBIDDEN_MODULES = ["matplotlib", "graphing"]
+IMPORT_TIME_BUDGET = 0.3 # seconds
+FIRST_WORLD_BUDGET = 0.25 # seconds
+
+# Runs in the fresh interpreter and prints its measurements as JSON
+MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+imported = time.perf_counter()
+from world import World
+World("Rainforest", (100, 100), ["Phlebia rufa", "Phellinus gilvus"], seed=0).run(1)
+built = time.perf_counter()
+print(json.dumps({{"import_seconds": imported - start,
+                  "first_world_seconds": built - imported,
+                  "forbidden": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure_startup() -> Dict[str, float]:
+    """Measures one cold start of the core in a fresh interpreter."""
+    script = MEASURE_SCRIPT.format(modules=CORE_MODULES, forbidden=FORBIDDEN_MODULES)
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-c", script], cwd=here, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def run_benchmark(repeats: int = 5) -> Dict[str, float]:
+    """Returns the fastest of repeats cold starts, which is the least noisy estimate."""
+    measurements = [measure_startup() for _ in range(repeats)]
+    return {"import_seconds": min(m["import_seconds"] for m in measurements),
+            "first_world_seconds": min(m["first_world_seconds"] for m in measurements),
+            "forbidden": sorted({name for m in measurements for name in m["forbidden"]})}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_TIME_BUDGET)
+    parser.add_argument("--world-budget", type=float, default=FIRST_WORLD_BUDGET)
+    arguments = parser.parse_args()
+    result = run_benchmark(arguments.repeats)
+    print(f"Core import: {result['import_seconds']*1000:.1f} ms (budget {arguments.import_budget*1000:.0f} ms)")
+    print(f"First World: {result['first_world_seconds']*1000:.1f} ms (budget {arguments.world_budget*1000:.0f} ms)")
+    failures = []
+    if result["forbidden"]:
+        failures.append(f"core imported {', '.join(result['forbidden'])}")
+    if result["import_seconds"] > arguments.import_budget:
+        failures.append("core import over budget")
+    if result["first_world_seconds"] > arguments.world_budget:
+        failures.append("first World over budget")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
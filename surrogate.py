@@ -0,0 +1,225 @@
+"""A surrogate for scenario queries: a Gaussian-process emulator of total decomposition
+    after some days, trained on a designed batch of World runs over climate, species
+    presence and utilities constants. It answers in milliseconds with an error
+    estimate and falls back to simulation when that error is too large."""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+from scipy.stats import qmc
+from typing import Dict, List, Tuple
+
+import species
+import utilities
+from climate import CLIMATE_NAMES
+from world import World
+
+GRID_SIZE = (50, 50)
+DAYS_RANGE = (30, 730)
+# utilities constants the surrogate can vary, with the range it is trained on
+PARAMETER_RANGES = {"TEMPERATURE_THRESHOLD_MULTIPLIER": (0.1, 0.3),
+                    "MOISTURE_THRESHOLD_MULTIPLIER": (0.2, 0.6)}
+MAX_RELATIVE_ERROR = 0.1 # largest predicted relative error answered without simulating
+FALLBACK_TRIALS = 4
+
+
+def simulate_point(point: dict) -> float:
+    """Runs one World of a design point and returns the total substrate eaten.
+        Runs in the worker processes."""
+    with utilities.override_constants(point["parameters"]):
+        world = World(point["climate"], point["grid_size"], point["fungi"], seed=point["seed"])
+        world.run(point["days"], macro_step=point["macro_step"])
+        return sum(fungus.get_total_amount_of_substrate_eaten() for fungus in world.get_environment().get_fungi_list())
+
+def design_points(size: int,
+                climates: List[str] = None,
+                species_names: List[str] = None,
+                days_range: Tuple[int, int] = DAYS_RANGE,
+                parameter_ranges: Dict[str, Tuple[float, float]] = None,
+                grid_size: Tuple[int, int] = GRID_SIZE,
+                seed: int = 0,
+                macro_step: bool = False) -> List[dict]:
+    """Returns size design points: a Latin hypercube over days and the utilities
+        constants, climates taken in turn and a random non-empty species set each.
+        With macro_step the points are simulated with block steps."""
+    climates = climates if climates is not None else CLIMATE_NAMES
+    species_names = species_names if species_names is not None else species.species_names()
+    parameter_ranges = parameter_ranges if parameter_ranges is not None else PARAMETER_RANGES
+    rng = np.random.default_rng(seed)
+    cube = qmc.LatinHypercube(d=1 + len(parameter_ranges), seed=rng).random(size)
+    points = []
+    for i in range(size):
+        present = rng.random(len(species_names)) < 0.5
+        present[rng.integers(len(species_names))] = True
+        points.append({"climate": climates[i % len(climates)],
+                        "fungi": [name for name, keep in zip(species_names, present) if keep],
+                        "days": int(round(days_range[0] + cube[i, 0] * (days_range[1] - days_range[0]))),
+                        "parameters": {name: low + cube[i, 1 + p] * (high - low)
+                                        for p, (name, (low, high)) in enumerate(parameter_ranges.items())},
+                        "grid_size": grid_size,
+                        "seed": seed * 100003 + i,
+                        "macro_step": macro_step})
+    return points
+
+
+class Surrogate:
+    """Gaussian-process emulator of log(1 + total substrate eaten) with one length
+        scale per input (climate one-hot, species presence, days, constants)."""
+
+    def __init__(self,
+                climates: List[str] = None,
+                species_names: List[str] = None,
+                days_range: Tuple[int, int] = DAYS_RANGE,
+                parameter_ranges: Dict[str, Tuple[float, float]] = None,
+                grid_size: Tuple[int, int] = GRID_SIZE,
+                macro_step: bool = False) -> None:
+        self.climates = climates if climates is not None else list(CLIMATE_NAMES)
+        self.species_names = species_names if species_names is not None else species.species_names()
+        self.days_range = days_range
+        self.parameter_ranges = parameter_ranges if parameter_ranges is not None else dict(PARAMETER_RANGES)
+        self.grid_size = grid_size
+        # Whether the training runs take block steps instead of the reference day
+        self.macro_step = macro_step
+        self.inputs = np.zeros((0, self.__num_features()))
+        self.targets = np.zeros(0)
+        # Log length scales, log signal variance, log noise variance
+        self.hyperparameters = np.zeros(self.__num_features() + 2)
+        self.target_mean = 0.0
+        self.cholesky = None
+        self.weights = None
+
+    def __num_features(self) -> int:
+        """Returns the number of inputs of the emulator."""
+        return len(self.climates) + len(self.species_names) + 1 + len(self.parameter_ranges)
+
+    def features(self, climate: str, fungi: List[str], days: int, parameters: Dict[str, float] = None) -> np.ndarray:
+        """Returns the emulator's inputs for a query, each scaled to [0, 1]."""
+        parameters = parameters if parameters is not None else {}
+        unknown = set(parameters) - set(self.parameter_ranges)
+        if unknown:
+            raise KeyError(f"The surrogate was not trained over: {sorted(unknown)}")
+        climate_part = np.array([climate == name for name in self.climates], dtype=float)
+        species_part = np.array([name in fungi for name in self.species_names], dtype=float)
+        low, high = self.days_range
+        parameter_part = [(parameters.get(name, getattr(utilities, name)) - low_p) / (high_p - low_p)
+                        for name, (low_p, high_p) in self.parameter_ranges.items()]
+        return np.concatenate([climate_part, species_part, [(days - low) / (high - low)], parameter_part])
+
+    def __kernel(self, a: np.ndarray, b: np.ndarray, hyperparameters: np.ndarray) -> np.ndarray:
+        """Returns the squared-exponential kernel between the rows of a and b."""
+        scales = np.exp(hyperparameters[:-2])
+        distances = (((a[:, None, :] - b[None, :, :]) / scales)**2).sum(axis=2)
+        return np.exp(hyperparameters[-2]) * np.exp(-0.5 * distances)
+
+    def __covariance(self, hyperparameters: np.ndarray) -> np.ndarray:
+        """Returns the covariance of the training targets, noise included."""
+        covariance = self.__kernel(self.inputs, self.inputs, hyperparameters)
+        covariance[np.diag_indices_from(covariance)] += np.exp(hyperparameters[-1]) + 1e-8
+        return covariance
+
+    def __negative_log_likelihood(self, hyperparameters: np.ndarray) -> float:
+        """Returns the negative log marginal likelihood of the training data."""
+        try:
+            factor = cho_factor(self.__covariance(hyperparameters), lower=True)
+        except np.linalg.LinAlgError:
+            return 1e25
+        centred = self.targets - self.target_mean
+        return float(0.5 * centred @ cho_solve(factor, centred) + np.log(np.diag(factor[0])).sum())
+
+    def add_points(self, points: List[dict], totals: List[float]) -> None:
+        """Adds simulated design points and their totals to the training data."""
+        inputs = [self.features(point["climate"], point["fungi"], point["days"], point["parameters"]) for point in points]
+        self.inputs = np.vstack([self.inputs] + [np.array(inputs).reshape(-1, self.__num_features())])
+        self.targets = np.concatenate([self.targets, np.log1p(np.asarray(totals, dtype=float))])
+
+    def fit(self) -> None:
+        """Fits the hyperparameters by maximum marginal likelihood and factors the
+            training covariance for prediction."""
+        self.target_mean = float(self.targets.mean())
+        variance = max(float(self.targets.var()), 1e-6)
+        start = np.concatenate([np.zeros(self.__num_features()), [np.log(variance), np.log(0.01 * variance)]])
+        bounds = [(-3, 5)] * self.__num_features() + [(np.log(variance) - 5, np.log(variance) + 5),
+                                                    (np.log(variance) - 12, np.log(variance))]
+        result = minimize(self.__negative_log_likelihood, start, method="L-BFGS-B", bounds=bounds)
+        self.factor(result.x)
+
+    def factor(self, hyperparameters: np.ndarray) -> None:
+        """Sets the hyperparameters and factors the training covariance for prediction."""
+        self.target_mean = float(self.targets.mean())
+        self.hyperparameters = hyperparameters
+        self.cholesky = cho_factor(self.__covariance(hyperparameters), lower=True)
+        self.weights = cho_solve(self.cholesky, self.targets - self.target_mean)
+
+    def train(self, size: int, seed: int = 0, workers: int = None) -> None:
+        """Simulates size design points across a pool of workers and fits the emulator."""
+        points = design_points(size, self.climates, self.species_names, self.days_range,
+                            self.parameter_ranges, self.grid_size, seed, self.macro_step)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            totals = list(pool.map(simulate_point, points))
+        self.add_points(points, totals)
+        self.fit()
+
+    def predict(self, climate: str, fungi: List[str], days: int,
+                parameters: Dict[str, float] = None) -> Tuple[float, float]:
+        """Returns the predicted total substrate eaten and its standard error, which
+            includes the run-to-run noise of a single simulation."""
+        if self.weights is None:
+            raise RuntimeError("The surrogate has not been trained; train it, or fit it after add_points")
+        x = self.features(climate, fungi, days, parameters)[None, :]
+        cross = self.__kernel(x, self.inputs, self.hyperparameters)[0]
+        mean = self.target_mean + cross @ self.weights
+        variance = np.exp(self.hyperparameters[-2]) + np.exp(self.hyperparameters[-1]) - \
+                    cross @ cho_solve(self.cholesky, cross)
+        deviation = np.sqrt(max(float(variance), 0.0))
+        # Back from log(1 + total): the median and the delta-method standard error
+        total = float(np.expm1(mean))
+        return total, float(np.exp(mean) * deviation)
+
+    def query(self, climate: str, fungi: List[str], days: int, parameters: Dict[str, float] = None,
+            max_relative_error: float = MAX_RELATIVE_ERROR, trials: int = FALLBACK_TRIALS,
+            seed: int = 0, learn: bool = True) -> dict:
+        """Answers a query from the emulator when its relative error is at most
+            max_relative_error, otherwise by simulating trials Worlds; with learn, the
+            simulations are added to the training data and the emulator refitted."""
+        parameters = parameters if parameters is not None else {}
+        total, error = self.predict(climate, fungi, days, parameters)
+        if error <= max_relative_error * max(abs(total), 1e-12):
+            return {"total_substrate_eaten": total, "standard_error": error, "source": "surrogate"}
+        points = [{"climate": climate, "fungi": list(fungi), "days": days,
+                    "parameters": {**{name: getattr(utilities, name) for name in self.parameter_ranges}, **parameters},
+                    "grid_size": self.grid_size, "seed": seed + trial, "macro_step": self.macro_step}
+                    for trial in range(trials)]
+        totals = [simulate_point(point) for point in points]
+        if learn:
+            self.add_points(points, totals)
+            self.fit()
+        return {"total_substrate_eaten": float(np.mean(totals)),
+                "standard_error": float(np.std(totals, ddof=1) / np.sqrt(trials)) if trials > 1 else float("nan"),
+                "source": "simulation"}
+
+    def save(self, path: str) -> None:
+        """Writes the training data and fitted hyperparameters to a .npz file."""
+        np.savez_compressed(path, inputs=self.inputs, targets=self.targets, hyperparameters=self.hyperparameters,
+                            climates=np.array(self.climates), species_names=np.array(self.species_names),
+                            days_range=np.array(self.days_range), grid_size=np.array(self.grid_size),
+                            parameter_names=np.array(list(self.parameter_ranges)),
+                            parameter_ranges=np.array(list(self.parameter_ranges.values())),
+                            macro_step=np.array(self.macro_step))
+
+
+def load_surrogate(path: str) -> Surrogate:
+    """Reads a Surrogate written by Surrogate.save, ready to answer queries."""
+    with np.load(path) as archive:
+        surrogate = Surrogate([str(name) for name in archive["climates"]],
+                            [str(name) for name in archive["species_names"]],
+                            tuple(int(day) for day in archive["days_range"]),
+                            {str(name): tuple(bounds) for name, bounds in zip(archive["parameter_names"],
+                                                                            archive["parameter_ranges"])},
+                            tuple(int(size) for size in archive["grid_size"]),
+                            bool(archive["macro_step"]) if "macro_step" in archive.files else True)
+        # Surrogates saved before macro_step was kept were all trained with block steps
+        surrogate.inputs = archive["inputs"]
+        surrogate.targets = archive["targets"]
+        hyperparameters = archive["hyperparameters"]
+    surrogate.factor(hyperparameters)
+    return surrogate
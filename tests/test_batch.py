@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+import batch
+import metrics
+
+SHM = "/dev/shm"
+
+
+def small_scenario(**options) -> dict:
+    return batch.normalize_scenario({"name": "small",
+                                    "climates": ["Rainforest", "Shrubland"],
+                                    "species_sets": [["Phlebia rufa", "Phellinus gilvus"], ["Schizophyllum commune"]],
+                                    "grid_size": [12, 12],
+                                    "days": 40,
+                                    "sample_every": 5,
+                                    "trials": 2,
+                                    **options})
+
+def shared_blocks() -> set:
+    return {name for name in os.listdir(SHM) if name.startswith("psm_")}
+
+
+def test_shared_memory_results_equal_in_process_runs():
+    scenario = small_scenario(final_state=True)
+    results = batch.run_scenario(scenario, workers=2)
+    assert set(results) == set(batch.result_specs(scenario))
+    assert list(metrics.sample_times(scenario["days"], scenario["sample_every"]))[-2:] == [35, 40]
+    for index, descriptor in batch.scenario_runs(scenario):
+        world, series = batch.simulate_descriptor(descriptor)
+        for name, values in series.items():
+            assert np.array_equal(results[name][index], values), (name, index)
+        # The last sample is the final day, the state the final Grids hold
+        assert world.get_time() == scenario["days"]
+        for name in scenario["metrics"]:
+            assert results[name][index][-1] == metrics.METRICS[name](world), (name, index)
+        grid = world.get_environment().get_grid()
+        assert np.array_equal(results["final_biomass"][index], grid.get_current_biomass())
+        assert np.array_equal(results["final_occupancy"][index], grid.get_occupancy())
+
+@pytest.mark.skipif(not os.path.isdir(SHM), reason="needs a /dev/shm to look at")
+def test_no_shared_memory_is_left_behind():
+    before = shared_blocks()
+    batch.run_scenario(small_scenario(), workers=2)
+    assert shared_blocks() == before
+    with pytest.raises(RuntimeError):
+        with batch.scenario_results(small_scenario(), workers=2):
+            assert shared_blocks() != before
+            raise RuntimeError("reader failed")
+    assert shared_blocks() == before
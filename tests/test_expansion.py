@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import expansion
+
+
+def contested_row() -> tuple:
+    """A 1x3 row with species 0 and 1 at either end, both of which can only claim the middle cell."""
+    occupancy = np.array([[1 << 0, 0, 1 << 1]], dtype=np.uint16)
+    owners = np.array([0, 1])
+    rows = np.array([0, 0])
+    cols = np.array([0, 2])
+    return occupancy, owners, rows, cols, np.array([0.5, 0.5])
+
+
+def test_coexist_gives_a_contested_cell_to_every_claimant():
+    occupancy, owners, rows, cols, rolls = contested_row()
+    assert expansion.expand(occupancy, 2, owners, rows, cols, rolls, "coexist") == [[1], [1]]
+
+def test_coexist_claims_cells_of_other_species_only():
+    occupancy = np.array([[1 << 0, 1 << 1]], dtype=np.uint16)
+    gains = expansion.expand(occupancy, 2, np.array([0, 1]), np.array([0, 0]), np.array([0, 1]),
+                            np.array([0.5, 0.5]), "coexist")
+    assert gains == [[1], [0]]
+    for resolution in ("ranking", "random"):
+        assert expansion.expand(occupancy, 2, np.array([0, 1]), np.array([0, 0]), np.array([0, 1]),
+                                np.array([0.5, 0.5]), resolution, np.random.default_rng(0)) == [[], []]
+
+def test_ranking_gives_a_contested_cell_to_the_first_species():
+    occupancy, owners, rows, cols, rolls = contested_row()
+    assert expansion.expand(occupancy, 2, owners, rows, cols, rolls, "ranking") == [[1], []]
+    # Listing the claims the other way round doesn't change the rank
+    assert expansion.expand(occupancy, 2, owners[::-1], rows[::-1], cols[::-1], rolls, "ranking") == [[1], []]
+
+def test_random_gives_a_contested_cell_to_one_species_either_way():
+    occupancy, owners, rows, cols, rolls = contested_row()
+    rng = np.random.default_rng(0)
+    wins = np.zeros(2)
+    for _ in range(400):
+        gains = expansion.expand(occupancy, 2, owners, rows, cols, rolls, "random", rng)
+        assert sorted(gains, key=len) == [[], [1]]
+        wins += [len(gained) for gained in gains]
+    assert 150 < wins[0] < 250
+
+def test_claims_of_one_species_on_a_cell_count_once():
+    occupancy = np.array([[1, 0, 1]], dtype=np.uint16)
+    for resolution in expansion.RESOLUTIONS:
+        gains = expansion.expand(occupancy, 1, np.array([0, 0]), np.array([0, 0]), np.array([0, 2]),
+                                np.array([0.5, 0.5]), resolution, np.random.default_rng(0))
+        assert gains == [[1]]
+
+def test_unknown_resolution_is_rejected():
+    occupancy, owners, rows, cols, rolls = contested_row()
+    with pytest.raises(ValueError):
+        expansion.expand(occupancy, 2, owners, rows, cols, rolls, "merge")
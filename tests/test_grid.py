@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from grid import Grid
+from world import World
+
+FUNGI = ["Phlebia rufa", "Phellinus gilvus", "Schizophyllum commune"]
+
+
+def fine_world(world: World) -> World:
+    """Refines every block of a fresh World, so that every cell carries its own biomass."""
+    grid = world.get_environment().get_grid()
+    grid.refine(np.arange(grid.current_biomass.size))
+    return world
+
+
+def test_refined_block_keeps_what_was_added_while_coarse():
+    coarse = Grid(20, 20, 10, 2, np.random.default_rng(0))
+    fine = Grid(20, 20, 10, 2, np.random.default_rng(0))
+    fine.refine(np.arange(400))
+    for grid in (coarse, fine):
+        grid.add_value_everywhere(0.5)
+        grid.refine([3 * 20 + 4])
+        grid.add_value_everywhere(0.25)
+    assert coarse.refined.sum() == 1
+    assert np.allclose(coarse.get_current_biomass(), fine.get_current_biomass(), rtol=1e-12, atol=0)
+    assert coarse.average_biomass() == pytest.approx(fine.average_biomass(), rel=1e-12)
+    assert coarse.get_value_tuple_at_x_y(15, 15) == pytest.approx(fine.get_value_tuple_at_x_y(15, 15), rel=1e-12)
+
+@pytest.mark.parametrize("climate_type", ["Rainforest", "TemperateDeciduousForest", "Shrubland"])
+def test_coarse_blocks_give_the_fine_grid_results(climate_type):
+    coarse = World(climate_type, (30, 30), FUNGI, seed=1)
+    fine = fine_world(World(climate_type, (30, 30), FUNGI, seed=1))
+    coarse.run(200)
+    fine.run(200)
+    coarse_grid, fine_grid = coarse.get_environment().get_grid(), fine.get_environment().get_grid()
+    assert coarse_grid.refined.any() and not coarse_grid.refined.all()
+    assert np.array_equal(coarse_grid.get_occupancy(), fine_grid.get_occupancy())
+    assert np.array_equal(coarse_grid.dead_occupancy, fine_grid.dead_occupancy)
+    for coarse_fungus, fine_fungus in zip(coarse.get_environment().get_fungi_list(), fine.get_environment().get_fungi_list()):
+        assert coarse_fungus.get_total_amount_of_substrate_eaten() == fine_fungus.get_total_amount_of_substrate_eaten()
+    # Coarse cells add the biomass of every day at once, so they differ by rounding only
+    assert np.allclose(coarse_grid.get_current_biomass(), fine_grid.get_current_biomass(), rtol=1e-12, atol=0)
+    assert coarse_grid.average_biomass() == pytest.approx(fine_grid.average_biomass(), rel=1e-12)
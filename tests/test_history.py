@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from history import COLONIZATION, DEATH, RESURRECTION, History, HistoryRecorder
+from world import World
+
+DAYS = 75
+KEYFRAME_EVERY = 10
+
+
+@pytest.fixture(scope="module")
+def recorded(tmp_path_factory):
+    """A recorded history with the live occupancy bitmasks, amounts consumed and
+        biomass of every day it covers."""
+    world = World("TemperateDeciduousForest", (20, 20), ["Phlebia rufa", "Phellinus gilvus", "Schizophyllum commune"], seed=3)
+    grid = world.get_environment().get_grid()
+    fungi = world.get_environment().get_fungi_list()
+    recorder = HistoryRecorder(world, str(tmp_path_factory.mktemp("history")), KEYFRAME_EVERY)
+    def snapshot():
+        consumed = np.zeros((len(fungi), grid.num_rows * grid.num_cols), dtype=np.float32)
+        for s, fungus in enumerate(fungi):
+            for cell, amount in fungus.get_cells().items():
+                consumed[s, cell] = amount
+        return (grid.get_occupancy().copy(), grid.dead_occupancy.copy(),
+                consumed.reshape(-1, *grid.grid_size()), grid.get_current_biomass().astype(np.float32))
+    live = {world.get_time(): snapshot()}
+    for _ in range(DAYS):
+        recorder.record(1)
+        live[world.get_time()] = snapshot()
+    recorder.close()
+    return History(recorder.path), live
+
+
+def test_state_matches_the_live_occupancy_every_day(recorded):
+    history, live = recorded
+    assert list(history.get_days()) == sorted(live)
+    for day, (occupancy, dead_occupancy, _, _) in live.items():
+        state = history.get_state(day)
+        assert np.array_equal(state["occupancy"], occupancy), day
+        assert np.array_equal(state["dead_occupancy"], dead_occupancy), day
+
+def test_amounts_are_exact_between_keyframes(recorded):
+    history, live = recorded
+    states = history.get_states(history.get_days().start, history.get_days().stop - 1)
+    for state, (day, (_, _, consumed, current_biomass)) in zip(states, sorted(live.items())):
+        assert state["day"] == day
+        assert np.array_equal(state["consumed"], consumed), day
+        assert np.array_equal(state["current_biomass"], current_biomass), day
+        assert np.array_equal(state["consumed"], history.get_state(day)["consumed"]), day
+
+def test_history_covers_colonizations_and_deaths(recorded):
+    history, live = recorded
+    events = history.get_events(0, DAYS)
+    assert set(events["kind"].tolist()) == {COLONIZATION, DEATH, RESURRECTION}
+    # Days both on and between keyframes were checked
+    assert any(day % KEYFRAME_EVERY == 0 for day in live) and any(day % KEYFRAME_EVERY for day in live)
+
+def test_days_outside_the_history_are_rejected(recorded):
+    history, _ = recorded
+    with pytest.raises(ValueError):
+        history.get_state(history.get_days().stop)
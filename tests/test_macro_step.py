@@ -0,0 +1,102 @@
+from functools import partial
+
+import numpy as np
+
+import species
+import utilities
+from environment import Environment, ReferenceEngine
+from world import ENGINES, World, check_macro_step, macro_step_samples
+
+FUNGI = ["Phlebia rufa", "Phellinus gilvus", "Xylobolus subpileatus"]
+
+
+def test_macro_step_runs_every_day():
+    world = World("Shrubland", (15, 15), FUNGI, seed=0)
+    world.run(100, macro_step=True)
+    assert world.get_time() == 100
+    assert all(fungus.day == 100 for fungus in world.get_environment().get_fungi_list())
+
+def test_macro_step_keeps_biomass_balance():
+    # Biomass only comes in from the Climate and leaves as what the fungi eat
+    world = World("Rainforest", (15, 15), FUNGI, seed=1)
+    climate = world.get_environment().get_climate()
+    start = world.get_environment().get_grid().get_current_biomass().sum()
+    world.run(90, macro_step=True)
+    grid = world.get_environment().get_grid()
+    eaten = sum(fungus.get_total_amount_of_substrate_eaten() for fungus in world.get_environment().get_fungi_list())
+    inbound = climate.get_inbound_biomass_total(1, 90) * grid.num_rows * grid.num_cols
+    assert np.isclose(grid.get_current_biomass().sum(), start + inbound - eaten)
+
+def test_macro_step_is_equivalent_to_daily_steps():
+    assert check_macro_step("Shrubland", (10, 10), FUNGI, 60, trials=utilities.MACRO_STEP_TRIALS)
+
+def test_macro_step_samples_are_matched_by_trial():
+    samples = macro_step_samples("Rainforest", (10, 10), FUNGI, 20, 3)
+    assert set(samples) == {True, False}
+    assert all(values.shape == (3,) for values in samples[True].values())
+
+def starving_environment(seed: int):
+    """A 30x30 Environment filled with a species the climate never kills, on cells
+        too bare to ever feed it."""
+    table = species.get_species_table().copy()
+    index = list(table["name"]).index("Phlebia rufa")
+    table["min_temperature"][index], table["max_temperature"][index] = -1000, 1000
+    table["moisture_width"][index] = 1e9
+    world = World("Shrubland", (30, 30), ["Phlebia rufa"], seed=seed, species_table=table,
+                initial_locations={"Phlebia rufa": [(row, col) for row in range(30) for col in range(30)]})
+    environment = world.get_environment()
+    environment.get_grid().get_current_biomass_by_cell()[:] = -1e9
+    return environment
+
+def test_macro_step_lets_starving_dead_cells_come_back_the_same_day():
+    # Alive at the start, a cell starves on day 1 and then, dead at the start of
+    # each day, comes back with probability 0.4 only to starve the next day
+    days = utilities.DAYS_UNTIL_EXPANSION - 2
+    expected = 1.0
+    for _ in range(days - 1):
+        expected = 1 - 0.4 * expected
+    daily, block = starving_environment(0), starving_environment(0)
+    for day in range(1, days + 1):
+        daily.update(day)
+    block.macro_step(1, days)
+    for environment in (daily, block):
+        fungus = environment.get_fungi_list()[0]
+        assert abs(fungus.get_number_of_deaths() / 900 - expected) < 0.06
+
+class CountingEngine:
+    """An engine with only a daily update, counting the days it advances."""
+
+    def __init__(self) -> None:
+        self.days = []
+
+    def update(self, environment, time: int):
+        self.days.append(time)
+        ReferenceEngine().update(environment, time)
+
+class CountingSubclass(ReferenceEngine):
+    """A ReferenceEngine that changes the day but not the block step."""
+
+    def __init__(self) -> None:
+        self.days = []
+
+    def update(self, environment, time: int):
+        self.days.append(time)
+        super().update(environment, time)
+
+def test_macro_step_goes_through_the_engine(monkeypatch):
+    for engine in (CountingEngine(), CountingSubclass()):
+        monkeypatch.setitem(ENGINES, "counting", partial(Environment, engine=engine))
+        world = World("Rainforest", (10, 10), FUNGI, seed=0, engine="counting")
+        world.run(30, fast_forward=False, macro_step=True)
+        assert engine.days == list(range(1, 31))
+
+def test_conformance_checks_block_steps_against_the_daily_reference():
+    import conformance
+    arguments = ("grid", ["Shrubland"], FUNGI)
+    options = {"grid_size": (10, 10), "days": 120, "trials": 4}
+    same = conformance.check_engine(*arguments, **options)
+    stepped = conformance.check_engine(*arguments, **options, macro_step=True)
+    assert all(result["relative_difference_low"] == result["relative_difference_high"] == 0
+                for result in same["climates"]["Shrubland"]["metrics"].values())
+    assert any(result["relative_difference_low"] != result["relative_difference_high"]
+                for result in stepped["climates"]["Shrubland"]["metrics"].values())
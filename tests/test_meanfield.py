@@ -0,0 +1,24 @@
+import numpy as np
+
+from world import World, meanfield_calibration
+
+FUNGI = ["Phellinus robiniae", "Phellinus gilvus"]
+
+
+def test_calibration_compares_against_the_daily_grid():
+    report = meanfield_calibration(["Shrubland"], (8, 8), FUNGI, 60, 2, every=30)
+    cells = []
+    for seed in range(2):
+        world = World("Shrubland", (8, 8), FUNGI, seed=seed)
+        samples = []
+        for _ in range(2):
+            world.run(30)
+            samples.append(sum(fungus.get_number_of_fungal_cells() for fungus in world.get_environment().get_fungi_list()))
+        cells.append(np.mean(samples))
+    assert report["Shrubland"]["fungal_cells"]["grid"] == np.mean(cells)
+
+def test_meanfield_runs_a_year():
+    world = World("Shrubland", (50, 50), FUNGI, seed=0, engine="meanfield")
+    world.run(365)
+    assert world.get_time() == 365
+    assert 0 < world.get_environment().get_grid().average_biomass()
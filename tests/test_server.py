@@ -0,0 +1,87 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+import server
+
+SCENARIO = {"name": "small",
+            "climates": ["Rainforest"],
+            "species_sets": [["Phlebia rufa", "Phellinus gilvus"]],
+            "grid_size": [8, 8],
+            "days": 20,
+            "sample_every": 5,
+            "trials": 2}
+# Long enough to still be running when it is submitted again and cancelled
+LONG_SCENARIO = {**SCENARIO, "name": "long", "grid_size": [60, 60], "days": 100000}
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind((server.HOST, 0))
+        return probe.getsockname()[1]
+
+def wait_for(condition, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+@pytest.fixture
+def job_server():
+    """A JobServer on a free localhost port, served from a thread, and that port."""
+    job_server = server.JobServer(workers=2, job_ttl=1)
+    port = free_port()
+    tasks = []
+    async def main():
+        tasks.append(asyncio.current_task())
+        try:
+            await job_server.serve(server.HOST, port)
+        except asyncio.CancelledError:
+            pass
+    thread = threading.Thread(target=asyncio.run, args=(main(),))
+    thread.start()
+    def listening():
+        try:
+            socket.create_connection((server.HOST, port)).close()
+            return True
+        except ConnectionError:
+            return False
+    wait_for(listening)
+    yield job_server, port
+    job_server.loop.call_soon_threadsafe(tasks[0].cancel)
+    thread.join()
+
+def ask(port: int, message: dict) -> list:
+    return list(server.request(message, port=port))
+
+
+def test_submitted_job_streams_to_done(job_server):
+    job_server, port = job_server
+    job_id = ask(port, {"op": "submit", "scenario": SCENARIO, "snapshot_every": 10})[0]["job"]
+    events = ask(port, {"op": "watch", "job": job_id})
+    assert events[-1]["type"] == "done"
+    progress = [event for event in events if event["type"] == "progress"]
+    assert {tuple(event["run"]) for event in progress} == {(0, 0, 0), (0, 0, 1)}
+    # A late watcher gets only the latest progress and snapshot of each run
+    replayed = ask(port, {"op": "watch", "job": job_id})
+    assert [event["type"] for event in replayed] == ["progress"] * 2 + ["snapshot"] * 2 + ["done"]
+    assert all(event["day"] == SCENARIO["days"] for event in replayed if event["type"] == "progress")
+    # Finished jobs are forgotten after the TTL
+    time.sleep(job_server.job_ttl)
+    assert ask(port, {"op": "status"})[0]["jobs"] == []
+    assert ask(port, {"op": "watch", "job": job_id})[0]["type"] == "error"
+
+def test_identical_job_is_reused_and_cancelled(job_server):
+    job_server, port = job_server
+    first = ask(port, {"op": "submit", "scenario": LONG_SCENARIO})[0]
+    second = ask(port, {"op": "submit", "scenario": LONG_SCENARIO})[0]
+    assert not first["reused"] and second == {"job": first["job"], "reused": True}
+    wait_for(lambda: job_server.jobs[first["job"]].state == "running")
+    assert ask(port, {"op": "cancel", "job": first["job"]})[0] == {"job": first["job"], "state": "cancelled"}
+    assert ask(port, {"op": "watch", "job": first["job"]})[-1]["type"] == "cancelled"
+    # The cancellation is dropped once the running runs have stopped
+    wait_for(lambda: len(job_server.cancelled) == 0)
+    assert not ask(port, {"op": "submit", "scenario": LONG_SCENARIO})[0]["reused"]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import surrogate
+
+FUNGI = ["Phlebia rufa", "Phellinus gilvus"]
+
+
+@pytest.fixture(scope="module")
+def trained():
+    """A Surrogate trained on a few small runs."""
+    emulator = surrogate.Surrogate(["Rainforest", "Shrubland"], FUNGI, days_range=(10, 40), grid_size=(8, 8))
+    emulator.train(8, workers=2)
+    return emulator
+
+
+def test_untrained_surrogate_cannot_predict():
+    with pytest.raises(RuntimeError, match="not been trained"):
+        surrogate.Surrogate(["Rainforest"], FUNGI).predict("Rainforest", FUNGI, 30)
+
+def test_saved_surrogate_predicts_the_same(trained, tmp_path):
+    total, error = trained.predict("Rainforest", FUNGI, 25)
+    assert total >= 0 and error > 0
+    trained.save(str(tmp_path / "surrogate.npz"))
+    loaded = surrogate.load_surrogate(str(tmp_path / "surrogate.npz"))
+    assert not loaded.macro_step
+    assert np.allclose(loaded.predict("Rainforest", FUNGI, 25), (total, error))
+
+def test_query_simulates_when_the_error_is_too_large(trained):
+    answer = trained.query("Shrubland", FUNGI[:1], 20, max_relative_error=np.inf, learn=False)
+    assert answer["source"] == "surrogate"
+    answer = trained.query("Shrubland", FUNGI[:1], 20, max_relative_error=0, trials=2, learn=False)
+    assert answer["source"] == "simulation"
+    points = [{"climate": "Shrubland", "fungi": FUNGI[:1], "days": 20, "parameters": {}, "grid_size": (8, 8),
+                "seed": seed, "macro_step": False} for seed in range(2)]
+    assert answer["total_substrate_eaten"] == np.mean([surrogate.simulate_point(point) for point in points])
@@ -0,0 +1,51 @@
+import itertools
+
+import numpy as np
+
+import species
+import tournament
+from climate import climate_trajectory
+from world import World
+
+FUNGI = ["Phlebia rufa", "Phellinus gilvus", "Xylobolus subpileatus"]
+
+
+def matchup_world(eating: list, totals: dict):
+    """A World of FUNGI on a recorded trajectory in which only the species in eating
+        can still eat, each Fungus having eaten its amount in totals in one cell."""
+    table = species.get_species_table().copy()
+    for name in FUNGI:
+        index = list(table["name"]).index(name)
+        if name in eating:
+            table["min_temperature"][index], table["max_temperature"][index] = -1000, 1000
+            table["moisture_width"][index] = 1e9
+        else:
+            table["min_temperature"][index] = table["max_temperature"][index] = 1000
+    temperatures, moistures = climate_trajectory("Rainforest", 60, 0)
+    world = World("Rainforest", (10, 10), FUNGI, seed=0, species_table=table)
+    world.get_environment().get_climate().set_trajectory(temperatures, moistures)
+    for cell, fungus in enumerate(world.get_environment().get_fungi_list()):
+        fungus.cells = {cell: totals[fungus.name]}
+    return world, temperatures, moistures
+
+
+def test_leader_alone_does_not_decide_a_matchup():
+    world, temperatures, moistures = matchup_world(["Phellinus gilvus", "Xylobolus subpileatus"],
+                                                    {"Phlebia rufa": 1e15, "Phellinus gilvus": 1.0,
+                                                    "Xylobolus subpileatus": 2.0})
+    assert not tournament.is_decided(world, temperatures, moistures)
+
+def test_matchup_of_fungi_that_cannot_eat_is_decided():
+    world, temperatures, moistures = matchup_world([], {"Phlebia rufa": 3.0, "Phellinus gilvus": 1.0,
+                                                        "Xylobolus subpileatus": 1.0})
+    assert tournament.is_decided(world, temperatures, moistures)
+    world, temperatures, moistures = matchup_world(["Phlebia rufa"], {"Phlebia rufa": 1.0, "Phellinus gilvus": 1.0,
+                                                                    "Xylobolus subpileatus": 0.0})
+    assert not tournament.is_decided(world, temperatures, moistures)
+
+def test_three_way_tournament_reports_every_pair():
+    result = tournament.run_tournament(["Shrubland"], FUNGI, days=60, trials=4, k=3, grid_size=(8, 8), workers=2)
+    rates = result["win_rates"][0]
+    for i, j in itertools.combinations(range(len(FUNGI)), 2):
+        assert rates[i, j] + rates[j, i] == 1
+    assert all(1 <= n <= 4 for n in result["trials_used"].values())
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import batch
+import climate
+import metrics
+import weather
+from world import World
+
+SITE = "Test site"
+RECORDED_DAYS = 50
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """An archive of one site with RECORDED_DAYS days of weather, registered as a climate."""
+    rng = np.random.default_rng(0)
+    path = weather.write_archive(str(tmp_path / "sites"),
+                                {SITE: {"climate": "Grassland",
+                                        "temperature": rng.uniform(5, 25, RECORDED_DAYS),
+                                        "precipitation": rng.uniform(0, 0.2, RECORDED_DAYS)}})
+    yield path
+    climate.CLIMATE_TYPES.pop(SITE, None)
+
+
+def test_scenario_longer_than_the_record_is_rejected(archive):
+    scenario = {"climates": [SITE], "species_sets": [["Phlebia rufa"]], "grid_size": [8, 8],
+                "weather_archives": [archive]}
+    # Day 0 is the starting state, so a record of n days covers runs of n - 1 days
+    batch.normalize_scenario({**scenario, "days": RECORDED_DAYS - 1})
+    with pytest.raises(ValueError, match="recorded weather"):
+        batch.normalize_scenario({**scenario, "days": RECORDED_DAYS})
+
+def test_world_run_longer_than_the_record_fails_before_starting(archive):
+    weather.register_archive(archive)
+    world = World(SITE, (8, 8), ["Phlebia rufa"], seed=0)
+    with pytest.raises(ValueError, match="recorded weather ends on day"):
+        metrics.record_series(world, RECORDED_DAYS, ["average_biomass"], every=10)
+    assert world.get_time() == 0
+    world.run(RECORDED_DAYS - 1)
+    assert world.get_time() == RECORDED_DAYS - 1
@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+
+import workqueue
+
+
+def fail(descriptor: dict) -> dict:
+    raise RuntimeError("broken run")
+
+def lose_lease(descriptor: dict) -> dict:
+    """Has the claim requeued under the running job, as a lease that ran out would."""
+    workqueue.requeue_expired(descriptor["queue_dir"], lease=0)
+    raise RuntimeError("lost the lease")
+
+@pytest.fixture
+def queue_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(workqueue.TASKS, "echo", lambda descriptor: {"value": descriptor["value"]})
+    monkeypatch.setitem(workqueue.TASKS, "fail", fail)
+    monkeypatch.setitem(workqueue.TASKS, "lose_lease", lose_lease)
+    return str(tmp_path / "queue")
+
+def expire(path: str) -> None:
+    os.utime(path, (time.time() - 3600, time.time() - 3600))
+
+
+def test_claim_takes_each_job_once(queue_dir):
+    workqueue.submit(queue_dir, {"a": {"value": 1}}, "echo")
+    path = workqueue.claim(queue_dir, "w1")
+    assert os.path.basename(path) == "a.w1.json"
+    assert workqueue.claim(queue_dir, "w2") is None
+    assert workqueue.status(queue_dir) == {"pending": 0, "claimed": 1, "failed": 0, "done": 0, "all": 1}
+
+def test_finished_job_leaves_its_result(queue_dir):
+    workqueue.submit(queue_dir, {"a": {"value": 7}}, "echo")
+    assert workqueue.run_job(queue_dir, workqueue.claim(queue_dir, "w1"))
+    assert workqueue.read_json(os.path.join(queue_dir, "results", "a.json"))["result"] == {"value": 7}
+    assert workqueue.status(queue_dir, ids=True)["done"] == ["a"]
+    assert workqueue.submit(queue_dir, {"a": {"value": 7}}, "echo") == []
+
+def test_expired_lease_is_requeued(queue_dir):
+    workqueue.submit(queue_dir, {"a": {"value": 1}}, "echo")
+    path = workqueue.claim(queue_dir, "w1")
+    assert workqueue.requeue_expired(queue_dir, lease=60) == []
+    expire(path)
+    assert workqueue.requeue_expired(queue_dir, lease=60) == ["a"]
+    assert workqueue.status(queue_dir, ids=True)["pending"] == ["a"]
+    assert os.path.basename(workqueue.claim(queue_dir, "w2")) == "a.w2.json"
+
+def test_failing_job_is_retried_then_failed(queue_dir):
+    workqueue.submit(queue_dir, {"a": {}}, "fail")
+    assert not workqueue.run_job(queue_dir, workqueue.claim(queue_dir, "w1"), max_attempts=2)
+    assert workqueue.status(queue_dir, ids=True)["pending"] == ["a"]
+    assert not workqueue.run_job(queue_dir, workqueue.claim(queue_dir, "w1"), max_attempts=2)
+    job = workqueue.read_json(os.path.join(queue_dir, "failed", "a.json"))
+    assert job["attempts"] == 2
+    assert len(job["errors"]) == 2 and "broken run" in job["errors"][-1]
+    assert workqueue.status(queue_dir)["all"] == 1
+
+def test_requeued_claim_is_not_recreated(queue_dir):
+    workqueue.submit(queue_dir, {"a": {"value": 1}}, "echo")
+    path = workqueue.claim(queue_dir, "w1")
+    expire(path)
+    workqueue.requeue_expired(queue_dir, lease=60)
+    assert not workqueue.run_job(queue_dir, path)
+    assert not os.path.exists(path)
+    assert workqueue.read_json(os.path.join(queue_dir, "pending", "a.json"))["attempts"] == 0
+
+def test_lease_lost_while_running_keeps_the_attempt(queue_dir):
+    workqueue.submit(queue_dir, {"a": {"queue_dir": queue_dir}}, "lose_lease")
+    path = workqueue.claim(queue_dir, "w1")
+    assert not workqueue.run_job(queue_dir, path)
+    assert os.listdir(os.path.join(queue_dir, "claimed")) == []
+    assert workqueue.read_json(os.path.join(queue_dir, "pending", "a.json"))["attempts"] == 1
+
+def test_job_that_keeps_losing_its_lease_is_failed(queue_dir):
+    workqueue.submit(queue_dir, {"a": {"value": 1}}, "echo")
+    for _ in range(2):
+        # A worker starts the job and dies with it, as run_job would up to the task
+        path = workqueue.claim(queue_dir, "w1")
+        job = workqueue.read_json(path)
+        job["attempts"] += 1
+        workqueue.update_claim(path, job)
+        expire(path)
+        assert workqueue.requeue_expired(queue_dir, lease=60) == ["a"]
+    assert not workqueue.run_job(queue_dir, workqueue.claim(queue_dir, "w1"), max_attempts=2)
+    job = workqueue.read_json(os.path.join(queue_dir, "failed", "a.json"))
+    assert job["attempts"] == 3 and "lease lost" in job["errors"][-1]
+    assert workqueue.status(queue_dir, ids=True)["done"] == []
+    assert workqueue.work(queue_dir, poll=0, max_attempts=2) == 0
@@ -0,0 +1,88 @@
+import numpy as np
+from scipy import stats
+
+import environment
+import species
+from world import World
+
+SEEDS = 100
+DAYS = 150
+
+
+def loosened_table(top_temperature: float = 24.5) -> np.ndarray:
+    """Species table in which Phlebia rufa dies above top_temperature, so that the
+        hot days of a Rainforest year are only sometimes idle."""
+    table = species.get_species_table().copy()
+    index = list(table["name"]).index("Phlebia rufa")
+    table["max_temperature"][index] = top_temperature / 1.2
+    return table
+
+def idle_days(fast_forward: bool, table: np.ndarray) -> np.ndarray:
+    """Number of idle days of every seed, stepping one day at a time."""
+    counts = np.zeros(SEEDS)
+    for seed in range(SEEDS):
+        world = World("Rainforest", (3, 3), ["Phlebia rufa"], seed=seed, species_table=table)
+        for _ in range(DAYS):
+            if fast_forward:
+                world.run(1)
+            else:
+                world.increment_time()
+            counts[seed] += world.get_environment().is_idle()
+    return counts
+
+
+def test_fresh_world_runs():
+    world = World("Rainforest", (10, 10), ["Phlebia rufa", "Phellinus gilvus"], seed=0)
+    world.run(30)
+    assert world.get_time() == 30
+
+def test_fast_forward_keeps_idle_day_distribution():
+    table = loosened_table()
+    daily = idle_days(False, table)
+    forwarded = idle_days(True, table)
+    assert 0.2 < daily.mean() / DAYS < 0.8
+    assert stats.ks_2samp(daily, forwarded).pvalue > 0.01
+    assert stats.ttest_ind(daily, forwarded, equal_var=False).pvalue > 0.01
+
+def final_totals(fast_forward: bool, table: np.ndarray) -> np.ndarray:
+    """Substrate eaten and cells colonized of every seed after DAYS days taken in
+        one run, or one day at a time."""
+    totals = np.zeros((2, SEEDS))
+    for seed in range(SEEDS):
+        world = World("Rainforest", (3, 3), ["Phlebia rufa"], seed=seed, species_table=table)
+        if fast_forward:
+            world.run(DAYS)
+        else:
+            for _ in range(DAYS):
+                world.increment_time()
+        fungus = world.get_environment().get_fungi_list()[0]
+        totals[:, seed] = fungus.get_total_amount_of_substrate_eaten(), fungus.get_number_of_fungal_cells()
+    return totals
+
+def test_multi_day_fast_forward_keeps_final_distribution():
+    table = loosened_table()
+    daily = final_totals(False, table)
+    forwarded = final_totals(True, table)
+    for daily_values, forwarded_values in zip(daily, forwarded):
+        # A small Grid can fill up in every seed, which leaves nothing to test but equality
+        if np.ptp(daily_values) == np.ptp(forwarded_values) == 0:
+            assert daily_values[0] == forwarded_values[0]
+            continue
+        assert stats.ks_2samp(daily_values, forwarded_values).pvalue > 0.01
+        assert stats.ttest_ind(daily_values, forwarded_values, equal_var=False).pvalue > 0.01
+
+def test_world_that_cannot_come_back_finishes_in_bounded_chunks(monkeypatch):
+    world = World("Tundra", (5, 5), ["Phlebia rufa", "Phellinus gilvus"], seed=0)
+    climate = world.get_environment().get_climate()
+    projected = []
+    project_days = type(climate).project_days
+    def recording(self, time, days):
+        projected.append(days)
+        return project_days(self, time, days)
+    monkeypatch.setattr(type(climate), "project_days", recording)
+    world.run(10 * 365)
+    assert world.get_time() == 10 * 365
+    assert all(fungus.day == 10 * 365 for fungus in world.get_environment().get_fungi_list())
+    # Chunks double up to a year, and together cover the run once
+    assert max(projected) == environment.FAST_FORWARD_MAX_CHUNK
+    assert sum(projected) == 10 * 365
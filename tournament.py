@@ -0,0 +1,159 @@
+"""Round-robin tournaments: every k-way matchup of species in every climate, scheduled
+    across a process pool, giving a win-rate matrix per climate."""
+import itertools
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+import species
+from climate import climate_trajectory
+from world import World
+
+GRID_SIZE = (100, 100)
+CHECK_EVERY = 30 # days between checks for a matchup decided before time runs out
+MIN_TRIALS = 3 # trials of a matchup before it can be called statistically
+
+
+def matchup_winner(world: World) -> str:
+    """Returns the name of the Fungus that has eaten the most in world. Ties go to
+        the Fungus that comes first in turn order."""
+    fungi = world.get_environment().get_fungi_list()
+    return max(fungi, key=lambda fungus: fungus.get_total_amount_of_substrate_eaten()).name
+
+def is_decided(world: World, temperatures: np.ndarray, moistures: np.ndarray) -> bool:
+    """Returns whether no weather left in the trajectory can change how any two
+        fungi of world compare, and so the winner and every pairwise result, e.g.
+        because every side but one is extinct for the rest of the run."""
+    environment = world.get_environment()
+    fungi = environment.get_fungi_list()
+    if len(fungi) < 2:
+        return True
+    totals = np.array([fungus.get_total_amount_of_substrate_eaten() for fungus in fungi])
+    time = world.get_time()
+    factors = species.consumption_factors(environment.get_species(),
+                                        temperatures[time + 1:], moistures[time + 1:])
+    # The most any one species could still gain or lose: every cell of the Grid,
+    # each at the largest original biomass, eating every remaining day
+    grid = environment.get_grid()
+    reach = grid.num_rows * grid.num_cols * grid.original_biomass.max()
+    best = totals + reach * np.clip(factors, 0, None).sum(axis=1)
+    worst = totals - reach * np.clip(-factors, 0, None).sum(axis=1)
+    # A Fungus ahead of another must stay ahead, and a tie must stay a tie, which
+    # only holds if neither side can eat any more
+    ahead = totals[:, None] > totals[None, :]
+    tied = (totals[:, None] == totals[None, :]) & ~np.eye(len(fungi), dtype=bool)
+    fixed = best == worst
+    return bool(np.all(~ahead | (worst[:, None] > best[None, :]))
+                and np.all(~tied | (fixed[:, None] & fixed[None, :])))
+
+def play_matchup(descriptor: dict) -> dict:
+    """Plays one trial of a matchup on a recorded climate trajectory and returns the
+        total eaten by each species, the winner and the days it took. Runs in the worker processes."""
+    temperatures, moistures = descriptor["trajectory"]
+    days = descriptor["days"]
+    world = World(descriptor["climate"], descriptor["grid_size"], descriptor["fungi"], seed=descriptor["seed"])
+    world.get_environment().get_climate().set_trajectory(temperatures, moistures)
+    while world.get_time() < days:
+        world.run(min(descriptor["check_every"], days - world.get_time()), macro_step=descriptor["macro_step"])
+        if is_decided(world, temperatures, moistures):
+            break
+    return {"totals": {fungus.name: fungus.get_total_amount_of_substrate_eaten()
+                        for fungus in world.get_environment().get_fungi_list()},
+            "winner": matchup_winner(world),
+            "days": world.get_time()}
+
+def is_settled(wins: np.ndarray, played: int, trials: int, confidence: float,
+                min_trials: int = MIN_TRIALS) -> bool:
+    """Returns whether more trials can't change which side wins most, given the wins
+        of each side: either the leader can't be caught in the trials left, or its
+        Wilson interval clears the runner-up's."""
+    order = np.sort(wins)[::-1]
+    if order[0] - order[1] > trials - played:
+        return True
+    if played < min_trials:
+        return False
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    def wilson(successes: float, sign: int) -> float:
+        rate = successes / played
+        centre = rate + z**2 / (2*played)
+        spread = z * np.sqrt(rate*(1 - rate) / played + z**2 / (4*played**2))
+        return (centre + sign*spread) / (1 + z**2 / played)
+    return wilson(order[0], -1) > wilson(order[1], +1)
+
+def run_tournament(climates: List[str],
+                species_names: List[str],
+                days: int,
+                trials: int,
+                k: int = 2,
+                grid_size: Tuple[int, int] = GRID_SIZE,
+                seed: int = 0,
+                workers: int = None,
+                confidence: float = 0.95,
+                check_every: int = CHECK_EVERY,
+                macro_step: bool = False) -> Dict[str, object]:
+    """Plays every k-way matchup of species_names in every climate for up to trials
+        trials each and returns the win-rate matrix per climate: win_rates[c, i, j] is
+        the fraction of trials in which species i ate more than species j. A trial
+        ends early only once the order of every pair is decided, and a matchup once
+        more trials can't change which side of any pair wins most."""
+    matchups = list(itertools.combinations(species_names, k))
+    position = {name: i for i, name in enumerate(species_names)}
+    # Every matchup in a climate replays the same weather in trial n
+    trajectories = {(c, trial): climate_trajectory(climate, days, [seed, c, trial])
+                    for c, climate in enumerate(climates) for trial in range(trials)}
+    wins = np.zeros((len(climates), len(species_names), len(species_names)))
+    played = np.zeros_like(wins)
+    # Wins of each species of a matchup over each other one, ties counting half
+    pair_wins = {(c, m): np.zeros((k, k)) for c in range(len(climates)) for m in range(len(matchups))}
+    trials_used = {(c, m): 0 for c in range(len(climates)) for m in range(len(matchups))}
+    days_run = {(c, m): 0 for c in range(len(climates)) for m in range(len(matchups))}
+    completed = dict(trials_used)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        def submit(c: int, m: int):
+            trial = trials_used[(c, m)]
+            trials_used[(c, m)] += 1
+            descriptor = {"climate": climates[c],
+                        "fungi": list(matchups[m]),
+                        "grid_size": grid_size,
+                        "days": days,
+                        "seed": seed + trial,
+                        "trajectory": trajectories[(c, trial)],
+                        "check_every": check_every,
+                        "macro_step": macro_step}
+            pending[pool.submit(play_matchup, descriptor)] = (c, m)
+
+        for c in range(len(climates)):
+            for m in range(len(matchups)):
+                for _ in range(min(MIN_TRIALS, trials)):
+                    submit(c, m)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                c, m = pending.pop(future)
+                result = future.result()
+                completed[(c, m)] += 1
+                days_run[(c, m)] += result["days"]
+                totals = result["totals"]
+                names = matchups[m]
+                for (i, a), (j, b) in itertools.permutations(enumerate(names), 2):
+                    won = 1.0 if totals[a] > totals[b] else 0.5 if totals[a] == totals[b] else 0.0
+                    played[c, position[a], position[b]] += 1
+                    wins[c, position[a], position[b]] += won
+                    pair_wins[(c, m)][i, j] += won
+                # Every pair's win rate is reported, so every pair must be settled
+                settled = all(is_settled(pair_wins[(c, m)][[i, j], [j, i]], completed[(c, m)], trials, confidence)
+                            for i, j in itertools.combinations(range(k), 2))
+                if trials_used[(c, m)] < trials and not settled:
+                    submit(c, m)
+
+    with np.errstate(invalid="ignore"):
+        win_rates = wins / played
+    return {"climates": climates,
+            "species": species_names,
+            "matchups": matchups,
+            "win_rates": win_rates,
+            "trials_used": {(climates[c], matchups[m]): n for (c, m), n in completed.items()},
+            "mean_days": {(climates[c], matchups[m]): days_run[(c, m)] / max(n, 1) for (c, m), n in completed.items()}}
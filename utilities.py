@@ -1,4 +1,6 @@
 """Random but useful utilities for other classes."""
+import contextlib
+import sys
 
 # CONSTANTS
 G = 9.81 # meters per second squared
@@ -8,22 +10,25 @@ TEMPERATURE_THRESHOLD_MULTIPLIER = 0.20
 MOISTURE_THRESHOLD_MULTIPLIER = 0.4 #0,.4 default
 MEDIAN_GROWTH_RATE = 3.55 #mm /day
 DAYS_UNTIL_EXPANSION = 8
-
-probability_thresholds = {  "Phlebia rufa"              : 0.80,
-                            "Lentinus crinitus"         : 0.7538,
-                            "Laetiporus conifericola"   : 0.7077,
-                            "Fomes fomentarius"         : 0.6615,
-                            "Hyphoderma setigerum"      : 0.6154,
-                            "Porodisculus pendulus"     : 0.5692,
-                            "Phellinus gilvus"          : 0.5231,
-                            "Tyromyces chioneus"        : 0.4769,
-                            "Phellinus robiniae"        : 0.4308,
-                            "Hyphodontia crustosa"      : 0.3846,
-                            "Schizophyllum commune"     : 0.3385,
-                            "Phellinus hartigii"        : 0.2923,
-                            "Armillaria tabescens"      : 0.2462,
-                            "Xylobolus subpileatus"     : 0.20}
+MACRO_STEP_TOLERANCE = 0.05 # relative error allowed between macro-stepped and daily runs
+MACRO_STEP_TRIALS = 1000 # matched runs check_macro_step needs to tell a 5% difference from run-to-run noise
+STEADY_STATE_TOLERANCE = 0.02 # year-over-year change, relative to the largest annual value, taken as steady
 
 def rainfall_inches_to_mPa(rain: float) -> float:
     """Converts inches of rain to mPa."""
     return rain*2.54*WATER_DENSITY*G*1e-8
+
+@contextlib.contextmanager
+def override_constants(overrides: dict):
+    """Sets constants of this module, e.g. {"DAYS_UNTIL_EXPANSION": 10}, for the
+        duration of a with block, rounding those that are integers, and restores
+        them afterwards."""
+    module = sys.modules[__name__]
+    saved = {name: getattr(module, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(module, name, round(value) if isinstance(saved[name], int) else value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
@@ -0,0 +1,94 @@
+"""Viability pre-screen: which species a climate can let live at all. A species
+    whose survival window, widened by the utilities threshold multipliers, misses
+    every temperature or every moisture the climate can reach over a run is killed
+    by the climate on every day of it, so it can never eat or expand and only
+    costs turns. Environment.retire_doomed uses this to stop simulating them."""
+import math
+import numpy as np
+from typing import Dict, List, Tuple
+
+import species
+from climate import Climate, create_climate, climate_trajectory
+from utilities import rainfall_inches_to_mPa
+
+VIABILITY_RISK = 1e-9 # largest chance that a species taken as doomed would have had a day it could live through
+MAX_RAINFALL = 1.15 * 1.177e-3 # most moisture one day of rain adds, in mPa, as in Climate
+
+
+def rain_days_bound(days: int, rain_probability: float, risk: float) -> int:
+    """Returns the fewest days of rain out of days that are exceeded with probability
+        at most risk, from the binomial tail. Kept free of scipy, as the core imports it."""
+    if risk <= 0 or rain_probability >= 1:
+        return days
+    if rain_probability <= 0:
+        return 0
+    tail = 0.0
+    for k in range(days, -1, -1):
+        # Probability of exactly k days of rain, added to the tail above k - 1
+        tail += math.exp(math.lgamma(days + 1) - math.lgamma(k + 1) - math.lgamma(days - k + 1)
+                        + k * math.log(rain_probability) + (days - k) * math.log1p(-rain_probability))
+        if tail > risk:
+            return k
+    return 0
+
+def climate_envelope(climate: Climate, time: int, days: int,
+                    risk: float = VIABILITY_RISK) -> Tuple[float, float, float, float]:
+    """Returns the (min temperature, max temperature, min moisture, max moisture)
+        the Climate can reach on days time through time + days - 1, starting from
+        its current state. Temperature is bounded outright; moisture falls by at most
+        the evaporation of every day and rises by at most the days of rain that are
+        exceeded with probability below risk, or every day's with risk 0. A recorded
+        trajectory gives the exact range instead."""
+    if climate.trajectory is not None:
+        temperatures, moistures = (values[time:time + days] for values in climate.trajectory)
+        return float(temperatures.min()), float(temperatures.max()), float(moistures.min()), float(moistures.max())
+    a, b = climate.temperature_range
+    amplitude = abs(b - a) / 2 * 1.15
+    moisture = climate.get_climate_moisture()
+    evaporation = rainfall_inches_to_mPa(climate.evaporation_rate)
+    rain_days = rain_days_bound(days, climate.raindays_per_year / 365, risk)
+    return ((a + b) / 2 - amplitude, (a + b) / 2 + amplitude,
+            moisture - days * max(evaporation, 0), moisture + rain_days * MAX_RAINFALL)
+
+def viable_species(table: np.ndarray, climate: Climate, time: int, days: int,
+                risk: float = VIABILITY_RISK) -> np.ndarray:
+    """Returns a boolean array, one entry per species of table, that is False for
+        the species the Climate kills on every day of climate_envelope."""
+    min_temperature, max_temperature, min_moisture, max_moisture = climate_envelope(climate, time, days, risk)
+    low_temperature, high_temperature, low_moisture, high_moisture = species.survival_windows(table)
+    return ((low_temperature <= max_temperature) & (high_temperature >= min_temperature)
+            & (low_moisture <= max_moisture) & (high_moisture >= min_moisture))
+
+def doomed_species(climate_type: str, fungus_list: List[str], days: int,
+                risk: float = VIABILITY_RISK, species_table: np.ndarray = None) -> List[str]:
+    """Returns the species of fungus_list that a fresh climate_type run of days
+        would retire, in the order given."""
+    table = species.select_species(fungus_list, species_table if species_table is not None else species.get_species_table())
+    viable = viable_species(table, create_climate(climate_type), 1, days, risk)
+    return [str(name) for name, alive in zip(table["name"], viable) if not alive]
+
+def viability_matrix(climate_types: List[str], species_table: np.ndarray = None, days: int = 365,
+                    trials: int = 10, seed: int = 0) -> np.ndarray:
+    """Returns a (species, climates) array of the mean number of days out of days
+        each species of species_table can live through in each climate, over trials
+        drawn trajectories of its weather."""
+    table = species_table if species_table is not None else species.get_species_table()
+    matrix = np.zeros((len(table), len(climate_types)))
+    for c, climate_type in enumerate(climate_types):
+        for trial in range(trials):
+            temperatures, moistures = climate_trajectory(climate_type, days, [seed, c, trial])
+            matrix[:, c] += species.survivable_days(table, temperatures[1:], moistures[1:]).sum(axis=1)
+    return matrix / trials
+
+def format_matrix(matrix: np.ndarray, climate_types: List[str], species_table: np.ndarray = None,
+                doomed: Dict[str, List[str]] = None) -> str:
+    """Returns a viability_matrix as a table, one row per species, with the
+        species each climate retires marked by an asterisk."""
+    table = species_table if species_table is not None else species.get_species_table()
+    doomed = doomed if doomed is not None else {}
+    lines = [f"{'species':<24}" + "".join(f"{climate_type[:12]:>14}" for climate_type in climate_types)]
+    for s, name in enumerate(table["name"]):
+        cells = [f"{matrix[s, c]:.1f}" + ("*" if name in doomed.get(climate_type, []) else " ")
+                for c, climate_type in enumerate(climate_types)]
+        lines.append(f"{str(name):<24}" + "".join(f"{cell:>14}" for cell in cells))
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+"""Recorded weather: daily temperature and precipitation series of real sites,
+    kept in a binary archive that every process memory-maps read-only, so that
+    parallel trials share the operating system's one copy of it instead of each
+    parsing CSVs. An archive is two files:
+        <name>.npy   float64 array (sites, days, channels), padded with NaN
+        <name>.json  index of the sites: name, base climate, days and start date
+
+    register_archive(path) makes every site of an archive a climate type, e.g.
+    World("Ames, IA", (100, 100), fungi), replayed by RecordedClimate."""
+import csv
+import json
+import os
+import numpy as np
+from collections import defaultdict
+from functools import partial
+from typing import Dict, List, Tuple
+
+import climate
+from climate import Climate
+from utilities import rainfall_inches_to_mPa
+
+CHANNELS = ("temperature", "precipitation", "moisture") # degrees C, inches of rain and mPa, by day
+
+# Archives this process has opened, by absolute path: (memory-mapped data, index)
+_ARCHIVES = {}
+
+
+class RecordedClimate(Climate):
+    """Climate replaying a site's recorded weather, looked up by day."""
+
+    __slots__ = ("archive", "site")
+
+    def __init__(self, archive: str, site: str) -> None:
+        data, index = open_archive(archive)
+        if site not in index["sites"]:
+            raise KeyError(f"Unknown site: {site}")
+        record = index["sites"][site]
+        # Biomass, evaporation and rain statistics come from the site's base climate
+        base = climate.create_climate(record["climate"])
+        series = data[record["row"], :record["days"]]
+        super().__init__(f"{site} (recorded {record['climate']})",
+                        tuple(record["temperature_range"]),
+                        float(series[0, 2]),
+                        base.annual_rain,
+                        base.evaporation_rate,
+                        base.biomass_density,
+                        record["raindays_per_year"])
+        self.archive = archive
+        self.site = site
+        # Views of the shared memory map: replayed by day like any recorded trajectory
+        self.set_trajectory(series[:, 0], series[:, 2])
+
+
+def site_moistures(climate_type: str, precipitation: np.ndarray) -> np.ndarray:
+    """Returns the moisture by day that precipitation in inches gives, starting from
+        the moisture base of climate_type and evaporating at its rate, as Climate does."""
+    base = climate.create_climate(climate_type)
+    daily = rainfall_inches_to_mPa(np.asarray(precipitation, dtype=float)) - rainfall_inches_to_mPa(base.evaporation_rate)
+    daily[0] = 0
+    return base.moisture_base + np.cumsum(daily)
+
+def write_archive(path: str, sites: Dict[str, dict]) -> str:
+    """Writes an archive of sites, {name: {"climate": base climate type,
+        "temperature": [...], "precipitation": [...], "start": date}}, series given
+        by day in degrees C and inches, to <path>.npy and <path>.json. Returns the
+        path of the .npy file."""
+    path = path[:-len(".npy")] if path.endswith(".npy") else path
+    days = max(len(site["temperature"]) for site in sites.values())
+    data = np.full((len(sites), days, len(CHANNELS)), np.nan)
+    index = {"channels": list(CHANNELS), "sites": {}}
+    for row, (name, site) in enumerate(sites.items()):
+        if len(site["temperature"]) != len(site["precipitation"]):
+            raise ValueError(f"{name}: temperature and precipitation must cover the same days")
+        count = len(site["temperature"])
+        data[row, :count, 0] = site["temperature"]
+        data[row, :count, 1] = site["precipitation"]
+        data[row, :count, 2] = site_moistures(site["climate"], site["precipitation"])
+        index["sites"][name] = {"row": row, "climate": site["climate"], "days": count, "start": site.get("start"),
+                                "temperature_range": [float(np.min(site["temperature"])), float(np.max(site["temperature"]))],
+                                "raindays_per_year": float(np.count_nonzero(site["precipitation"]) / count * 365)}
+    np.save(f"{path}.npy", data)
+    with open(f"{path}.json", "w") as index_file:
+        json.dump(index, index_file, indent=1)
+    _ARCHIVES.pop(os.path.abspath(f"{path}.npy"), None)
+    return f"{path}.npy"
+
+def read_csv(path: str) -> Dict[str, dict]:
+    """Reads daily records from a CSV with columns site, climate, date, temperature
+        (degrees C) and precipitation (inches), one row per site and day in order,
+        into the sites write_archive takes."""
+    sites = defaultdict(lambda: {"temperature": [], "precipitation": []})
+    with open(path, newline="") as csv_file:
+        for row in csv.DictReader(csv_file):
+            site = sites[row["site"]]
+            site.setdefault("climate", row["climate"])
+            site.setdefault("start", row["date"])
+            site["temperature"].append(float(row["temperature"]))
+            site["precipitation"].append(float(row["precipitation"]))
+    return dict(sites)
+
+def open_archive(path: str) -> Tuple[np.ndarray, dict]:
+    """Returns the read-only memory map of an archive's data with its index,
+        opening it only once per process."""
+    path = os.path.abspath(path if path.endswith(".npy") else f"{path}.npy")
+    if path not in _ARCHIVES:
+        with open(f"{path[:-len('.npy')]}.json") as index_file:
+            index = json.load(index_file)
+        _ARCHIVES[path] = (np.load(path, mmap_mode="r"), index)
+    return _ARCHIVES[path]
+
+def register_archive(path: str) -> List[str]:
+    """Makes every site of an archive a climate type that create_climate, and so
+        World and batch scenarios, can build. Returns the site names."""
+    _, index = open_archive(path)
+    for site in index["sites"]:
+        climate.CLIMATE_TYPES[site] = partial(RecordedClimate, path, site)
+    return list(index["sites"])
@@ -0,0 +1,271 @@
+"""Distributed runs through a work queue kept in a shared directory (e.g. on NFS),
+    with no broker: a coordinator writes one JSON file per run, and any number of
+    workers on any node claim runs by renaming their file, which only one of them
+    can do, hold the claim by touching it and write the result. A claim that is not
+    touched for a lease goes back in the queue, so runs on lost workers are retried.
+
+    Layout of the queue directory:
+        pending/<job>.json          runs waiting for a worker
+        claimed/<job>.<worker>.json runs being worked on; the modification time is the lease
+        results/<job>.json          results of finished runs
+        failed/<job>.json           runs that failed every attempt, with the last error"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+import numpy as np
+from multiprocessing import Process
+from typing import Dict, List
+
+import batch
+import tournament
+import utilities
+
+LEASE_SECONDS = 120 # a claim not touched for this long is taken as lost; keep well above clock skew between nodes
+POLL_SECONDS = 2 # wait between looks at an empty queue
+MAX_ATTEMPTS = 3 # attempts at a run before it is moved to failed
+FOLDERS = ("pending", "claimed", "results", "failed")
+
+
+def run_matchup(descriptor: dict) -> dict:
+    """Plays a tournament matchup from a descriptor read back from JSON."""
+    temperatures, moistures = descriptor["trajectory"]
+    return tournament.play_matchup({**descriptor, "trajectory": (np.asarray(temperatures), np.asarray(moistures))})
+
+# Dictionary for mapping the task of a job to the function that runs its descriptor
+TASKS = {"batch": batch.run_descriptor,
+        "matchup": run_matchup}
+
+
+def folder(queue_dir: str, name: str) -> str:
+    """Returns a folder of the queue, creating the queue if needed."""
+    for each in FOLDERS:
+        os.makedirs(os.path.join(queue_dir, each), exist_ok=True)
+    return os.path.join(queue_dir, name)
+
+def to_json(value):
+    """Returns a numpy array or scalar as what json can write."""
+    return value.tolist() if isinstance(value, np.ndarray) else value.item()
+
+def write_json(path: str, content: dict):
+    """Writes content to path atomically: readers see the old file or the whole new one."""
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, "w") as json_file:
+        json.dump(content, json_file, default=to_json)
+    os.replace(temporary, path)
+
+def read_json(path: str) -> dict:
+    """Reads a JSON file of the queue."""
+    with open(path) as json_file:
+        return json.load(json_file)
+
+def job_of_claim(claim: str) -> str:
+    """Returns the job of a claim file name, <job>.<worker>.json."""
+    return claim.rsplit(".", 2)[0]
+
+
+# Coordinator side
+
+def submit(queue_dir: str, descriptors: Dict[str, dict], task: str = "batch") -> List[str]:
+    """Queues one job per descriptor, keyed by job id; a descriptor may carry
+        "parameters", utilities constants to override while it runs. Jobs that
+        are already queued, running or done are left alone. Returns the ids queued."""
+    if task not in TASKS:
+        raise ValueError(f"Unknown task: {task}")
+    queued = []
+    known = set(status(queue_dir, ids=True)["all"])
+    for job, descriptor in descriptors.items():
+        if job in known:
+            continue
+        write_json(os.path.join(folder(queue_dir, "pending"), f"{job}.json"),
+                    {"id": job, "task": task, "descriptor": descriptor, "attempts": 0, "errors": []})
+        queued.append(job)
+    return queued
+
+def scenario_jobs(scenario: dict, parameters: dict = None) -> Dict[str, dict]:
+    """Returns a batch scenario's runs as {job id: descriptor}, ids being
+        <name>-<climate>-<species set>-<trial> by index."""
+    if scenario["final_state"]:
+        raise ValueError("final_state results are not carried through the work queue")
+    return {f"{scenario['name']}-{c}-{s}-{trial}": {**descriptor, "parameters": parameters or {}}
+            for (c, s, trial), descriptor in batch.scenario_runs(scenario)}
+
+def submit_scenario(queue_dir: str, scenario: dict, parameters: dict = None) -> List[str]:
+    """Queues every run of a normalized batch scenario, with utilities constants
+        overridden by parameters, and returns the ids queued."""
+    return submit(queue_dir, scenario_jobs(scenario, parameters), "batch")
+
+def status(queue_dir: str, ids: bool = False) -> dict:
+    """Returns how many jobs are pending, claimed, done and failed, or with ids
+        their ids, plus all of them under "all"."""
+    found = {}
+    for name in FOLDERS:
+        files = [each for each in os.listdir(folder(queue_dir, name)) if each.endswith(".json")]
+        found[name] = sorted({job_of_claim(each) if name == "claimed" else each[:-len(".json")] for each in files})
+    found["done"] = found.pop("results")
+    found["all"] = sorted(set().union(*found.values()))
+    return found if ids else {name: len(jobs) for name, jobs in found.items()}
+
+def collect_scenario(queue_dir: str, scenario: dict) -> Dict[str, np.ndarray]:
+    """Gathers the results of a scenario submitted with submit_scenario into the
+        arrays batch.run_scenario returns, raising RuntimeError if any run is missing."""
+    results = {name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in batch.result_specs(scenario).items()}
+    missing = []
+    for job, index in zip(scenario_jobs(scenario), [index for index, _ in batch.scenario_runs(scenario)]):
+        path = os.path.join(folder(queue_dir, "results"), f"{job}.json")
+        if not os.path.exists(path):
+            missing.append(job)
+            continue
+        for name, values in read_json(path)["result"].items():
+            results[name][index] = values
+    if missing:
+        raise RuntimeError(f"{len(missing)} runs of {scenario['name']} have no result yet, e.g. {missing[0]}")
+    return results
+
+
+# Worker side
+
+def requeue_expired(queue_dir: str, lease: float = LEASE_SECONDS) -> List[str]:
+    """Puts the jobs whose claim has not been touched for lease seconds back in the
+        queue and returns them. Any worker or the coordinator may call it; the
+        rename lets only one of them requeue each job."""
+    requeued = []
+    claimed = folder(queue_dir, "claimed")
+    for claim in os.listdir(claimed):
+        if not claim.endswith(".json"):
+            continue
+        path = os.path.join(claimed, claim)
+        try:
+            if time.time() - os.stat(path).st_mtime < lease:
+                continue
+            os.rename(path, os.path.join(folder(queue_dir, "pending"), f"{job_of_claim(claim)}.json"))
+            requeued.append(job_of_claim(claim))
+        except FileNotFoundError:
+            # Finished, or requeued by someone else, in the meantime
+            continue
+    return requeued
+
+def claim(queue_dir: str, worker: str) -> str:
+    """Claims a pending job for worker and returns the path of its claim, or None
+        if there is nothing to claim. Jobs already done are dropped instead."""
+    pending = folder(queue_dir, "pending")
+    for name in sorted(os.listdir(pending)):
+        if not name.endswith(".json"):
+            continue
+        job = name[:-len(".json")]
+        path = os.path.join(folder(queue_dir, "claimed"), f"{job}.{worker}.json")
+        try:
+            os.rename(os.path.join(pending, name), path)
+        except FileNotFoundError:
+            # Another worker got there first
+            continue
+        if os.path.exists(os.path.join(folder(queue_dir, "results"), f"{job}.json")):
+            os.remove(path)
+            continue
+        return path
+    return None
+
+def keep_lease(path: str, lease: float, stop: threading.Event):
+    """Touches a claim every third of a lease until stop is set or the claim is gone."""
+    while not stop.wait(lease / 3):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+
+def update_claim(path: str, job: dict) -> bool:
+    """Rewrites a claim in place and returns True, or returns False if the claim is
+        gone. Unlike write_json this never brings back a claim that was requeued,
+        and a claim requeued while it is written keeps the update, as the rename
+        moves the very file being written."""
+    content = json.dumps(job, default=to_json)
+    try:
+        with open(path, "r+") as claim_file:
+            claim_file.write(content)
+            claim_file.truncate()
+    except FileNotFoundError:
+        return False
+    return True
+
+def run_job(queue_dir: str, path: str, lease: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS) -> bool:
+    """Runs a claimed job, holding its lease meanwhile, and records the result; a
+        job that raises goes back in the queue, or to failed after max_attempts.
+        A job whose workers were lost on all of max_attempts attempts, e.g. as it
+        kills them, goes to failed without running. Returns whether the job
+        succeeded, False too if the claim was lost before the job started."""
+    try:
+        job = read_json(path)
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        # Caught mid-update by a worker whose lease ran out; the claim expires and is requeued
+        return False
+    job["attempts"] += 1
+    if not update_claim(path, job):
+        # The lease ran out before the job started; it is pending again for anyone
+        return False
+    if job["attempts"] > max_attempts:
+        # Every attempt so far ended with the lease lost, not with an error
+        job["errors"].append(f"lease lost on {job['attempts'] - 1} attempts without the job finishing")
+        if update_claim(path, job):
+            try:
+                os.rename(path, os.path.join(folder(queue_dir, "failed"), f"{job['id']}.json"))
+            except FileNotFoundError:
+                pass
+        return False
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=keep_lease, args=(path, lease, stop), daemon=True)
+    heartbeat.start()
+    try:
+        with utilities.override_constants(job["descriptor"].get("parameters", {})):
+            result = TASKS[job["task"]](job["descriptor"])
+        write_json(os.path.join(folder(queue_dir, "results"), f"{job['id']}.json"), {"id": job["id"], "result": result})
+        succeeded = True
+    except Exception:
+        job["errors"].append(traceback.format_exc())
+        update_claim(path, job)
+        succeeded = False
+    finally:
+        stop.set()
+        heartbeat.join()
+    try:
+        if succeeded:
+            os.remove(path)
+        elif job["attempts"] >= max_attempts:
+            os.rename(path, os.path.join(folder(queue_dir, "failed"), f"{job['id']}.json"))
+        else:
+            os.rename(path, os.path.join(folder(queue_dir, "pending"), f"{job['id']}.json"))
+    except FileNotFoundError:
+        # The lease ran out and the job was requeued; the result, if any, still counts
+        pass
+    return succeeded
+
+def work(queue_dir: str, lease: float = LEASE_SECONDS, poll: float = POLL_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS, wait: bool = False) -> int:
+    """Claims and runs jobs until the queue is drained, i.e. nothing is pending or
+        claimed, or with wait forever. Returns the number of jobs this worker ran."""
+    worker = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}".replace(".", "_")
+    ran = 0
+    while True:
+        requeue_expired(queue_dir, lease)
+        path = claim(queue_dir, worker)
+        if path is not None:
+            run_job(queue_dir, path, lease, max_attempts)
+            ran += 1
+            continue
+        counts = status(queue_dir)
+        if not wait and counts["pending"] == 0 and counts["claimed"] == 0:
+            return ran
+        time.sleep(poll)
+
+def run_workers(queue_dir: str, processes: int, lease: float = LEASE_SECONDS, poll: float = POLL_SECONDS,
+                max_attempts: int = MAX_ATTEMPTS, wait: bool = False):
+    """Runs processes workers on this node until the queue is drained."""
+    workers = [Process(target=work, args=(queue_dir, lease, poll, max_attempts, wait)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
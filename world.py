@@ -1,24 +1,98 @@
-from typing import Tuple, List
-from environment import Environment
+import time
+import numpy as np
+import utilities
+from functools import partial
+from typing import Tuple, List, Dict
+from environment import Environment, ReferenceEngine
+from meanfield import MeanFieldEnvironment
+
+# Engines a World can run on: cell by cell, or the expected state as a mean field
+ENGINES = {"grid": Environment, "meanfield": MeanFieldEnvironment}
+
+
+def register_engine(name: str, engine: ReferenceEngine):
+    """Makes World(..., engine=name) run the grid model with engine advancing each day."""
+    ENGINES[name] = partial(Environment, engine=engine)
 
 
 class World:
     """World class that handles running the Environment."""
 
+    __slots__ = ("time", "environment")
+
     def __init__(self, 
             climate_type: str,
             grid_size: Tuple[int, int],
-            fungus_list: List[str]) -> None:
+            fungus_list: List[str],
+            seed: int = None,
+            species_table: np.ndarray = None,
+            initial_locations: Dict[str, List[Tuple[int, int]]] = None,
+            expansion_resolution: str = "coexist",
+            engine: str = "grid") -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
         self.time = 0
-        self.environment = Environment(climate_type, 
+        self.environment = ENGINES[engine](climate_type, 
                                         grid_size,
-                                        fungus_list)
+                                        fungus_list,
+                                        seed,
+                                        species_table,
+                                        initial_locations,
+                                        expansion_resolution)
 
     def increment_time(self):
         """Moves the World's time forward by one day."""
         self.time += 1
         self.environment.update(self.time)
 
+    def run(self, days: int, fast_forward: bool = True, macro_step: bool = False):
+        """Moves the World's time forward by days. With fast_forward, runs of
+            days on which no Fungus is alive are applied in one step, and a World
+            whose fungi cannot come back before the end finishes immediately.
+            With macro_step, the days between expansion days are applied as one block."""
+        self.check_run_length(days)
+        end = self.time + days
+        while self.time < end:
+            if fast_forward and self.environment.is_idle():
+                # Advances through the idle days and the day that ends them
+                advanced = self.environment.fast_forward(self.time + 1, end - self.time)
+                self.time += advanced
+                if advanced > 0:
+                    continue
+            if macro_step:
+                # Days before the next expansion day are pure consumption
+                block = min(utilities.DAYS_UNTIL_EXPANSION - 1 - self.time % utilities.DAYS_UNTIL_EXPANSION, 
+                            end - self.time)
+                if block > 1:
+                    self.environment.macro_step(self.time + 1, block)
+                    self.time += block
+                    continue
+            self.increment_time()
+
+    def check_run_length(self, days: int):
+        """Raises ValueError if the Climate replays recorded weather that ends
+            before days more days have run."""
+        last_day = self.environment.get_climate().get_last_recorded_day()
+        if last_day is not None and self.time + days > last_day:
+            raise ValueError(f"The recorded weather ends on day {last_day}, "
+                            f"before day {self.time + days} of the run")
+
+    def retire_doomed(self, days: int) -> List[str]:
+        """Retires the fungi the Climate cannot let live on any of the next days,
+            which should reach the end of the run, so that they stop taking turns;
+            see viability. Returns the names of every retired Fungus."""
+        return self.environment.retire_doomed(self.time + 1, days)
+
+    def fork(self, split_random: bool = True) -> "World":
+        """Returns an independent copy of the World as it is today, for branching
+            what-if runs off a shared history. With split_random (the default) the
+            copy draws from its own random stream; without, it draws the numbers
+            this World would have, so an untouched copy repeats its future exactly."""
+        world = World.__new__(World)
+        world.time = self.time
+        world.environment = self.environment.fork(split_random)
+        return world
+
     # World GETTERS
     def get_time(self) -> int:
         """Return's the World's time."""
@@ -27,3 +101,89 @@ class World:
     def get_environment(self) -> Environment:
         """Return's the World's Environment."""
         return self.environment
+
+
+def macro_step_samples(climate_type: str, 
+            grid_size: Tuple[int, int],
+            fungus_list: List[str],
+            days: int,
+            trials: int) -> Dict[bool, Dict[str, np.ndarray]]:
+    """Runs trials Worlds with and without macro-stepping from matched seeds and
+        returns, for each, an array of every final-state metric by trial."""
+    samples = {True: np.zeros((3, trials)), False: np.zeros((3, trials))}
+    for trial in range(trials):
+        for macro_step in (True, False):
+            world = World(climate_type, grid_size, fungus_list, seed=trial)
+            world.run(days, macro_step=macro_step)
+            fungi = world.get_environment().get_fungi_list()
+            samples[macro_step][:, trial] = [world.get_environment().get_grid().average_biomass(),
+                                            sum(f.get_total_amount_of_substrate_eaten() for f in fungi),
+                                            sum(f.get_number_of_fungal_cells() for f in fungi)]
+    return {macro_step: dict(zip(["average_biomass", "substrate_eaten", "fungal_cells"], values))
+            for macro_step, values in samples.items()}
+
+def macro_step_error(climate_type: str, 
+            grid_size: Tuple[int, int],
+            fungus_list: List[str],
+            days: int,
+            trials: int) -> Dict[str, float]:
+    """Runs trials Worlds with and without macro-stepping from matched seeds and
+        returns the relative difference of the mean of each final-state metric."""
+    samples = macro_step_samples(climate_type, grid_size, fungus_list, days, trials)
+    return {name: float(abs(samples[True][name].mean() - reference.mean()) / max(abs(reference.mean()), 1e-12))
+            for name, reference in samples[False].items()}
+
+def check_macro_step(climate_type: str, 
+            grid_size: Tuple[int, int],
+            fungus_list: List[str],
+            days: int,
+            trials: int = utilities.MACRO_STEP_TRIALS, 
+            tolerance: float = utilities.MACRO_STEP_TOLERANCE) -> bool:
+    """Returns whether macro-stepping is statistically equivalent to day-by-day
+        stepping: the final-state metrics of the two ensembles may not differ in
+        distribution (KS tests) and the confidence interval of the difference of
+        their means must lie within tolerance (two one-sided tests). The runs draw
+        different random numbers, so a difference of means alone is mostly noise."""
+    # Imported here: conformance imports World, and scipy is kept out of the core
+    import conformance
+    samples = macro_step_samples(climate_type, grid_size, fungus_list, days, trials)
+    results = [conformance.equivalence(samples[True][name][:, None], reference[:, None], margin=tolerance)
+                for name, reference in samples[False].items()]
+    return all(result["distribution_equivalent"] and result["mean_equivalent"] for result in results)
+
+def meanfield_calibration(climate_types: List[str],
+            grid_size: Tuple[int, int],
+            fungus_list: List[str],
+            days: int,
+            trials: int,
+            every: int = 30) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Runs trials Worlds of each climate on both engines, stepping day by day, and
+        reports, per climate and metric, the mean over the run (sampled every few
+        days) on the grid and mean-field engines and their relative difference,
+        along with the seconds a run takes on each engine."""
+    names = ["average_biomass", "substrate_eaten", "fungal_cells", "dead_cells"]
+    report = {}
+    for climate_type in climate_types:
+        means = {engine: np.zeros(len(names)) for engine in ENGINES}
+        seconds = {engine: 0.0 for engine in ENGINES}
+        for trial in range(trials):
+            for engine in ENGINES:
+                world = World(climate_type, grid_size, fungus_list, seed=trial, engine=engine)
+                started = time.perf_counter()
+                samples = []
+                # The grid side is the reference day, not its block-step approximation
+                for day in range(0, days, every):
+                    world.run(min(every, days - day))
+                    fungi = world.get_environment().get_fungi_list()
+                    samples.append([world.get_environment().get_grid().average_biomass(),
+                                    sum(f.get_total_amount_of_substrate_eaten() for f in fungi),
+                                    sum(f.get_number_of_fungal_cells() for f in fungi),
+                                    sum(f.get_number_of_deaths() for f in fungi)])
+                seconds[engine] += (time.perf_counter() - started) / trials
+                means[engine] += np.mean(samples, axis=0) / trials
+        errors = np.abs(means["meanfield"] - means["grid"]) / np.maximum(np.abs(means["grid"]), 1e-12)
+        report[climate_type] = {name: {"grid": float(means["grid"][i]),
+                                        "meanfield": float(means["meanfield"][i]),
+                                        "relative_error": float(errors[i])} for i, name in enumerate(names)}
+        report[climate_type]["seconds"] = {engine: seconds[engine] for engine in ENGINES}
+    return report